@@ -0,0 +1,261 @@
+# benchmarks/fake_services.py
+"""
+Local stand-ins for the services a swap run talks to, for offline benchmarks:
+
+* FakeChain + a JSON-RPC node (single and batch requests, Multicall3 aggregate3, raw transactions
+  mined on the next block) with configurable latency and error rate,
+* a KyberSwap aggregator serving /api/v1/routes and /api/v1/route/build,
+* an Infura-style suggestedGasFees endpoint.
+
+Every server runs in a daemon thread on 127.0.0.1 and counts the requests it served.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_utils import keccak
+
+ROUTER_ADDRESS = "0x6131B5fae19EA4f9D964eAc0408E4408b66337b5"
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3 = "82ad56cb"  # aggregate3((address,bool,bytes)[])
+MAX_UINT = 2 ** 256 - 1
+
+
+class FakeChain:
+    """
+    Minimal chain state shared by every fake JSON-RPC endpoint: blocks advance every block_time
+    seconds, raw transactions are mined in the first block after they arrive and always succeed.
+    approval_rate is the share of wallets reported with no allowance, so they go through an approval.
+    """
+
+    def __init__(self, chain_id=137, block_time=1.0, approval_rate=0.0, seed=1):
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.approval_rate = approval_rate
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.nonces = {}        # sender -> next nonce
+        self.transactions = {}  # tx hash -> (sender, nonce, block sent)
+        self.approved = set()   # owners that sent a transaction during the run
+        self.random = random.Random(seed)
+        self.requests = 0       # HTTP requests served
+        self.calls = {}         # JSON-RPC method -> calls (batch entries counted one by one)
+
+    def block_number(self):
+        return int((time.monotonic() - self.started) / self.block_time) + 1
+
+    @staticmethod
+    def _seed_of(address):
+        return int.from_bytes(keccak(text=address.lower())[:8], 'big')
+
+    def balance_of(self, owner):
+        # 10..1000 tokens with 18 decimals, different per wallet so routes are not all identical
+        return (10 + self._seed_of(owner) % 990) * 10 ** 18
+
+    def allowance(self, token, owner):
+        if owner.lower() in self.approved:
+            return MAX_UINT
+        return 0 if (self._seed_of(owner) % 1000) < self.approval_rate * 1000 else MAX_UINT
+
+    def token_call(self, target, data):
+        """Answer a token/Multicall3 read; returns result bytes or None for a revert."""
+        selector, args = data[:8], bytes.fromhex(data[8:])
+        if selector == '70a08231':  # balanceOf(address)
+            return encode(['uint256'], [self.balance_of(decode(['address'], args)[0])])
+        if selector == '4d2301cc':  # getEthBalance(address)
+            return encode(['uint256'], [self.balance_of(decode(['address'], args)[0])])
+        if selector == '313ce567':  # decimals()
+            return encode(['uint8'], [18])
+        if selector == 'dd62ed3e':  # allowance(address,address)
+            owner, _ = decode(['address', 'address'], args)
+            return encode(['uint256'], [self.allowance(target, owner)])
+        if selector == '06fdde03':  # name()
+            return encode(['string'], ['Bench Token'])
+        return None  # version(), DOMAIN_SEPARATOR(), nonces(): no EIP-2612 support
+
+    def eth_call(self, tx):
+        target, data = tx['to'], tx.get('data') or tx.get('input') or '0x'
+        data = data[2:]
+        if data.startswith(AGGREGATE3):
+            calls = decode(['(address,bool,bytes)[]'], bytes.fromhex(data[8:]))[0]
+            results = []
+            for call_target, _, call_data in calls:
+                output = self.token_call(call_target, call_data.hex())
+                results.append((output is not None, output or b''))
+            return '0x' + encode(['(bool,bytes)[]'], [results]).hex()
+        output = self.token_call(target, data)
+        if output is None:
+            raise ValueError('execution reverted')
+        return '0x' + output.hex()
+
+    def send_raw_transaction(self, raw_hex):
+        raw = bytes.fromhex(raw_hex[2:])
+        tx_hash = '0x' + keccak(raw).hex()
+        sender = Account.recover_transaction(raw)
+        with self.lock:
+            if tx_hash not in self.transactions:
+                nonce = self.nonces.get(sender.lower(), 0)
+                self.nonces[sender.lower()] = nonce + 1
+                self.transactions[tx_hash] = (sender, nonce, self.block_number())
+                # A wallet's first transaction is its approval when it needed one; either way the
+                # router may spend its tokens from now on
+                self.approved.add(sender.lower())
+        return tx_hash
+
+    def receipt(self, tx_hash):
+        with self.lock:
+            item = self.transactions.get(tx_hash)
+        if item is None or self.block_number() <= item[2]:
+            return None
+        sender, nonce, block = item
+        return {
+            'transactionHash': tx_hash, 'transactionIndex': '0x0', 'blockHash': '0x' + '11' * 32,
+            'blockNumber': hex(block + 1), 'from': sender, 'to': ROUTER_ADDRESS, 'status': '0x1',
+            'gasUsed': hex(200000), 'cumulativeGasUsed': hex(200000), 'effectiveGasPrice': hex(30 * 10 ** 9),
+            'contractAddress': None, 'logs': [], 'logsBloom': '0x' + '00' * 256, 'type': '0x2',
+        }
+
+    def handle(self, method, params):
+        """Return (result, error) for one JSON-RPC call."""
+        with self.lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+        if method == 'eth_chainId':
+            return hex(self.chain_id), None
+        if method == 'net_version':
+            return str(self.chain_id), None
+        if method == 'eth_blockNumber':
+            return hex(self.block_number()), None
+        if method == 'eth_getTransactionCount':
+            with self.lock:
+                return hex(self.nonces.get(params[0].lower(), 0)), None
+        if method == 'eth_getBalance':
+            return hex(self.balance_of(params[0])), None
+        if method == 'eth_call':
+            try:
+                return self.eth_call(params[0]), None
+            except ValueError as e:
+                return None, {'code': 3, 'message': str(e)}
+        if method == 'eth_sendRawTransaction':
+            return self.send_raw_transaction(params[0]), None
+        if method == 'eth_getTransactionReceipt':
+            return self.receipt(params[0]), None
+        if method in ('eth_gasPrice', 'eth_maxPriorityFeePerGas'):
+            return hex(30 * 10 ** 9), None
+        if method == 'eth_estimateGas':
+            return hex(200000), None
+        if method == 'eth_feeHistory':
+            count = int(params[0], 16) if isinstance(params[0], str) else int(params[0])
+            return {'oldestBlock': hex(max(1, self.block_number() - count)),
+                    'baseFeePerGas': [hex(30 * 10 ** 9)] * (count + 1),
+                    'gasUsedRatio': [0.5] * count,
+                    'reward': [[hex(10 ** 9) for _ in params[2]] for _ in range(count)]}, None
+        if method == 'eth_getBlockByNumber':
+            return {'number': hex(self.block_number()), 'baseFeePerGas': hex(30 * 10 ** 9),
+                    'timestamp': hex(int(time.time())), 'hash': '0x' + '11' * 32, 'transactions': []}, None
+        return None, {'code': -32601, 'message': f'method {method} not supported'}
+
+
+class FakeService:
+    """A threaded local HTTP server whose handler answers with latency and random failures."""
+
+    def __init__(self, respond, latency=0.0, error_rate=0.0, seed=1):
+        self.respond = respond
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+        service = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                with service._lock:
+                    service.requests += 1
+                    fail = service.random.random() < service.error_rate
+                if service.latency:
+                    time.sleep(service.latency)
+                status, payload = (503, {'message': 'injected failure'}) if fail else \
+                    service.respond(self.command, urlsplit(self.path), body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _serve
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def rpc_node(chain, latency=0.0, error_rate=0.0, seed=1):
+    """JSON-RPC endpoint over a FakeChain, accepting single requests and batch arrays."""
+    def answer(request):
+        result, error = chain.handle(request['method'], request.get('params') or [])
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        response.update({'error': error} if error else {'result': result})
+        return response
+
+    def respond(method, url, body):
+        with chain.lock:
+            chain.requests += 1
+        if isinstance(body, list):
+            return 200, [answer(request) for request in body]
+        return 200, answer(body)
+
+    return FakeService(respond, latency, error_rate, seed)
+
+
+def aggregator(latency=0.0, error_rate=0.0, seed=2):
+    """KyberSwap aggregator stand-in: GET .../api/v1/routes and POST .../api/v1/route/build."""
+    def respond(method, url, body):
+        if url.path.endswith('/api/v1/routes'):
+            query = dict(part.split('=', 1) for part in url.query.split('&') if '=' in part)
+            amount_in = int(query.get('amountIn', 0))
+            return 200, {'code': 0, 'message': 'successfully', 'data': {
+                'routerAddress': ROUTER_ADDRESS,
+                'routeSummary': {'tokenIn': query.get('tokenIn'), 'amountIn': str(amount_in),
+                                 'tokenOut': query.get('tokenOut'), 'amountOut': str(amount_in * 2),
+                                 'gas': '200000', 'gasPrice': str(30 * 10 ** 9), 'route': []}}}
+        if url.path.endswith('/api/v1/route/build'):
+            summary = (body or {}).get('routeSummary', {})
+            return 200, {'code': 0, 'message': 'successfully', 'data': {
+                'amountIn': summary.get('amountIn', '0'), 'amountOut': summary.get('amountOut', '0'),
+                'amountInUsd': '1', 'amountOutUsd': '1', 'gas': '250000', 'gasUsd': '0.01',
+                'routerAddress': ROUTER_ADDRESS, 'data': '0x' + 'e21fd0e9' + '00' * 320}}
+        return 404, {'code': 404, 'message': 'not found'}
+
+    return FakeService(respond, latency, error_rate, seed)
+
+
+def gas_api(latency=0.0, error_rate=0.0, seed=3):
+    """Infura gas API stand-in answering every GET with suggested fees in gwei."""
+    tier = lambda fee, tip: {'suggestedMaxFeePerGas': str(fee), 'suggestedMaxPriorityFeePerGas': str(tip)}
+
+    def respond(method, url, body):
+        return 200, {'low': tier(40, 1), 'medium': tier(60, 2), 'high': tier(90, 3), 'estimatedBaseFee': '30'}
+
+    return FakeService(respond, latency, error_rate, seed)
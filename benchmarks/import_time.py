@@ -0,0 +1,106 @@
+# benchmarks/import_time.py
+"""
+Measure how long it takes to import the tool's entry points, in a fresh interpreter each time.
+
+    python benchmarks/import_time.py                 # print the timings
+    python benchmarks/import_time.py --max-ms 800    # fail if any import is slower than 800 ms
+
+Every run also checks that the GUI and prompt libraries stay off the headless import path, and that
+the launcher and config do not import the chain libraries.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules timed, in the order the tool imports them
+TARGETS = ("config", "main_runner", "modules.kyberSwap")
+
+# GUI and prompt modules that must not be imported just by loading a target
+HEADLESS_FORBIDDEN = ("customtkinter", "tkinter", "questionary")
+
+# Chain libraries the launcher and config must not pull in (web3 imports eth_abi itself, so
+# modules.kyberSwap is not held to this)
+CHAIN_FORBIDDEN = ("web3", "eth_abi")
+
+
+def forbidden_for(target):
+    """Modules that loading target must leave unimported."""
+    return HEADLESS_FORBIDDEN + (CHAIN_FORBIDDEN if target in ("config", "main_runner") else ())
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {target}
+elapsed = time.perf_counter() - start
+loaded = [name for name in {forbidden!r} if name in sys.modules]
+print(elapsed, ",".join(loaded))
+"""
+
+
+def measure(target, runs):
+    """Import target in `runs` fresh interpreters and return (timings in ms, forbidden modules loaded)."""
+    timings = []
+    loaded = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(target=target, forbidden=forbidden_for(target))],
+            cwd=ROOT, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"importing {target} failed:\n{result.stderr.strip()}")
+        elapsed, _, names = result.stdout.strip().rpartition("\n")[2].partition(" ")
+        timings.append(float(elapsed) * 1000)
+        loaded.update(name for name in names.split(",") if name)
+    return timings, sorted(loaded)
+
+
+def top_imports(target, count):
+    """Return the `count` slowest imports (cumulative microseconds, module) reported by -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target (default 5)")
+    parser.add_argument("--max-ms", type=float, help="Fail if the median import time of a target exceeds this")
+    parser.add_argument("--top", type=int, default=0, help="Also list the N slowest imports of each target")
+    args = parser.parse_args()
+
+    failures = []
+    for target in TARGETS:
+        try:
+            timings, loaded = measure(target, args.runs)
+        except RuntimeError as e:
+            print(e)
+            failures.append(target)
+            continue
+        median = statistics.median(timings)
+        print(f"{target:<20} median {median:8.1f} ms   min {min(timings):8.1f} ms   max {max(timings):8.1f} ms")
+        if loaded:
+            print(f"  loads modules it must not import: {', '.join(loaded)}")
+            failures.append(target)
+        if args.max_ms is not None and median > args.max_ms:
+            print(f"  slower than the {args.max_ms:.0f} ms budget")
+            failures.append(target)
+        for cumulative, name in top_imports(target, args.top):
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
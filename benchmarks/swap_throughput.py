@@ -0,0 +1,153 @@
+# benchmarks/swap_throughput.py
+"""
+Drive SwapManager end to end against local stand-ins of the KyberSwap aggregator, the gas API and
+the chain's JSON-RPC nodes (see fake_services.py), so throughput can be measured offline.
+
+    python benchmarks/swap_throughput.py                          # 10, 100 and 1000 wallets
+    python benchmarks/swap_throughput.py --wallets 100 --concurrency 16 --rpc-latency 0.05
+    python benchmarks/swap_throughput.py --rpc-error-rate 0.05 --rpc-endpoints 3 --json
+
+Every run reports swaps/sec, JSON-RPC requests and calls per swap, aggregator calls per swap and
+p50 / p95 wall-clock per swap stage. Nothing leaves 127.0.0.1 and the keys are throwaway test keys.
+The script exits with status 1 when any swap ended in an error, since the numbers are then meaningless.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config  # noqa: E402
+import fake_services  # noqa: E402
+from eth_utils import to_checksum_address  # noqa: E402
+
+# Checksummed at import, web3 rejects addresses with a wrong EIP-55 checksum
+FROM_TOKEN = to_checksum_address("0x2791bca1f2de4661ed88a684e9a9db1c4b7aaa84")
+TO_TOKEN = to_checksum_address("0xc2132d05d31c914a87c6611c10748aeb04b58e8f")
+
+
+def bench_keys(count):
+    """Deterministic throwaway private keys (never funded anywhere)."""
+    return ["0x" + (index + 1).to_bytes(32, 'big').hex() for index in range(count)]
+
+
+def run_once(wallets, args):
+    """Run one batch of `wallets` swaps against fresh fake services and return its metrics."""
+    # Tunables read when the manager (and the shared aggregator limiter) is created
+    config.KYBERSWAP_RATE_LIMIT = args.aggregator_rate
+    config.KYBERSWAP_BURST = max(1, int(args.aggregator_rate))
+    config.RECEIPT_POLL_INTERVAL = min(config.RECEIPT_POLL_INTERVAL, args.block_time / 2)
+    config.PREFLIGHT_SWAPS = args.preflight
+    config.SWAP_JOURNAL_FILE = None
+    config.TIMINGS_FILE = ''
+
+    from rich.console import Console
+    from modules import kyberSwap
+    kyberSwap._aggregator_limiter = None  # new limiter with the benchmark rate
+
+    chain = fake_services.FakeChain(chain_id=137, block_time=args.block_time, approval_rate=args.approval_rate)
+    nodes = [fake_services.rpc_node(chain, args.rpc_latency, args.rpc_error_rate, seed=index + 1)
+             for index in range(args.rpc_endpoints)]
+    aggregator = fake_services.aggregator(args.aggregator_latency, args.aggregator_error_rate)
+    gas_api = fake_services.gas_api()
+    workdir = tempfile.mkdtemp(prefix="swap-bench-")
+    with open(os.path.join(workdir, "tokens_kyber.txt"), 'w', encoding='utf-8') as f:
+        f.write(f"{FROM_TOKEN} USDC\n{TO_TOKEN} USDT\n")
+
+    class BenchChain(config.POLYGON):
+        RPC_URLS = [node.url for node in nodes]
+        ALCHEMY_RPC_URL = RPC_URLS[0]
+        INFURA_GAS_API_URL = gas_api.url + "/suggestedGasFees"
+        KYBERSWAP_API_ROUTE = aggregator.url + "/polygon/api/v1/routes"
+        KYBERSWAP_API_BUILD = aggregator.url + "/polygon/api/v1/route/build"
+        KYBERSWAP_API_ENCODE = aggregator.url + "/polygon/route/encode"
+        WALLET_FILE = os.path.join(workdir, "wallet.txt")
+        TOKENS_KYBER_FILE = os.path.join(workdir, "tokens_kyber.txt")
+        KYBERSWAP_ROUTER_ADDRESS = fake_services.ROUTER_ADDRESS
+
+    # Quiet from the start, so the manager's startup output is muted too
+    kyberSwap.console.quiet = not args.verbose
+    try:
+        manager = kyberSwap.SwapManager(BenchChain, max_concurrent_swaps=args.concurrency,
+                                        http_pool_size=args.concurrency, console=Console(quiet=not args.verbose))
+        manager.load_wallets_from_keys(bench_keys(wallets))
+        settings = {
+            'from_token': FROM_TOKEN, 'to_token': TO_TOKEN, 'from_symbol': 'USDC', 'to_symbol': 'USDT',
+            'amount_mode': 'percent', 'amount': 50, 'slippage': 0.005, 'gas_tier': 'medium',  # slippage is a fraction
+            'approval': 'Unlimited amount', 'confirm': False, 'wait_for_receipt': args.confirm,
+        }
+        started = time.perf_counter()
+        results = manager.start_swaps(args.concurrency, settings)
+        elapsed = time.perf_counter() - started
+    finally:
+        for service in (*nodes, aggregator, gas_api):
+            service.close()
+
+    swaps = max(1, len(results))
+    statuses = {}
+    for result in results:
+        statuses[result['status']] = statuses.get(result['status'], 0) + 1
+    rpc_calls = sum(chain.calls.values())
+    return {
+        'wallets': wallets,
+        'seconds': round(elapsed, 3),
+        'swaps_per_second': round(len(results) / elapsed, 2) if elapsed else None,
+        'statuses': statuses,
+        'rpc_requests_per_swap': round(chain.requests / swaps, 2),
+        'rpc_calls_per_swap': round(rpc_calls / swaps, 2),
+        'rpc_calls': dict(sorted(chain.calls.items())),
+        'aggregator_calls_per_swap': round(aggregator.requests / swaps, 2),
+        'gas_api_requests': gas_api.requests,
+        'stages': manager.timer.summary(),
+    }
+
+
+def print_metrics(metrics):
+    statuses = ", ".join(f"{status}: {count}" for status, count in sorted(metrics['statuses'].items()))
+    print(f"{metrics['wallets']:>6} wallets  {metrics['seconds']:8.2f} s  {metrics['swaps_per_second']:8.2f} swaps/s  "
+          f"({statuses})")
+    print(f"        RPC {metrics['rpc_requests_per_swap']} requests / {metrics['rpc_calls_per_swap']} calls per swap, "
+          f"aggregator {metrics['aggregator_calls_per_swap']} calls per swap, "
+          f"gas API {metrics['gas_api_requests']} requests")
+    for stage, stats in metrics['stages'].items():
+        print(f"        {stage:<20} p50 {stats['p50'] * 1000:8.1f} ms  p95 {stats['p95'] * 1000:8.1f} ms  "
+              f"({stats['count']} spans)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline swap throughput benchmark")
+    parser.add_argument("--wallets", type=int, nargs="+", default=[10, 100, 1000], help="Batch sizes to run")
+    parser.add_argument("--concurrency", type=int, default=8, help="Wallets swapped at the same time (default 8)")
+    parser.add_argument("--rpc-endpoints", type=int, default=2, help="Fake JSON-RPC nodes behind the pool")
+    parser.add_argument("--rpc-latency", type=float, default=0.01, help="Seconds added to every RPC request")
+    parser.add_argument("--rpc-error-rate", type=float, default=0.0, help="Share of RPC requests answered with 503")
+    parser.add_argument("--aggregator-latency", type=float, default=0.02, help="Seconds added to every aggregator call")
+    parser.add_argument("--aggregator-error-rate", type=float, default=0.0, help="Share of aggregator calls failing")
+    parser.add_argument("--aggregator-rate", type=float, default=1000, help="Client-side aggregator limit (req/s)")
+    parser.add_argument("--approval-rate", type=float, default=0.0, help="Share of wallets that need an approval")
+    parser.add_argument("--block-time", type=float, default=0.5, help="Seconds per fake block")
+    parser.add_argument("--confirm", action="store_true", help="Wait for each receipt inside the swap")
+    parser.add_argument("--preflight", action="store_true", help="Run the pre-flight planning pass first")
+    parser.add_argument("--verbose", action="store_true", help="Keep the tool's console output")
+    parser.add_argument("--json", action="store_true", help="Print the metrics as JSON")
+    args = parser.parse_args()
+
+    runs = [run_once(wallets, args) for wallets in args.wallets]
+    if args.json:
+        print(json.dumps(runs, indent=2))
+    else:
+        for metrics in runs:
+            print_metrics(metrics)
+    errors = sum(metrics['statuses'].get('error', 0) for metrics in runs)
+    if errors:
+        print(f"warning: {errors} swaps ended in an error, rerun with --verbose to see why", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 # config.py
-import eth_abi
 import os
 from dotenv import load_dotenv
 from pathlib import Path
@@ -16,6 +15,95 @@ KYBERSWAP_API_HEADERS = {
 ALCHEMY_API_KEY = os.getenv('ALCHEMY_API_KEY')
 INFURA_API_KEY = os.getenv('INFURA_API_KEY')
 
+# RPC provider pool: per-request timeout (seconds) and how long a failing endpoint is skipped
+RPC_TIMEOUT = float(os.getenv('RPC_TIMEOUT', 10))
+RPC_COOLDOWN = float(os.getenv('RPC_COOLDOWN', 30))
+# Independent reads (balances, nonces, receipts) are sent as JSON-RPC batches of at most this many calls
+RPC_BATCH_SIZE = int(os.getenv('RPC_BATCH_SIZE', 50))
+
+
+def rpc_urls(chain, *defaults):
+    """RPC endpoints of a chain: the comma-separated <CHAIN>_RPC_URLS env var first, then the given defaults."""
+    custom = [url.strip() for url in os.getenv(f'{chain.upper()}_RPC_URLS', '').split(',') if url.strip()]
+    return list(dict.fromkeys(custom + [url for url in defaults if url]))
+
+
+# Read every wallet's balances, allowance and gas balance up front before non-interactive batches
+PREFLIGHT_SWAPS = os.getenv('PREFLIGHT_SWAPS', 'true').lower() == 'true'
+# KyberSwap MetaAggregationRouterV2 (same address on every supported chain), used for pre-flight allowance reads
+KYBERSWAP_ROUTER_ADDRESS = "0x6131B5fae19EA4f9D964eAc0408E4408b66337b5"
+
+# Append-only journal of batch plan runs (main_runner.py --plan ... --resume continues the last run); empty disables it
+SWAP_JOURNAL_FILE = os.getenv('SWAP_JOURNAL_FILE', str(BASE_PATH / "swap_journal.jsonl"))
+
+# Per-stage swap timings: a .jsonl path gets one line per span, any other path a Prometheus text file
+# rewritten after every batch; empty only prints the p50/p95 summary
+TIMINGS_FILE = os.getenv('TIMINGS_FILE', '')
+
+# Chains of a batch plan that run at the same time, each with its own SwapManager
+MAX_PARALLEL_CHAINS = int(os.getenv('MAX_PARALLEL_CHAINS', 6))
+
+# Streamed wallet files (batch plan "stream": true) are processed this many keys at a time; a followed
+# file ("follow": true) is considered finished after WALLET_STREAM_IDLE_TIMEOUT seconds without new keys
+WALLET_STREAM_CHUNK = int(os.getenv('WALLET_STREAM_CHUNK', 500))
+WALLET_STREAM_IDLE_TIMEOUT = float(os.getenv('WALLET_STREAM_IDLE_TIMEOUT', 60))
+
+# Key files with at least this many keys derive wallet addresses in a process pool
+WALLET_PROCESS_POOL_THRESHOLD = int(os.getenv('WALLET_PROCESS_POOL_THRESHOLD', 2000))
+
+# Client-side limit for KyberSwap aggregator calls (requests per second and burst size), shared by all wallets
+KYBERSWAP_RATE_LIMIT = float(os.getenv('KYBERSWAP_RATE_LIMIT', 10))
+KYBERSWAP_BURST = int(os.getenv('KYBERSWAP_BURST', 10))
+
+# Maximum number of wallets swapped at the same time in concurrent mode
+MAX_CONCURRENT_SWAPS = int(os.getenv('MAX_CONCURRENT_SWAPS', 8))
+
+# Pooled HTTP session used for the KyberSwap aggregator and gas APIs
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 16))
+HTTP_TIMEOUT = (5, 20)  # (connect, read) seconds
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 3))
+HTTP_BACKOFF = 0.5  # seconds, doubled after every retry
+
+# Send the swap right behind its approval (next nonce) instead of waiting for the approval receipt
+PIPELINE_APPROVALS = os.getenv('PIPELINE_APPROVALS', 'true').lower() == 'true'
+
+# Concurrent non-interactive batches run as a staged pipeline (plan -> route -> build -> sign -> broadcast ->
+# confirm) with its own workers per stage: SWAP_PIPELINE_WORKERS overrides stages ("route=16,sign=2"; the others
+# use the batch concurrency) and SWAP_PIPELINE_QUEUE bounds the wallets waiting between two stages
+STAGED_PIPELINE = os.getenv('STAGED_PIPELINE', 'true').lower() == 'true'
+SWAP_PIPELINE_WORKERS = os.getenv('SWAP_PIPELINE_WORKERS', '')
+SWAP_PIPELINE_QUEUE = int(os.getenv('SWAP_PIPELINE_QUEUE', 32))
+
+# Offline bulk signing (--sign-only) signs in a process pool once a batch has this many transactions
+SIGNING_PROCESS_POOL_THRESHOLD = int(os.getenv('SIGNING_PROCESS_POOL_THRESHOLD', 200))
+
+# Burst broadcaster: at most BROADCAST_WINDOW signed transactions in flight at once; one that no node knows
+# REBROADCAST_AFTER seconds after it was sent is sent again
+BROADCAST_WINDOW = int(os.getenv('BROADCAST_WINDOW', 200))
+REBROADCAST_AFTER = float(os.getenv('REBROADCAST_AFTER', 12))
+
+# Replace-by-fee: a swap or approval still pending RBF_STUCK_AFTER seconds after it was (re)sent is re-signed at
+# the same nonce with fees raised by RBF_BUMP_PERCENT (at least 10%), at most RBF_MAX_REPLACEMENTS times. Fees never
+# exceed RBF_MAX_FEE_MULTIPLIER x the original maxFeePerGas nor RBF_MAX_FEE_GWEI (0 = no limit of that kind)
+RBF_STUCK_AFTER = float(os.getenv('RBF_STUCK_AFTER', 60))
+RBF_BUMP_PERCENT = float(os.getenv('RBF_BUMP_PERCENT', 12.5))
+RBF_MAX_FEE_MULTIPLIER = float(os.getenv('RBF_MAX_FEE_MULTIPLIER', 2))
+RBF_MAX_FEE_GWEI = float(os.getenv('RBF_MAX_FEE_GWEI', 0))
+RBF_MAX_REPLACEMENTS = int(os.getenv('RBF_MAX_REPLACEMENTS', 5))
+
+# Background receipt tracker: give up on a transaction after RECEIPT_TIMEOUT seconds
+RECEIPT_TIMEOUT = 300
+RECEIPT_POLL_INTERVAL = 2  # seconds between new-block checks
+
+# Suggested gas fees are shared by all swaps for GAS_CACHE_TTL seconds (or until the next block)
+GAS_CACHE_TTL = int(os.getenv('GAS_CACHE_TTL', 15))
+GAS_CACHE_PER_BLOCK = os.getenv('GAS_CACHE_PER_BLOCK', 'false').lower() == 'true'
+
+# Identical route lookups within ROUTE_CACHE_TTL seconds share one aggregator request (0 disables the cache)
+ROUTE_CACHE_TTL = int(os.getenv('ROUTE_CACHE_TTL', 10))
+# Round swap amounts down to this many significant digits so similar amounts reuse a route (0 = exact amounts)
+ROUTE_AMOUNT_PRECISION = int(os.getenv('ROUTE_AMOUNT_PRECISION', 0))
+
 QUOTER_ABI = '''[
     {
         "inputs": [
@@ -117,6 +205,47 @@ ERC20_PERMIT_ABI = '''[
         }
     ]'''
     
+# Multicall3 is deployed at the same address on every supported chain (https://www.multicall3.com)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL_BATCH_SIZE = 500  # calls aggregated into one eth_call
+MULTICALL3_ABI = '''[
+        {
+            "inputs": [
+                {
+                    "components": [
+                        {"internalType": "address", "name": "target", "type": "address"},
+                        {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                        {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                    ],
+                    "internalType": "struct Multicall3.Call3[]",
+                    "name": "calls",
+                    "type": "tuple[]"
+                }
+            ],
+            "name": "aggregate3",
+            "outputs": [
+                {
+                    "components": [
+                        {"internalType": "bool", "name": "success", "type": "bool"},
+                        {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                    ],
+                    "internalType": "struct Multicall3.Result[]",
+                    "name": "returnData",
+                    "type": "tuple[]"
+                }
+            ],
+            "stateMutability": "payable",
+            "type": "function"
+        },
+        {
+            "inputs": [{"internalType": "address", "name": "addr", "type": "address"}],
+            "name": "getEthBalance",
+            "outputs": [{"internalType": "uint256", "name": "balance", "type": "uint256"}],
+            "stateMutability": "view",
+            "type": "function"
+        }
+    ]'''
+
 TOKEN_ABI = '''[
         {
             "constant": false,
@@ -199,6 +328,9 @@ class POLYGON :
     # Infura URLs for RPC and Gas Price API
     INFURA_RPC_URL = f"https://polygon-mainnet.g.alchemy.com/v2/JU3_TwEZDx6bPNyDc1AgrRZWphXoPEVk"
     INFURA_GAS_API_URL = f"https://gas.api.infura.io/v3/{INFURA_API_KEY}/networks/{CHAIN_ID}/suggestedGasFees"
+
+    # RPC endpoints pooled for failover and latency routing; <CHAIN>_RPC_URLS adds custom ones
+    RPC_URLS = rpc_urls("POLYGON", ALCHEMY_RPC_URL, INFURA_RPC_URL)
     # Uniswap V3 Quoter Address
 
 class OP :
@@ -244,6 +376,9 @@ class OP :
     #INFURA_RPC_URL = f"https://polygon-mainnet.g.alchemy.com/v2/JU3_TwEZDx6bPNyDc1AgrRZWphXoPEVk"
     INFURA_GAS_API_URL = f"https://gas.api.infura.io/v3/{INFURA_API_KEY}/networks/{CHAIN_ID}/suggestedGasFees"
 
+    # RPC endpoints pooled for failover and latency routing; <CHAIN>_RPC_URLS adds custom ones
+    RPC_URLS = rpc_urls("OP", ALCHEMY_RPC_URL)
+
 class Base :
     # RPC URL for connecting to Polygon mainnet
     ALCHEMY_API_KEY = ALCHEMY_API_KEY
@@ -287,6 +422,9 @@ class Base :
     #INFURA_RPC_URL = f"https://polygon-mainnet.g.alchemy.com/v2/JU3_TwEZDx6bPNyDc1AgrRZWphXoPEVk"
     INFURA_GAS_API_URL = f"https://gas.api.infura.io/v3/{INFURA_API_KEY}/networks/{CHAIN_ID}/suggestedGasFees"
 
+    # RPC endpoints pooled for failover and latency routing; <CHAIN>_RPC_URLS adds custom ones
+    RPC_URLS = rpc_urls("Base", ALCHEMY_RPC_URL)
+
 class ARB :
     # RPC URL for connecting to Polygon mainnet
     ALCHEMY_API_KEY = ALCHEMY_API_KEY
@@ -329,6 +467,9 @@ class ARB :
     # Infura URLs for RPC and Gas Price API
     #INFURA_RPC_URL = f"https://polygon-mainnet.g.alchemy.com/v2/JU3_TwEZDx6bPNyDc1AgrRZWphXoPEVk"
     INFURA_GAS_API_URL = f"https://gas.api.infura.io/v3/{INFURA_API_KEY}/networks/{CHAIN_ID}/suggestedGasFees"
+
+    # RPC endpoints pooled for failover and latency routing; <CHAIN>_RPC_URLS adds custom ones
+    RPC_URLS = rpc_urls("ARB", ALCHEMY_RPC_URL)
     
 class Linea :
     # RPC URL for connecting to Polygon mainnet
@@ -374,6 +515,9 @@ class Linea :
     #INFURA_RPC_URL = f"https://polygon-mainnet.g.alchemy.com/v2/JU3_TwEZDx6bPNyDc1AgrRZWphXoPEVk"
     INFURA_GAS_API_URL = f"https://gas.api.infura.io/v3/{INFURA_API_KEY}/networks/{CHAIN_ID}/suggestedGasFees"
 
+    # RPC endpoints pooled for failover and latency routing; <CHAIN>_RPC_URLS adds custom ones
+    RPC_URLS = rpc_urls("Linea", ALCHEMY_RPC_URL)
+
 class ETHER :
     # RPC URL for connecting to Polygon mainnet
     ALCHEMY_API_KEY = ALCHEMY_API_KEY
@@ -415,5 +559,8 @@ class ETHER :
     # Infura URLs for RPC and Gas Price API
     #INFURA_RPC_URL = f"https://polygon-mainnet.g.alchemy.com/v2/JU3_TwEZDx6bPNyDc1AgrRZWphXoPEVk"
     INFURA_GAS_API_URL = f"https://gas.api.infura.io/v3/{INFURA_API_KEY}/networks/{CHAIN_ID}/suggestedGasFees"
+
+    # RPC endpoints pooled for failover and latency routing; <CHAIN>_RPC_URLS adds custom ones
+    RPC_URLS = rpc_urls("ETHER", ALCHEMY_RPC_URL)
     
 MODULE_PATH = Path(__file__).resolve().parent / "modules"
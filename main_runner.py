@@ -1,20 +1,44 @@
 # main_runner.py
 import os
+import sys
+import argparse
 import importlib.util
-import questionary
 from config import MODULE_PATH
 
-def load_and_run_module(module_path):
+DEFAULT_PLAN_MODULE = "kyberSwap.py"
+
+def load_module(module_path):
     """
-    Load a module from the given path and run its main function.
+    Load a module from the given path and return it together with its name.
     """
     # Extract the module name from the path
     module_name = os.path.basename(module_path).replace('.py', '')
 
-    # Load the module using importlib
+    # Reuse the module if it was already loaded from this path
+    module = sys.modules.get(module_name)
+    if module is not None and os.path.abspath(getattr(module, '__file__', '') or '') == os.path.abspath(module_path):
+        return module, module_name
+
+    # Load the module using importlib and register it under its name; its directory goes on sys.path so
+    # process-pool workers started with "spawn" (macOS, Windows) can import it by that name too
+    module_dir = os.path.dirname(os.path.abspath(module_path))
+    if module_dir not in sys.path:
+        sys.path.insert(0, module_dir)
     spec = importlib.util.spec_from_file_location(module_name, module_path)
     module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        sys.modules.pop(module_name, None)
+        raise
+    return module, module_name
+
+def load_and_run_module(module_path):
+    """
+    Load a module from the given path and run its main function.
+    """
+    module, module_name = load_module(module_path)
 
     # Run the module's main function if it exists
     if hasattr(module, 'main'):
@@ -38,6 +62,7 @@ def run_selected_module():
             return
     
         # Use questionary to ask the user to select a module to run
+        import questionary
         selected_file = questionary.select(
             "Select the module you want to run:",
             choices=python_files
@@ -55,8 +80,50 @@ def run_selected_module():
     else:
         print(f"The path '{MODULE_PATH}' is not a valid directory.")
 
+def run_module_function(function_name, *args, module_file=DEFAULT_PLAN_MODULE):
+    """
+    Load the given module and call one of its headless entry points without the module picker.
+    """
+    module_path = os.path.join(MODULE_PATH, module_file)
+    module, module_name = load_module(module_path)
+    if not hasattr(module, function_name):
+        print(f"No {function_name}() function found in {module_name}.")
+        sys.exit(1)
+    return getattr(module, function_name)(*args)
+
+def run_plan(plan_file, module_file=DEFAULT_PLAN_MODULE, journal_file=None, resume=False, signed_file=None):
+    """
+    Run a batch plan headlessly through the run_batch_plan() function of the given module.
+    """
+    print(f"{'Resuming' if resume else 'Running'} batch plan {plan_file} with {module_file}...")
+    run_module_function('run_batch_plan', plan_file, None, journal_file, resume, signed_file, module_file=module_file)
+
 if __name__ == "__main__":
-    run_selected_module()
+    parser = argparse.ArgumentParser(description="MWswap module runner")
+    parser.add_argument("--plan", help="Run a batch plan file (.json, .yaml or .csv) without prompts")
+    parser.add_argument("--prefetch-tokens", metavar="CHAIN", help="Fill the token metadata cache of a chain")
+    parser.add_argument("--clear-token-cache", metavar="CHAIN", help="Invalidate the token metadata cache of a chain")
+    parser.add_argument("--journal", help="Journal file of a batch plan run (default: SWAP_JOURNAL_FILE)")
+    parser.add_argument("--resume", action="store_true", help="Continue the last journaled run of the batch plan")
+    parser.add_argument("--sign-only", metavar="FILE", help="With --plan: sign every swap into FILE instead of sending it")
+    parser.add_argument("--broadcast", metavar="FILE", help="Send the signed transactions of a --sign-only FILE")
+    parser.add_argument("--module", help="Module used for headless runs (default: kyberSwap.py); "
+                                          "on its own, runs that module directly without the module picker")
+    args = parser.parse_args()
+    module_file = args.module or DEFAULT_PLAN_MODULE
+
+    if args.plan:
+        run_plan(args.plan, module_file, args.journal, args.resume, args.sign_only)
+    elif args.broadcast:
+        run_module_function('broadcast_signed_file', args.broadcast, module_file=module_file)
+    elif args.prefetch_tokens:
+        run_module_function('prefetch_token_metadata', args.prefetch_tokens, module_file=module_file)
+    elif args.clear_token_cache:
+        run_module_function('clear_token_metadata', args.clear_token_cache, module_file=module_file)
+    elif args.module:
+        load_and_run_module(os.path.join(MODULE_PATH, args.module))
+    else:
+        run_selected_module()
 
 
  
\ No newline at end of file
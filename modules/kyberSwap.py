@@ -3,34 +3,1521 @@ import os
 import json
 import time
 import logging
+import importlib
 import requests
-import questionary
-from customtkinter import CTk, CTkTextbox, CTkButton, CTkLabel, CTkFrame
 from web3 import Web3
+from web3.providers import BaseProvider
+from hexbytes import HexBytes
 from rich.console import Console
 from rich.logging import RichHandler
 from eth_account import Account
-from web3.exceptions import ABIFunctionNotFound, ContractLogicError
+from web3.exceptions import ABIFunctionNotFound, ContractLogicError, TransactionNotFound
 from eth_account.messages import encode_structured_data
+import copy
+from contextlib import contextmanager
+import itertools
+import random
+import re
+import hashlib
+import uuid
+import tempfile
 import platform
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import argparse
+import csv
+import threading
+import queue
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import pickle
 
 import config  # Make sure your config.py is in the same directory or PYTHONPATH
 
+
+
+class _LazyModule:
+    """Stand-in for a module that is only imported on first attribute access."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+# Interactive prompts are only needed when a user is at the terminal; headless runs never load them
+questionary = _LazyModule('questionary')
+
 console = Console()
 
+APPROVAL_CHOICES = ["Exact amount", "Unlimited amount"]
+
+# A private key is 64 hex characters, optionally 0x-prefixed
+PRIVATE_KEY_PATTERN = re.compile(r'(?:0[xX])?([0-9a-fA-F]{64})')
+
+# key hash -> address cache written next to the wallet file
+WALLET_ADDRESS_CACHE_FILE = "wallet_address_cache.json"
+
+# Final swap result status -> journal state
+JOURNAL_RESULT_STATES = {'success': 'confirmed'}
+
+# Stages of the concurrent swap pipeline, in order (see SwapManager.run_swap_pipeline)
+SWAP_PIPELINE_STAGES = ("plan", "route", "build", "sign", "broadcast", "confirm")
+
+# Token metadata cache file name, stored in each chain's resources directory
+TOKEN_METADATA_FILE = "token_metadata.json"
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# Placeholder address KyberSwap uses for the chain's native coin
+KYBER_NATIVE_TOKEN = "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE"
+
+# Precomputed 4-byte selectors of the hot read calls, encoded directly without a contract object
+SELECTORS = {
+    'balanceOf': '0x70a08231',         # balanceOf(address)
+    'allowance': '0xdd62ed3e',         # allowance(address,address)
+    'decimals': '0x313ce567',          # decimals()
+    'name': '0x06fdde03',              # name()
+    'version': '0x54fd4d50',           # version()
+    'DOMAIN_SEPARATOR': '0x3644e515',  # DOMAIN_SEPARATOR()
+    'nonces': '0x7ecebe00',            # nonces(address)
+    'getEthBalance': '0x4d2301cc',     # Multicall3.getEthBalance(address)
+}
+
+
+def encode_call(function_name, *addresses):
+    """ABI-encode a call to one of SELECTORS whose arguments are all addresses."""
+    return SELECTORS[function_name] + ''.join(address[2:].lower().rjust(64, '0') for address in addresses)
+
+
+def rpc_result(response):
+    """Return the result of a JSON-RPC response dict, raising ValueError for an error response."""
+    if 'error' in response:
+        error = response['error']
+        raise ValueError(error.get('message', error) if isinstance(error, dict) else error)
+    return response.get('result')
+
+
+def hex_to_uint(value):
+    """Decode the first 32-byte word of a hex eth_call result (or a hex quantity) as an unsigned integer."""
+    data = value[2:] if value.startswith(('0x', '0X')) else value
+    if not data:
+        raise ValueError("Empty call result")
+    return int(data[:64], 16)
+
+
+def parse_stage_workers(spec):
+    """Parse a "stage=workers,..." override (e.g. "route=16,sign=2") into {stage: workers}."""
+    workers = {}
+    for part in filter(None, (part.strip() for part in str(spec or '').split(','))):
+        stage, _, count = part.partition('=')
+        stage = stage.strip().lower()
+        if stage not in SWAP_PIPELINE_STAGES or not count.strip().isdigit() or int(count) < 1:
+            raise ValueError(f"Invalid pipeline stage workers '{part}' (stages: {', '.join(SWAP_PIPELINE_STAGES)})")
+        workers[stage] = int(count)
+    return workers
+
+
+def _sign_transactions(items):
+    """
+    Sign (tx, private_key) pairs and return (raw transaction hex, tx hash hex) for each, or
+    (None, error message) when one cannot be signed. Runs inside worker processes.
+    """
+    signed = []
+    for tx, private_key in items:
+        try:
+            signed_tx = Account.sign_transaction(tx, private_key)
+            signed.append((Web3.to_hex(signed_tx.rawTransaction), Web3.to_hex(signed_tx.hash)))
+        except Exception as e:
+            signed.append((None, str(e)))
+    return signed
+
+
+def _map_in_processes(function, items, mp_context=None):
+    """
+    Run function over chunks of items in a process pool and return the concatenated results, or None
+    when the pool cannot run it, e.g. workers started with "spawn" that cannot import this module by
+    name; callers then run function in-process instead.
+    """
+    workers = os.cpu_count() or 1
+    chunk_size = -(-len(items) // (workers * 4))
+    chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context) as executor:
+            return [result for chunk in executor.map(function, chunks) for result in chunk]
+    except (BrokenProcessPool, pickle.PicklingError, ImportError, AttributeError) as e:
+        console.log(f"[yellow]Process pool unavailable ({e or type(e).__name__}), continuing in this process[/yellow]")
+        return None
+
+
+# HTTP status codes worth retrying on the aggregator and gas APIs
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+# Serializes writes of the shared wallet address cache file (see SwapManager._write_address_cache)
+_address_cache_lock = threading.Lock()
+
+
+def _derive_addresses(private_keys):
+    """Derive the address of each private key (None if it fails). Runs inside worker processes."""
+    addresses = []
+    for private_key in private_keys:
+        try:
+            addresses.append(Account.from_key(private_key).address)
+        except Exception:
+            addresses.append(None)
+    return addresses
+
+
+class WalletFileSource:
+    """
+    Streams private keys from a wallet file one validated key at a time, so memory stays bounded
+    however large the file is.
+
+    Iterating yields {'line', 'offset', 'private_key'}, where offset is the byte position right after
+    the key's line: passing it back as start_offset (together with line as start_line) resumes after
+    that key; start_line alone skips that many lines from the top. With follow=True the source keeps
+    waiting for lines appended to the file until idle_timeout seconds pass without one (never, if
+    None) or stop() is called.
+    """
+
+    def __init__(self, path, start_offset=0, start_line=0, follow=False, poll_interval=1.0, idle_timeout=None):
+        self.path = path
+        self.offset = int(start_offset)
+        # Number of the last line consumed; resuming from a byte offset keeps the caller's numbering
+        self.line = int(start_line) if self.offset else 0
+        self._skip_lines = 0 if self.offset else int(start_line)
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.invalid_lines = []
+        self._stopped = threading.Event()
+
+    def stop(self):
+        """Make a following source finish after the line it is reading."""
+        self._stopped.set()
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            idle_since = time.monotonic()
+            while not self._stopped.is_set():
+                raw = f.readline()
+                if not raw or (self.follow and not raw.endswith(b'\n')):
+                    if not self.follow:
+                        return
+                    # Nothing new yet, or a line still being written: look again from the same offset
+                    f.seek(self.offset)
+                    if self.idle_timeout is not None and time.monotonic() - idle_since >= self.idle_timeout:
+                        return
+                    self._stopped.wait(self.poll_interval)
+                    continue
+                idle_since = time.monotonic()
+                self.offset += len(raw)
+                self.line += 1
+                if self.line <= self._skip_lines:
+                    continue
+                private_key = raw.decode('utf-8', 'ignore').strip()
+                if not private_key or private_key.startswith('#'):
+                    continue
+                match = PRIVATE_KEY_PATTERN.fullmatch(private_key)
+                if match is None:
+                    self.invalid_lines.append(self.line)
+                    del self.invalid_lines[:-100]  # keep only the latest ones
+                    continue
+                yield {'line': self.line, 'offset': self.offset, 'private_key': match.group(1)}
+
+    def chunks(self, size):
+        """Yield lists of at most `size` entries."""
+        chunk = []
+        for entry in self:
+            chunk.append(entry)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class SwapJournal:
+    """
+    Crash-safe, append-only JSONL journal of every wallet's progress through a swap run.
+
+    Each line is {'ts', 'run', <scope fields such as chain and job>, 'wallet', 'state', ...} with
+    state-specific fields like tx_hash and nonce. Lines are flushed and fsynced as they are written, so
+    after a crash the journal tells which wallets finished, which have a transaction in flight and which
+    never started. States: planned, route, approved, sent, confirmed, failed, timeout, error, skipped,
+    cancelled (plus dropped/replaced written while resuming; replaced is retried like dropped).
+    """
+
+    # Wallets in these states are not swapped again on resume
+    FINISHED_STATES = ('confirmed', 'skipped', 'cancelled')
+    # Wallets in these states have a swap that must be checked on chain before retrying; 'replaced' means
+    # a transaction none of whose hashes is ours took its nonce, which a later resume checks again
+    IN_FLIGHT_STATES = ('sent', 'timeout', 'replaced')
+
+    def __init__(self, path, run_id=None, scope=None, _shared=None):
+        self.path = path
+        # Timestamp plus random suffix: runs started within the same second must not share an id
+        self.run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.scope = dict(scope or {})
+        # Scoped views share one file handle and lock
+        self._shared = _shared if _shared is not None else {'lock': threading.Lock(), 'file': None}
+
+    def scoped(self, **scope):
+        """Return a view of this journal that adds the given fields (e.g. chain, job) to every record."""
+        return SwapJournal(self.path, self.run_id, {**self.scope, **scope}, self._shared)
+
+    def record(self, wallet, state, **fields):
+        """Append one state transition of a wallet and force it to disk."""
+        entry = {'ts': round(time.time(), 3), 'run': self.run_id, **self.scope, 'wallet': wallet, 'state': state}
+        entry.update({key: value for key, value in fields.items() if value is not None})
+        line = json.dumps(entry, default=str) + '\n'
+        with self._shared['lock']:
+            if self._shared['file'] is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._shared['file'] = open(self.path, 'a', encoding='utf-8')
+            f = self._shared['file']
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        with self._shared['lock']:
+            if self._shared['file'] is not None:
+                self._shared['file'].close()
+                self._shared['file'] = None
+
+    @staticmethod
+    def read(path):
+        """Yield the journal's entries, skipping a line torn by a crash mid-write."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    @classmethod
+    def last_run_id(cls, path):
+        """Run id of the most recent run in a journal file, or None if it has none."""
+        run_id = None
+        for entry in cls.read(path):
+            run_id = entry.get('run', run_id)
+        return run_id
+
+    def wallet_states(self):
+        """
+        {wallet: fields of its entries merged in order} for this run and scope; 'state' is the latest one.
+        'swap_hashes' and 'approval_hashes' list every hash journaled as sent / approved, fee-bumped
+        replacements included.
+        """
+        states = {}
+        for entry in self.read(self.path):
+            if entry.get('run') != self.run_id or any(entry.get(key) != value for key, value in self.scope.items()):
+                continue
+            state = states.setdefault(entry['wallet'], {'swap_hashes': [], 'approval_hashes': []})
+            state.update(entry)
+            hashes = {'sent': state['swap_hashes'], 'approved': state['approval_hashes']}.get(entry['state'])
+            if hashes is not None and entry.get('tx_hash') and entry['tx_hash'] not in hashes:
+                hashes.append(entry['tx_hash'])
+        return states
+
+
+class SignedTransactionFile:
+    """
+    JSONL file of signed raw transactions waiting to be broadcast, possibly from another host.
+
+    Each line is {'chain_id', 'wallet', 'kind' ('approval' or 'swap'), 'nonce', 'tx_hash', 'raw'};
+    a wallet's transactions are written in nonce order and private keys are never written.
+    put() matches queue.Queue, so either can receive the output of SwapManager.sign_swaps_offline.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+
+    def put(self, record):
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+
+    @staticmethod
+    def read(path):
+        """Yield the signed transactions of a file, skipping a line torn mid-write."""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+class StageTimer:
+    """
+    Per-wallet timing spans of the swap stages (balance, gas, route, allowance, approval, build,
+    sign, broadcast, confirm, ...). Every span is appended to a JSONL file as it finishes when
+    jsonl_path is given; summary() gives count/total/p50/p95/max per stage and write_prometheus()
+    exports the same as Prometheus text.
+    """
+
+    def __init__(self, labels=None, jsonl_path=None):
+        self.labels = dict(labels or {})
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._durations = {}  # stage -> [seconds]
+        self._file = None
+
+    @contextmanager
+    def span(self, stage, wallet=None):
+        """Time the enclosed block as one span of a stage; failed blocks are recorded with ok False."""
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record(stage, time.monotonic() - started, wallet, ok)
+
+    def record(self, stage, seconds, wallet=None, ok=True):
+        """Record a span measured elsewhere (e.g. broadcast -> receipt in a Future callback)."""
+        with self._lock:
+            self._durations.setdefault(stage, []).append(seconds)
+            if self.jsonl_path:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.jsonl_path)), exist_ok=True)
+                    self._file = open(self.jsonl_path, 'a', encoding='utf-8')
+                self._file.write(json.dumps({'ts': round(time.time(), 3), **self.labels, 'wallet': wallet,
+                                             'stage': stage, 'seconds': round(seconds, 6), 'ok': ok}) + '\n')
+                self._file.flush()
+
+    @staticmethod
+    def percentile(sorted_values, fraction):
+        """Nearest-rank percentile of an already sorted list."""
+        index = max(0, min(len(sorted_values) - 1, int(-(-fraction * len(sorted_values) // 1)) - 1))
+        return sorted_values[index]
+
+    def summary(self):
+        """{stage: {'count', 'total', 'p50', 'p95', 'max'}} in seconds, stages in first-seen order."""
+        with self._lock:
+            durations = {stage: sorted(values) for stage, values in self._durations.items()}
+        return {
+            stage: {'count': len(values), 'total': sum(values), 'p50': self.percentile(values, 0.5),
+                    'p95': self.percentile(values, 0.95), 'max': values[-1]}
+            for stage, values in durations.items()
+        }
+
+    def write_prometheus(self, path):
+        """Write the stage summary as a Prometheus text file (atomically, for the node_exporter textfile collector)."""
+        labels = ''.join(f'{key}="{value}",' for key, value in self.labels.items())
+        lines = ["# HELP mwswap_stage_seconds Duration of swap stages per wallet",
+                 "# TYPE mwswap_stage_seconds summary"]
+        for stage, stats in self.summary().items():
+            lines.append(f'mwswap_stage_seconds{{{labels}stage="{stage}",quantile="0.5"}} {stats["p50"]:.6f}')
+            lines.append(f'mwswap_stage_seconds{{{labels}stage="{stage}",quantile="0.95"}} {stats["p95"]:.6f}')
+            lines.append(f'mwswap_stage_seconds_sum{{{labels}stage="{stage}"}} {stats["total"]:.6f}')
+            lines.append(f'mwswap_stage_seconds_count{{{labels}stage="{stage}"}} {stats["count"]}')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class StagedPipeline:
+    """
+    Runs items through a fixed sequence of stages, each with its own worker threads, connected by
+    bounded queues: a stage that falls behind fills its input queue and holds back the stages before
+    it, so no more than queue_size items wait between two stages.
+
+    stages is a list of (name, function, workers). A stage function returns None to pass the item on,
+    or a final value that ends the item early; whatever the last stage returns is final. A Future
+    returned as final value frees the worker at once, and its result becomes the item's value
+    when it resolves (run() waits for it).
+    on_error(item, exception) turns an exception raised by a stage, or by such a Future, into the
+    item's final value.
+    """
+
+    _DONE = object()
+
+    def __init__(self, stages, queue_size=32, on_error=None):
+        self.stages = [(name, function, max(1, int(workers))) for name, function, workers in stages]
+        self.queue_size = max(1, int(queue_size))
+        self.on_error = on_error or (lambda item, error: error)
+
+    def run(self, items):
+        """Push every item through the stages and return the final values in input order."""
+        items = list(items)
+        results = [None] * len(items)
+        deferred = []  # (index, item, Future) of items whose final value is still being resolved
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        running = [workers for _, _, workers in self.stages]
+        lock = threading.Lock()
+        last = len(self.stages) - 1
+
+        def work(position):
+            function = self.stages[position][1]
+            while True:
+                entry = queues[position].get()
+                if entry is self._DONE:
+                    break
+                index, item = entry
+                try:
+                    value = function(item)
+                    finished = value is not None or position == last
+                except Exception as e:
+                    value, finished = self.on_error(item, e), True
+                if finished and isinstance(value, Future):
+                    with lock:
+                        deferred.append((index, item, value))
+                elif finished:
+                    results[index] = value
+                else:
+                    queues[position + 1].put((index, item))
+            # The last worker of a stage to finish closes the next stage
+            with lock:
+                running[position] -= 1
+                closing = running[position] == 0
+            if closing and position < last:
+                for _ in range(self.stages[position + 1][2]):
+                    queues[position + 1].put(self._DONE)
+
+        threads = [threading.Thread(target=work, args=(position,), name=f"pipeline-{name}", daemon=True)
+                   for position, (name, _, workers) in enumerate(self.stages) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for index, item in enumerate(items):
+            queues[0].put((index, item))
+        for _ in range(self.stages[0][2]):
+            queues[0].put(self._DONE)
+        for thread in threads:
+            thread.join()
+        for index, item, future in deferred:
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                results[index] = self.on_error(item, e)
+        return results
+
+
+class TokenMetadataCache:
+    """
+    Persistent JSON cache of token metadata that never changes (decimals, symbol, name, EIP-712 version,
+    EIP-2612 permit support), stored per chain next to the chain's token list.
+    Entries are only removed through invalidate().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            console.log(f"[bold red]Ignoring unreadable token metadata cache {self.path}: {e}[/bold red]")
+            return {}
+
+    def _save(self):
+        # Write to a temporary file first so a crash never leaves a truncated cache behind
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, token_address, field=None):
+        """Return the cached metadata dict of a token, or one field of it (None on a miss)."""
+        entry = self._data.get(str(token_address).lower())
+        if entry is None or field is None:
+            return entry
+        return entry.get(field)
+
+    def update(self, token_address, **fields):
+        """Merge fields into a token's entry and persist the cache, only if a value actually changed."""
+        with self._lock:
+            entry = self._data.setdefault(str(token_address).lower(), {})
+            if all(key in entry and entry[key] == value for key, value in fields.items()):
+                return
+            entry.update(fields)
+            self._save()
+
+    def invalidate(self, token_address=None):
+        """Drop one token's entry, or every entry when no token is given."""
+        with self._lock:
+            if token_address is None:
+                self._data = {}
+            else:
+                self._data.pop(str(token_address).lower(), None)
+            self._save()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class NonceManager:
+    """
+    Hands out transaction nonces per address locally so several transactions from one wallet
+    (approval + swap, or multiple swaps) can be broadcast back to back without waiting for receipts.
+    The counter starts from, and is resynced with, the node's pending transaction count. Each address
+    has its own lock, so fetching one wallet's count never holds up nonce allocation for the others.
+    """
+
+    # Send errors meaning the local counter disagrees with the node (e.g. after an external transaction)
+    NONCE_ERRORS = ("nonce too low", "nonce too high", "invalid nonce", "replacement transaction underpriced")
+
+    def __init__(self, w3):
+        self.w3 = w3
+        self._lock = threading.Lock()  # guards _locks only
+        self._locks = {}
+        self._next_nonce = {}
+
+    def _address_lock(self, address):
+        with self._lock:
+            return self._locks.setdefault(address, threading.Lock())
+
+    def allocate(self, address):
+        """Reserve and return the next nonce for an address."""
+        with self._address_lock(address):
+            if address not in self._next_nonce:
+                self._next_nonce[address] = self.w3.eth.get_transaction_count(address, 'pending')
+            nonce = self._next_nonce[address]
+            self._next_nonce[address] = nonce + 1
+            return nonce
+
+    def seed(self, address, pending_count):
+        """Start the counter of an address from an already fetched pending count (no-op if it is tracked)."""
+        with self._address_lock(address):
+            self._next_nonce.setdefault(address, pending_count)
+
+    def resync(self, address):
+        """Reset the local counter of an address to the node's pending transaction count."""
+        with self._address_lock(address):
+            self._next_nonce[address] = self.w3.eth.get_transaction_count(address, 'pending')
+            return self._next_nonce[address]
+
+    @classmethod
+    def is_nonce_error(cls, error):
+        message = str(error).lower()
+        return any(known in message for known in cls.NONCE_ERRORS)
+
+    def release(self, address, nonce, error=None):
+        """
+        Give back a nonce whose transaction was never broadcast. The latest nonce is simply reused;
+        releasing an older one would leave a gap, so the counter is resynced from the node instead.
+        error is what the send failed with: a nonce error resyncs even for the latest nonce, since
+        reusing it would fail the same way.
+        """
+        if error is None or not self.is_nonce_error(error):
+            with self._address_lock(address):
+                if self._next_nonce.get(address) == nonce + 1:
+                    self._next_nonce[address] = nonce
+                    return
+        self.resync(address)
+
+
+class ReceiptTracker:
+    """
+    Watches every in-flight transaction hash from one background thread. Receipts of all pending
+    hashes are fetched once per new block, and each hash's Future resolves with
+    {'status': 'success' | 'failed' | 'timeout', 'tx_hash': ..., 'receipt': ...}.
+    """
+
+    # Receipt fields returned as hex quantities by the raw JSON-RPC batch path
+    QUANTITY_FIELDS = ('status', 'blockNumber', 'gasUsed', 'cumulativeGasUsed', 'effectiveGasPrice', 'transactionIndex')
+
+    def __init__(self, w3, timeout=300, poll_interval=2, rpc_pool=None):
+        self.w3 = w3
+        # With a pool, all pending receipts are fetched in one JSON-RPC batch per poll
+        self.rpc_pool = rpc_pool
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._pending = {}  # tx hash hex -> (tx_hash, future, deadline)
+        self._thread = None
+
+    def track(self, tx_hash, callback=None):
+        """Start watching a transaction and return a Future for its outcome. callback gets the Future when done."""
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        with self._lock:
+            self._pending[tx_hash.hex()] = (tx_hash, future, time.monotonic() + self.timeout)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="receipt-tracker", daemon=True)
+                self._thread.start()
+        return future
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def is_pending(self, tx_hash_hex):
+        with self._lock:
+            return tx_hash_hex in self._pending
+
+    def add_replacement(self, tx_hash, replacement_hash):
+        """
+        Watch replacement_hash (same nonce, higher fees) as another version of tx_hash: their Future
+        resolves with whichever version is mined, and the timeout restarts for all of them.
+        Returns False if tx_hash is no longer pending.
+        """
+        with self._lock:
+            item = self._pending.get(tx_hash.hex())
+            if item is None:
+                return False
+            future = item[1]
+            deadline = time.monotonic() + self.timeout
+            for key, (pending_hash, pending_future, _) in list(self._pending.items()):
+                if pending_future is future:
+                    self._pending[key] = (pending_hash, pending_future, deadline)
+            self._pending[replacement_hash.hex()] = (replacement_hash, future, deadline)
+        return True
+
+    def _fetch_receipts(self, tx_hashes):
+        """Return {hash hex: receipt} for the hashes that are mined."""
+        receipts = {}
+        if self.rpc_pool is not None:
+            responses = self.rpc_pool.make_batch_request(
+                [('eth_getTransactionReceipt', [tx_hash.hex()]) for tx_hash in tx_hashes])
+            for tx_hash, response in zip(tx_hashes, responses):
+                try:
+                    receipt = rpc_result(response)
+                except ValueError:
+                    continue
+                if receipt:
+                    receipts[tx_hash.hex()] = {
+                        **receipt, **{field: int(receipt[field], 16) for field in self.QUANTITY_FIELDS
+                                      if isinstance(receipt.get(field), str)}}
+            return receipts
+        for tx_hash in tx_hashes:
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                continue
+            if receipt is not None:
+                receipts[tx_hash.hex()] = receipt
+        return receipts
+
+    def poll_once(self):
+        """Resolve every pending hash that is mined or timed out. Returns the number still pending."""
+        with self._lock:
+            pending = dict(self._pending)
+        receipts = self._fetch_receipts([tx_hash for tx_hash, _, _ in pending.values()]) if pending else {}
+        now = time.monotonic()
+        for key, (tx_hash, future, deadline) in pending.items():
+            receipt = receipts.get(key)
+            if receipt is not None:
+                status = 'success' if receipt['status'] == 1 else 'failed'
+            elif now >= deadline:
+                status = 'timeout'
+            else:
+                continue
+            with self._lock:
+                if self._pending.pop(key, None) is None:
+                    continue  # already resolved elsewhere
+                # Other versions of a replaced transaction can no longer be mined
+                for other in [other for other, item in self._pending.items() if item[1] is future]:
+                    self._pending.pop(other)
+            future.set_result({'status': status, 'tx_hash': key, 'receipt': receipt})
+        return self.pending_count()
+
+    def _run(self):
+        last_block = None
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+            try:
+                block = self.w3.eth.block_number
+                if block != last_block:
+                    last_block = block
+                    self.poll_once()
+                else:
+                    self._expire()
+            except Exception as e:
+                console.log(f"[bold red]Receipt tracker error: {e}[/bold red]")
+            time.sleep(self.poll_interval)
+
+    def _expire(self):
+        """Resolve hashes past their deadline without asking the node again."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [(key, item) for key, item in self._pending.items() if now >= item[2]]
+            for key, _ in expired:
+                self._pending.pop(key)
+        resolved = set()
+        for key, (_, future, _) in expired:
+            if id(future) not in resolved:
+                resolved.add(id(future))
+                future.set_result({'status': 'timeout', 'tx_hash': key, 'receipt': None})
+
+
+class BurstBroadcaster:
+    """
+    Pushes signed raw transactions out as fast as the RPC allows while keeping at most `window` of them
+    in flight (sent, receipt not yet known); submit() blocks while the window is full. Transactions
+    submitted close together go out as one JSON-RPC batch to every endpoint of the pool, and a hash that
+    was already submitted is not sent again. A transaction that neither the mempool nor a block knows
+    `rebroadcast_after` seconds after its last send is sent again. replace() swaps in a fee-bumped
+    replacement, so the superseded version is never rebroadcast.
+
+    submit() returns a Future resolving like ReceiptTracker.track, or with
+    {'status': 'error', 'tx_hash', 'detail'} when every endpoint rejected the transaction.
+    """
+
+    # Rejections meaning the node already has the transaction
+    KNOWN_ERRORS = ('already known', 'known transaction', 'already imported', 'alreadyknown')
+
+    def __init__(self, rpc_pool, receipt_tracker, window=200, rebroadcast_after=12, linger=0.005):
+        self.rpc_pool = rpc_pool
+        self.receipt_tracker = receipt_tracker
+        self.window = threading.BoundedSemaphore(max(1, int(window)))
+        self.rebroadcast_after = rebroadcast_after
+        self.linger = linger  # seconds to wait for more transactions to join a batch
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._futures = {}    # tx hash -> Future of every transaction submitted and not finished yet
+        self._in_flight = {}  # submitted tx hash -> {'raw', 'tx_hash' (latest version), 'sent_at'}
+        self._thread = None
+        self.stats = {'sent': 0, 'duplicates': 0, 'rejected': 0, 'rebroadcasts': 0}
+
+    def submit(self, raw_transaction, tx_hash, on_sent=None):
+        """
+        Queue a signed transaction (hex strings) for broadcasting and return its Future.
+        on_sent(ok) is called once its batch went out, with ok False when every endpoint rejected it.
+        """
+        with self._lock:
+            if tx_hash in self._futures:
+                self.stats['duplicates'] += 1
+                return self._futures[tx_hash]
+            future = self._futures[tx_hash] = Future()
+        self.window.acquire()
+        with self._lock:
+            self._queue.put((tx_hash, raw_transaction, future, on_sent))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="broadcaster", daemon=True)
+                self._thread.start()
+        return future
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
+
+    def replace(self, tx_hash, replacement_hash, raw_replacement):
+        """
+        Record that the in-flight transaction whose latest version is tx_hash was replaced (same nonce)
+        by replacement_hash: only the replacement is checked and rebroadcast from now on.
+        """
+        with self._lock:
+            for entry in self._in_flight.values():
+                if entry['tx_hash'] == tx_hash:
+                    entry.update(raw=raw_replacement, tx_hash=replacement_hash, sent_at=time.monotonic())
+                    return True
+        return False
+
+    def _run(self):
+        check_interval = max(0.05, min(1.0, self.rebroadcast_after / 4))
+        while True:
+            with self._lock:
+                if self._queue.empty() and not self._in_flight:
+                    self._thread = None
+                    return
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=check_interval))
+                time.sleep(self.linger)
+                while len(batch) < self.rpc_pool.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                if batch:
+                    self._send(batch)
+                self._rebroadcast_stale()
+            except Exception as e:
+                console.log(f"[bold red]Broadcaster error: {e}[/bold red]")
+
+    def _send(self, batch):
+        try:
+            responses = self.rpc_pool.broadcast_batch([raw for _, raw, _, _ in batch])
+        except Exception as e:
+            responses = [{'error': {'message': str(e)}}] * len(batch)
+        for (tx_hash, raw, future, on_sent), response in zip(batch, responses):
+            error = response.get('error')
+            message = str(error.get('message', error) if isinstance(error, dict) else error or '')
+            rejected = error is not None and not any(known in message.lower() for known in self.KNOWN_ERRORS)
+            if on_sent is not None:
+                on_sent(not rejected)
+            if rejected:
+                self.stats['rejected'] += 1
+                with self._lock:
+                    self._futures.pop(tx_hash, None)
+                self.window.release()
+                future.set_result({'status': 'error', 'tx_hash': tx_hash, 'detail': message})
+                continue
+            self.stats['sent'] += 1
+            with self._lock:
+                self._in_flight[tx_hash] = {'raw': raw, 'tx_hash': tx_hash, 'sent_at': time.monotonic()}
+            self.receipt_tracker.track(HexBytes(tx_hash),
+                                       callback=lambda handle, tx_hash=tx_hash, future=future:
+                                       self._finish(tx_hash, future, handle.result()))
+
+    def _finish(self, tx_hash, future, outcome):
+        with self._lock:
+            self._in_flight.pop(tx_hash, None)
+            self._futures.pop(tx_hash, None)
+        self.window.release()
+        future.set_result(outcome)
+
+    def _rebroadcast_stale(self):
+        """Send again the transactions that no node knows rebroadcast_after seconds after their last send."""
+        now = time.monotonic()
+        with self._lock:
+            stale = [(entry['tx_hash'], entry['raw'], entry) for entry in self._in_flight.values()
+                     if now - entry['sent_at'] >= self.rebroadcast_after]
+        if not stale:
+            return
+        responses = self.rpc_pool.make_batch_request([('eth_getTransactionByHash', [tx_hash]) for tx_hash, _, _ in stale])
+        missing = [raw for (_, raw, _), response in zip(stale, responses)
+                   if 'error' not in response and response.get('result') is None]
+        for _, _, entry in stale:
+            entry['sent_at'] = now
+        if missing:
+            self.stats['rebroadcasts'] += len(missing)
+            self.rpc_pool.broadcast_batch(missing)
+
+
+class FeeAccelerator:
+    """
+    Replace-by-fee for stuck transactions. A watched transaction still pending `stuck_after` seconds after
+    its last (re)send is re-signed at the same nonce with maxFeePerGas and maxPriorityFeePerGas raised by
+    bump_percent (at least the 10% nodes require for a replacement, and at least the current fees of
+    fee_source) and broadcast. Fees never exceed max_fee_multiplier times the original maxFeePerGas nor
+    max_fee_cap (wei); at that ceiling, or after max_replacements, the transaction is left as it is.
+    The receipt tracker watches every version and resolves with whichever one is mined.
+    """
+
+    # Fee increase nodes require before accepting a replacement at the same nonce
+    MIN_BUMP_PERCENT = 10
+
+    def __init__(self, w3, receipt_tracker, stuck_after=60, bump_percent=12.5, max_fee_multiplier=2.0,
+                 max_fee_cap=None, max_replacements=5, fee_source=None, on_replace=None, check_interval=5):
+        self.w3 = w3
+        self.receipt_tracker = receipt_tracker
+        self.stuck_after = stuck_after
+        self.bump_percent = max(float(bump_percent), self.MIN_BUMP_PERCENT)
+        self.max_fee_multiplier = max_fee_multiplier
+        self.max_fee_cap = max_fee_cap
+        self.max_replacements = int(max_replacements)
+        self.fee_source = fee_source
+        self.on_replace = on_replace
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._watched = {}  # hash hex of the latest version -> {'tx', 'sign', 'kind', 'sent_at', 'replacements', 'ceiling'}
+        self._thread = None
+        self.stats = {'replacements': 0, 'gave_up': 0}
+
+    @property
+    def enabled(self):
+        return self.stuck_after > 0 and self.max_replacements > 0 and bool(self.max_fee_multiplier or self.max_fee_cap)
+
+    def watch(self, tx_hash, tx, sign, kind='swap'):
+        """Watch a sent transaction (tx is its EIP-1559 dict); sign(tx) returns a signed replacement."""
+        if not self.enabled:
+            return
+        ceilings = [int(tx['maxFeePerGas'] * self.max_fee_multiplier)] if self.max_fee_multiplier else []
+        if self.max_fee_cap:
+            ceilings.append(int(self.max_fee_cap))
+        entry = {'tx': dict(tx), 'sign': sign, 'kind': kind, 'sent_at': time.monotonic(), 'replacements': 0,
+                 'ceiling': min(ceilings)}
+        with self._lock:
+            self._watched[tx_hash.hex()] = entry
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="fee-accelerator", daemon=True)
+                self._thread.start()
+
+    def watched_count(self):
+        with self._lock:
+            return len(self._watched)
+
+    def _run(self):
+        while True:
+            time.sleep(self.check_interval)
+            with self._lock:
+                if not self._watched:
+                    self._thread = None
+                    return
+            try:
+                self.check_once()
+            except Exception as e:
+                console.log(f"[bold red]Fee accelerator error: {e}[/bold red]")
+
+    def check_once(self):
+        """Replace every watched transaction that is stuck; stop watching the ones that are resolved."""
+        now = time.monotonic()
+        with self._lock:
+            watched = list(self._watched.items())
+        for key, entry in watched:
+            if now - entry['sent_at'] < self.stuck_after:
+                continue
+            if not self.receipt_tracker.is_pending(key):
+                self._forget(key)
+                continue
+            self._replace(key, entry)
+
+    def _forget(self, key):
+        with self._lock:
+            self._watched.pop(key, None)
+
+    @staticmethod
+    def _bumped(value, percent):
+        return -(-value * (100 + percent) // 100)
+
+    def _replace(self, key, entry):
+        tx = entry['tx']
+        max_fee = self._bumped(tx['maxFeePerGas'], self.bump_percent)
+        tip = self._bumped(tx['maxPriorityFeePerGas'], self.bump_percent)
+        if self.fee_source is not None:
+            try:
+                current_max_fee, current_tip = self.fee_source()
+                max_fee, tip = max(max_fee, int(current_max_fee)), max(tip, int(current_tip))
+            except Exception:
+                pass
+        max_fee = min(max_fee, entry['ceiling'])
+        tip = min(tip, max_fee)
+        if entry['replacements'] >= self.max_replacements:
+            reason = f"it was already replaced {entry['replacements']} times"
+        elif (max_fee < self._bumped(tx['maxFeePerGas'], self.MIN_BUMP_PERCENT)
+                or tip < self._bumped(tx['maxPriorityFeePerGas'], self.MIN_BUMP_PERCENT)):
+            reason = f"its fees are at the replace-by-fee ceiling ({Web3.from_wei(entry['ceiling'], 'gwei')} Gwei)"
+        else:
+            reason = None
+        if reason is not None:
+            console.log(f"[yellow]{entry['kind'].capitalize()} {key} (nonce {tx['nonce']}) is still pending but "
+                        f"is left as it is: {reason}[/yellow]")
+            self.stats['gave_up'] += 1
+            self._forget(key)
+            return
+
+        replacement = {**tx, 'maxFeePerGas': max_fee, 'maxPriorityFeePerGas': tip}
+        now = time.monotonic()
+        try:
+            raw = entry['sign'](replacement).rawTransaction
+            new_hash = self.w3.eth.send_raw_transaction(raw)
+        except Exception as e:
+            # e.g. nonce too low: a version was mined meanwhile and the receipt tracker will see it
+            console.log(f"[yellow]Could not replace {key}: {e}[/yellow]")
+            entry['sent_at'] = now
+            return
+        if not self.receipt_tracker.add_replacement(HexBytes(key), new_hash):
+            self._forget(key)
+            return
+        with self._lock:
+            self._watched.pop(key, None)
+            self._watched[new_hash.hex()] = {**entry, 'tx': replacement, 'sent_at': now,
+                                            'replacements': entry['replacements'] + 1}
+        self.stats['replacements'] += 1
+        console.log(f"[yellow]Replaced stuck {entry['kind']} {key} with {new_hash.hex()} (nonce {tx['nonce']}, "
+                    f"max fee {Web3.from_wei(max_fee, 'gwei')} Gwei)[/yellow]")
+        if self.on_replace is not None:
+            self.on_replace(entry['kind'], tx['from'], key, new_hash.hex(), tx['nonce'], raw)
+
+
+class GasOracle:
+    """
+    Shares suggested EIP-1559 fees between all swaps of a manager. The Infura gas API is asked at most
+    once per `ttl` seconds (or once per block with per_block=True); when the API URL is missing or the
+    request fails, fees are derived from the node's eth_feeHistory instead.
+    """
+
+    # eth_feeHistory reward percentile used for each gas tier
+    TIER_PERCENTILES = {"low": 10, "medium": 50, "high": 90}
+
+    def __init__(self, w3, api_url, http_request, ttl=15, per_block=False):
+        self.w3 = w3
+        self.api_url = api_url
+        self.http_request = http_request
+        self.ttl = ttl
+        self.per_block = per_block
+        self._lock = threading.Lock()
+        self._fees = None  # {tier: (max_fee_per_gas_wei, max_priority_fee_per_gas_wei)}
+        self._fetched_at = 0
+        self._block = None
+        self.source = None
+
+    def _api_available(self):
+        # The config builds the URL even without a key, which leaves "None" in the path
+        return bool(self.api_url) and "/None/" not in self.api_url
+
+    def _is_fresh(self):
+        if self._fees is None or time.monotonic() - self._fetched_at > self.ttl:
+            return False
+        return not self.per_block or self.w3.eth.block_number == self._block
+
+    def _fees_from_api(self):
+        response = self.http_request('GET', self.api_url)
+        response.raise_for_status()
+        gas_data = response.json()
+        return {
+            tier: (Web3.to_wei(float(gas_data[tier]['suggestedMaxFeePerGas']), 'gwei'),
+                   Web3.to_wei(float(gas_data[tier]['suggestedMaxPriorityFeePerGas']), 'gwei'))
+            for tier in self.TIER_PERCENTILES
+        }
+
+    def _fees_from_fee_history(self):
+        history = self.w3.eth.fee_history(10, 'latest', list(self.TIER_PERCENTILES.values()))
+        next_base_fee = history['baseFeePerGas'][-1]
+        fees = {}
+        for index, tier in enumerate(self.TIER_PERCENTILES):
+            rewards = sorted(block_rewards[index] for block_rewards in history['reward']) or [0]
+            priority_fee = rewards[len(rewards) // 2]
+            # Leave room for the base fee to double before the transaction is mined
+            fees[tier] = (2 * next_base_fee + priority_fee, priority_fee)
+        return fees
+
+    def refresh(self):
+        """Fetch fees now, from the gas API or the node as fallback."""
+        fees, source = None, None
+        if self._api_available():
+            try:
+                fees, source = self._fees_from_api(), "gas API"
+            except Exception as e:
+                console.log(f"[yellow]Gas API unavailable ({e}), falling back to eth_feeHistory[/yellow]")
+        if fees is None:
+            fees, source = self._fees_from_fee_history(), "eth_feeHistory"
+        self._fees, self.source = fees, source
+        self._fetched_at = time.monotonic()
+        if self.per_block:
+            self._block = self.w3.eth.block_number
+        return fees
+
+    def get_fees(self, tier):
+        """Return (max_fee_per_gas, max_priority_fee_per_gas) in wei for a tier, refreshing if stale."""
+        with self._lock:
+            if not self._is_fresh():
+                self.refresh()
+            return self._fees[tier.lower()]
+
+
+class RouteCache:
+    """
+    Short-lived cache of aggregator route responses keyed by (chain, tokenIn, tokenOut, amountIn).
+    Concurrent lookups of the same key share one in-flight request, and every caller gets its own
+    deep copy because the swap flow mutates the routeSummary (e.g. to attach a permit).
+    """
+
+    def __init__(self, ttl=10):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (expires_at, route)
+        self._in_flight = {}  # key -> Future
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+    def get_or_fetch(self, key, fetch):
+        """Return the cached route for key, wait for an identical in-flight request, or call fetch()."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.stats['hits'] += 1
+                return copy.deepcopy(entry[1])
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+
+        if not owner:
+            return copy.deepcopy(future.result())
+
+        try:
+            route = fetch()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._in_flight.pop(key, None)
+            # Failed lookups are shared with the waiting callers but never cached
+            if route is not None:
+                self._entries = {k: v for k, v in self._entries.items() if v[0] > now}
+                self._entries[key] = (time.monotonic() + self.ttl, route)
+        future.set_result(route)
+        return copy.deepcopy(route)
+
+
+def bucket_amount(amount, precision):
+    """
+    Round an integer amount down to `precision` significant digits (precision <= 0 keeps it as is),
+    so near-identical amounts from different wallets map to the same route cache key.
+    """
+    if precision <= 0:
+        return amount
+    digits = len(str(amount))
+    if digits <= precision:
+        return amount
+    factor = 10 ** (digits - precision)
+    return amount // factor * factor
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by every KyberSwap aggregator call. A 429 halves the request rate and pauses
+    all callers for the Retry-After period; each successful call then raises the rate again step by
+    step until it is back at the configured limit. `metrics` counts calls, throttled (429) responses,
+    retries and failures so concurrency can be sized against the client-id quota.
+    """
+
+    def __init__(self, rate=10, burst=10, min_rate=0.5):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.min_rate = min(float(min_rate), self.max_rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.metrics = {'calls': 0, 'throttled': 0, 'retried': 0, 'failed': 0, 'wait_seconds': 0.0}
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self.metrics['calls'] += 1
+                    return
+                delay = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+                self.metrics['wait_seconds'] += delay
+            time.sleep(delay)
+
+    def on_throttled(self, retry_after=None):
+        """Record a 429: slow down and, if the server said so, pause everyone for retry_after seconds."""
+        with self._lock:
+            self.metrics['throttled'] += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def on_success(self):
+        """Recover a bit of the configured rate after a successful call."""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+    def record(self, metric):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def summary(self):
+        with self._lock:
+            return dict(self.metrics, rate=round(self.rate, 2))
+
+
+_aggregator_limiter = None
+_aggregator_limiter_lock = threading.Lock()
+
+
+def get_aggregator_limiter():
+    """Process-wide limiter for the aggregator, so every SwapManager shares the same client-id quota."""
+    global _aggregator_limiter
+    with _aggregator_limiter_lock:
+        if _aggregator_limiter is None:
+            _aggregator_limiter = AdaptiveRateLimiter(rate=config.KYBERSWAP_RATE_LIMIT, burst=config.KYBERSWAP_BURST)
+        return _aggregator_limiter
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds, or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RPCEndpointError(Exception):
+    """Raised when an RPC endpoint (or every endpoint of a pool) cannot serve a request."""
+
+
+class RPCProviderPool(BaseProvider):
+    """
+    Web3 provider spread over several JSON-RPC endpoints of one chain.
+
+    Reads go to the healthy endpoint with the lowest measured latency and fail over to the next one
+    on connection errors, 429/5xx responses or rate-limit errors; an endpoint that fails is skipped for
+    `cooldown` seconds. eth_sendRawTransaction is sent to every healthy endpoint at once for faster
+    propagation and the first accepted answer is returned.
+    """
+
+    FANOUT_METHODS = ('eth_sendRawTransaction',)
+    # JSON-RPC error codes that mean the endpoint is overloaded rather than the request being wrong
+    ENDPOINT_ERROR_CODES = (-32005, 429)
+
+    def __init__(self, urls, timeout=10, cooldown=30, session=None, latency_smoothing=0.3, batch_size=50):
+        super().__init__()
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            raise ValueError("RPCProviderPool needs at least one RPC URL")
+        self.endpoints = [
+            {'url': url, 'label': urlsplit(url).netloc or url, 'latency': None,
+             'failures': 0, 'requests': 0, 'down_until': 0.0}
+            for url in urls
+        ]
+        self.timeout = timeout
+        self.cooldown = cooldown
+        self.latency_smoothing = latency_smoothing
+        self.batch_size = max(1, int(batch_size))
+        self._session = session
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._executor = None
+
+    @property
+    def session(self):
+        """Keep-alive HTTP session shared by every endpoint (created on first use)."""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=len(self.endpoints), pool_maxsize=32)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+        return self._session
+
+    def ranked_endpoints(self):
+        """Healthy endpoints, unmeasured first and then by latency, followed by the ones cooling down."""
+        now = time.monotonic()
+        with self._lock:
+            healthy = [e for e in self.endpoints if e['down_until'] <= now]
+            down = [e for e in self.endpoints if e['down_until'] > now]
+        healthy.sort(key=lambda e: -1 if e['latency'] is None else e['latency'])
+        down.sort(key=lambda e: e['down_until'])
+        return healthy + down
+
+    def _post(self, endpoint, payload):
+        """Send one JSON-RPC payload to an endpoint and record its latency or failure."""
+        started = time.monotonic()
+        try:
+            response = self.session.request('POST', endpoint['url'], json=payload, timeout=self.timeout)
+            if response.status_code == 429 or response.status_code >= 500:
+                raise RPCEndpointError(f"HTTP {response.status_code}")
+            data = response.json()
+            error = data.get('error') if isinstance(data, dict) else None
+            if isinstance(error, dict) and error.get('code') in self.ENDPOINT_ERROR_CODES:
+                raise RPCEndpointError(error.get('message') or f"error {error.get('code')}")
+        except Exception as e:
+            with self._lock:
+                endpoint['failures'] += 1
+                endpoint['down_until'] = time.monotonic() + self.cooldown
+            raise RPCEndpointError(f"{endpoint['label']}: {e}") from e
+
+        elapsed = time.monotonic() - started
+        with self._lock:
+            previous = endpoint['latency']
+            endpoint['latency'] = elapsed if previous is None else (
+                previous + self.latency_smoothing * (elapsed - previous))
+            endpoint['failures'] = 0
+            endpoint['down_until'] = 0.0
+            endpoint['requests'] += 1
+        return data
+
+    def _send(self, payload, label):
+        """Send a payload to the best endpoint, failing over through the others."""
+        errors = []
+        for endpoint in self.ranked_endpoints():
+            try:
+                return self._post(endpoint, payload)
+            except RPCEndpointError as e:
+                errors.append(str(e))
+        raise RPCEndpointError(f"All RPC endpoints failed for {label}: {'; '.join(errors)}")
+
+    def make_request(self, method, params):
+        payload = {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': next(self._ids)}
+        if method in self.FANOUT_METHODS and len(self.endpoints) > 1:
+            return self._broadcast(payload)
+        return self._send(payload, method)
+
+    def make_batch_request(self, calls):
+        """
+        Send independent calls [(method, params), ...] as JSON-RPC batch arrays, at most batch_size
+        calls per POST, and return their response dicts in the same order as the calls.
+        """
+        responses = []
+        for start in range(0, len(calls), self.batch_size):
+            payload = [{'jsonrpc': '2.0', 'method': method, 'params': params, 'id': next(self._ids)}
+                       for method, params in calls[start:start + self.batch_size]]
+            data = self._send(payload, f"batch of {len(payload)} calls")
+            if isinstance(data, dict):
+                # The endpoint answered the whole batch with a single error
+                data = [{**data, 'id': request['id']} for request in payload]
+            by_id = {item.get('id'): item for item in data if isinstance(item, dict)}
+            missing = {'code': -32603, 'message': 'missing from batch response'}
+            responses.extend(by_id.get(request['id'], {'id': request['id'], 'error': missing}) for request in payload)
+        return responses
+
+    def _fan_out(self, endpoints, payload):
+        """Submit the payload to every given endpoint in parallel and return the futures."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=len(self.endpoints), thread_name_prefix="rpc")
+        return [self._executor.submit(self._post, endpoint, payload) for endpoint in endpoints]
+
+    def _broadcast(self, payload):
+        """
+        Send a transaction to every healthy endpoint (all of them if none is healthy).
+        Returns the first successful response, else the first JSON-RPC error (e.g. nonce too low).
+        """
+        now = time.monotonic()
+        endpoints = [e for e in self.ranked_endpoints() if e['down_until'] <= now] or self.endpoints
+        rejected = None
+        errors = []
+        for future in as_completed(self._fan_out(endpoints, payload)):
+            try:
+                data = future.result()
+            except RPCEndpointError as e:
+                errors.append(str(e))
+                continue
+            if 'error' not in data:
+                return data
+            rejected = rejected or data
+        if rejected is not None:
+            return rejected
+        raise RPCEndpointError(f"Broadcast failed on every RPC endpoint: {'; '.join(errors)}")
+
+    def broadcast_batch(self, raw_transactions):
+        """
+        Send signed transactions as JSON-RPC batches of eth_sendRawTransaction (batch_size per POST) to
+        every healthy endpoint at once. Returns one response dict per transaction, in order: an accepted
+        answer from any endpoint, else the first rejection (e.g. nonce too low).
+        """
+        now = time.monotonic()
+        endpoints = [e for e in self.ranked_endpoints() if e['down_until'] <= now] or self.endpoints
+        responses = []
+        for start in range(0, len(raw_transactions), self.batch_size):
+            payload = [{'jsonrpc': '2.0', 'method': 'eth_sendRawTransaction', 'params': [raw], 'id': next(self._ids)}
+                       for raw in raw_transactions[start:start + self.batch_size]]
+            best = {}
+            errors = []
+            for future in as_completed(self._fan_out(endpoints, payload)):
+                try:
+                    data = future.result()
+                except RPCEndpointError as e:
+                    errors.append(str(e))
+                    continue
+                if isinstance(data, dict):
+                    data = [{**data, 'id': request['id']} for request in payload]
+                for item in data:
+                    if not isinstance(item, dict):
+                        continue
+                    current = best.get(item.get('id'))
+                    if current is None or ('error' in current and 'error' not in item):
+                        best[item.get('id')] = item
+            failed = {'code': -32603, 'message': '; '.join(errors) or 'missing from batch response'}
+            responses.extend(best.get(request['id'], {'id': request['id'], 'error': failed}) for request in payload)
+        return responses
+
+    def health_check(self):
+        """Probe every endpoint with eth_blockNumber; returns {endpoint: latency in seconds or None}."""
+        payload = {'jsonrpc': '2.0', 'method': 'eth_blockNumber', 'params': [], 'id': next(self._ids)}
+        results = {}
+        for endpoint, future in zip(self.endpoints, self._fan_out(self.endpoints, payload)):
+            try:
+                future.result()
+                results[endpoint['label']] = endpoint['latency']
+            except RPCEndpointError:
+                results[endpoint['label']] = None
+        return results
+
+    def is_connected(self, show_traceback=False):
+        return any(latency is not None for latency in self.health_check().values())
+
+    def stats(self):
+        """Per-endpoint latency (ms), request and failure counts, and health."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {'endpoint': e['label'],
+                 'latency_ms': None if e['latency'] is None else round(e['latency'] * 1000, 1),
+                 'requests': e['requests'], 'failures': e['failures'], 'healthy': e['down_until'] <= now}
+                for e in self.endpoints
+            ]
+
+
 class SwapManager:
-    def __init__(self, chain_config, KYBERSWAP_API_HEADERS=config.KYBERSWAP_API_HEADERS):
+    def __init__(self, chain_config, KYBERSWAP_API_HEADERS=config.KYBERSWAP_API_HEADERS,
+                 max_concurrent_swaps=config.MAX_CONCURRENT_SWAPS,
+                 http_pool_size=config.HTTP_POOL_SIZE, http_timeout=config.HTTP_TIMEOUT,
+                 http_max_retries=config.HTTP_MAX_RETRIES, http_backoff=config.HTTP_BACKOFF, console=None):
         """
         Initialize the SwapManager with a specific chain configuration object.
+        console replaces the manager's own rich Console (e.g. a quiet one for benchmarks).
         """
-        self.console = Console()
+        self.console = console or Console()
         self.KYBERSWAP_API_HEADERS = KYBERSWAP_API_HEADERS
 
+        # Upper bound on wallets processed at the same time in concurrent mode
+        self.max_concurrent_swaps = max(1, int(max_concurrent_swaps))
+
+        # Shared keep-alive HTTP session for the aggregator and gas APIs (created on first use)
+        self.http_pool_size = max(int(http_pool_size), self.max_concurrent_swaps)
+        self.http_timeout = http_timeout
+        self.http_max_retries = int(http_max_retries)
+        self.http_backoff = float(http_backoff)
+        self._http_session = None
+        self._http_lock = threading.Lock()
+        # Token bucket shared by all aggregator calls of the process
+        self.aggregator_limiter = get_aggregator_limiter()
+
         # Store the chain config (Polygon, OP, Base, etc.)
         self.chain_config = chain_config
 
         # Extract commonly used fields
-        self.rpc_url = chain_config.ALCHEMY_RPC_URL
+        self.rpc_urls = list(getattr(chain_config, 'RPC_URLS', None) or [chain_config.ALCHEMY_RPC_URL])
+        self.rpc_url = self.rpc_urls[0]
         self.wallet_file = chain_config.WALLET_FILE
         self.contracts_file = chain_config.TOKENS_KYBER_FILE
         self.INFURA_GAS_API_URL = chain_config.INFURA_GAS_API_URL
@@ -40,8 +1527,68 @@ class SwapManager:
         self.chain_id = int(chain_config.CHAIN_ID)
         self.chain_name = chain_config.CHAIN_NAME
 
-        # Web3 provider
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
+        # Web3 provider: every RPC endpoint of the chain behind one failover / latency-routing pool
+        self.rpc_pool = RPCProviderPool(self.rpc_urls, timeout=config.RPC_TIMEOUT, cooldown=config.RPC_COOLDOWN,
+                                        batch_size=config.RPC_BATCH_SIZE)
+        self.w3 = Web3(self.rpc_pool)
+
+        # Fees are fetched once per GAS_CACHE_TTL (or block) and shared by every swap
+        self.gas_oracle = GasOracle(self.w3, self.INFURA_GAS_API_URL, self.http_request,
+                                    ttl=config.GAS_CACHE_TTL, per_block=config.GAS_CACHE_PER_BLOCK)
+
+        # Identical route lookups within ROUTE_CACHE_TTL share one aggregator request
+        self.route_cache = RouteCache(ttl=config.ROUTE_CACHE_TTL)
+        self.route_amount_precision = config.ROUTE_AMOUNT_PRECISION
+
+        # Local per-address nonce allocation (see NonceManager)
+        self.nonce_manager = NonceManager(self.w3)
+        # Background receipt watcher shared by every transaction this manager sends
+        self.receipt_tracker = ReceiptTracker(self.w3, timeout=config.RECEIPT_TIMEOUT,
+                                              poll_interval=config.RECEIPT_POLL_INTERVAL, rpc_pool=self.rpc_pool)
+        # Signed swaps of the concurrent pipeline and offline-signed files go out in batches with at most
+        # BROADCAST_WINDOW transactions in flight, rebroadcast when no node knows them after REBROADCAST_AFTER
+        self.broadcaster = BurstBroadcaster(self.rpc_pool, self.receipt_tracker, window=config.BROADCAST_WINDOW,
+                                            rebroadcast_after=config.REBROADCAST_AFTER)
+        # Swaps and approvals still pending RBF_STUCK_AFTER seconds after they were sent are replaced at the
+        # same nonce with higher fees, up to RBF_MAX_FEE_MULTIPLIER x their fee and RBF_MAX_FEE_GWEI
+        self.accelerator = FeeAccelerator(
+            self.w3, self.receipt_tracker, stuck_after=config.RBF_STUCK_AFTER, bump_percent=config.RBF_BUMP_PERCENT,
+            max_fee_multiplier=config.RBF_MAX_FEE_MULTIPLIER,
+            max_fee_cap=Web3.to_wei(config.RBF_MAX_FEE_GWEI, 'gwei') if config.RBF_MAX_FEE_GWEI else None,
+            max_replacements=config.RBF_MAX_REPLACEMENTS, fee_source=lambda: self.gas_oracle.get_fees('high'),
+            on_replace=self._transaction_replaced)
+        # Broadcast the swap right behind a pending approval instead of waiting for its receipt
+        self.pipeline_approvals = config.PIPELINE_APPROVALS
+
+        # Concurrent batches run as a staged pipeline with per-stage workers (see run_swap_pipeline)
+        self.staged_pipeline = config.STAGED_PIPELINE
+        self.pipeline_workers = parse_stage_workers(config.SWAP_PIPELINE_WORKERS)
+        self.pipeline_queue_size = config.SWAP_PIPELINE_QUEUE
+        # Offline bulk signing (see sign_transactions) moves to a process pool from this many transactions
+        self.signing_process_threshold = config.SIGNING_PROCESS_POOL_THRESHOLD
+
+        # Pre-flight planning pass before non-interactive batches (see plan_swaps); the allowance is read
+        # for the KyberSwap router, which routes normally return as routerAddress
+        self.preflight = config.PREFLIGHT_SWAPS
+        self.router_address = getattr(chain_config, 'KYBERSWAP_ROUTER_ADDRESS', config.KYBERSWAP_ROUTER_ADDRESS)
+
+        # Per-stage timing spans of every swap (see StageTimer); TIMINGS_FILE picks the export format
+        self.timings_file = config.TIMINGS_FILE
+        self.timer = StageTimer(labels={'chain': self.chain_name},
+                                jsonl_path=self.timings_file if str(self.timings_file).endswith('.jsonl') else None)
+
+        # Optional SwapJournal recording every wallet's progress, and the journal state of the run being resumed
+        self.journal = None
+        self.resume_state = None
+
+        # Multicall3 used to batch read-only calls (see snapshot_wallets)
+        self.multicall_address = getattr(chain_config, 'MULTICALL3_ADDRESS', config.MULTICALL3_ADDRESS)
+        self.multicall_batch_size = config.MULTICALL_BATCH_SIZE
+
+        # Contract registry: ABIs are parsed once and contract objects reused per (address, ABI)
+        self._abis = {}
+        self._contracts = {}
+        self._contracts_lock = threading.Lock()
 
         # Logging
         logging.basicConfig(level=logging.INFO, handlers=[RichHandler(console=self.console)])
@@ -53,9 +1600,18 @@ class SwapManager:
         # Lists to store loaded wallets
         self.wallet_addresses = []
         self.wallet_private_keys = []
+        # Key files at least this large derive addresses in a process pool
+        self.wallet_process_threshold = config.WALLET_PROCESS_POOL_THRESHOLD
+        # multiprocessing context of the CPU-bound process pools (None = the platform's default start method)
+        self.process_context = None
 
         self.create_placeholder_file(self.wallet_file, 'wallets')
         self.create_placeholder_file(self.contracts_file, 'contracts')
+
+        # Immutable token metadata, persisted in resources/<CHAIN>/token_metadata.json
+        self.token_cache = TokenMetadataCache(
+            os.path.join(os.path.dirname(self.contracts_file), TOKEN_METADATA_FILE)
+        )
         # Load token contracts
         self.tokens = self.load_contracts()
 
@@ -64,8 +1620,93 @@ class SwapManager:
         self.kyberswap_api_build = chain_config.KYBERSWAP_API_BUILD
         self.kyberswap_api_encode = chain_config.KYBERSWAP_API_ENCODE
 
+    @property
+    def http(self):
+        """Connection-pooled requests session shared by every aggregator and gas API call."""
+        if self._http_session is None:
+            with self._http_lock:
+                if self._http_session is None:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(
+                        pool_connections=4,
+                        pool_maxsize=self.http_pool_size
+                    )
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._http_session = session
+        return self._http_session
+
+    def http_request(self, method, url, limiter=None, **kwargs):
+        """
+        Send a request through the pooled session with a timeout, retrying connection errors,
+        timeouts and 429/5xx responses with jittered exponential backoff (or the server's Retry-After).
+        Calls made with a limiter wait for it before every attempt and report throttling to it.
+        The last response is returned (or the last exception raised) once retries are exhausted.
+        """
+        kwargs.setdefault('timeout', self.http_timeout)
+        for attempt in range(self.http_max_retries + 1):
+            last_attempt = attempt == self.http_max_retries
+            retry_after = None
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                response = self.http.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if last_attempt:
+                    if limiter is not None:
+                        limiter.record('failed')
+                    raise
+                self.logger.warning(f"{method} {url} failed ({e}), retrying...")
+            else:
+                if response.status_code == 429:
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if limiter is not None:
+                        limiter.on_throttled(retry_after)
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    if limiter is not None:
+                        if response.status_code in RETRY_STATUS_CODES:
+                            limiter.record('failed')
+                        else:
+                            limiter.on_success()
+                    return response
+                self.logger.warning(f"{method} {url} returned HTTP {response.status_code}, retrying...")
+            if limiter is not None:
+                limiter.record('retried')
+            # Full jitter keeps many workers from retrying in lockstep
+            delay = random.uniform(0, self.http_backoff * (2 ** attempt))
+            time.sleep(max(delay, retry_after or 0))
+
+    def get_abi(self, abi_name):
+        """Parsed ABI by its config name, looked up on the chain config first and config.py second."""
+        abi = self._abis.get(abi_name)
+        if abi is None:
+            source = getattr(self.chain_config, abi_name, None) or getattr(config, abi_name)
+            abi = self._abis[abi_name] = json.loads(source)
+        return abi
+
+    def get_contract(self, address, abi_name):
+        """Return the cached contract object for (address, ABI name), building it on first use."""
+        key = (address.lower(), abi_name)
+        contract = self._contracts.get(key)
+        if contract is None:
+            with self._contracts_lock:
+                contract = self._contracts.get(key)
+                if contract is None:
+                    contract = self._contracts[key] = self.w3.eth.contract(address=address, abi=self.get_abi(abi_name))
+        return contract
+
+    def call_uint(self, target, calldata):
+        """eth_call with pre-encoded calldata, returning the result as an unsigned integer."""
+        result = bytes(self.w3.eth.call({'to': target, 'data': calldata}))
+        if not result:
+            raise ValueError(f"Empty result calling {calldata[:10]} on {target}")
+        return int.from_bytes(result[:32], 'big')
+
     def load_contracts(self):
-        """Load token contract addresses and symbols from the contracts file."""
+        """
+        Load token contract addresses and symbols from the contracts file.
+        Raises OSError if the file cannot be read and ValueError if it holds an invalid address.
+        """
         tokens = {}
         try:
             with open(self.contracts_file, 'r', encoding='utf-8') as f:
@@ -77,9 +1718,12 @@ class SwapManager:
                         tokens[f"{symbol} ({address})"] = address
                         self.console.log(f"[bold blue]Loaded token:[/bold blue] {symbol} ({address})")
             self.console.log("[bold green]Loaded token contracts successfully.[/bold green]")
+        except OSError as e:
+            self.console.log(f"[bold red]Error loading contracts file: {e}[/bold red]")
+            raise
         except Exception as e:
             self.console.log(f"[bold red]Error loading contracts file: {e}[/bold red]")
-            sys.exit(1)
+            raise ValueError(f"Invalid contracts file {self.contracts_file}: {e}") from e
         return tokens
 
     def create_placeholder_file(self, file_path, content_type):
@@ -95,63 +1739,139 @@ class SwapManager:
             self.console.log(f"[bold green]Created placeholder file at {file_path}[/bold green]")
 
     def load_wallets_from_file(self):
+        """
+        Load the wallets of the wallet file. Raises OSError if it cannot be read and ValueError if its
+        keys cannot be loaded; exiting is left to the interactive entry point.
+        """
         try:
             with open(self.wallet_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    private_key = line.strip()
-                    if private_key:
-                        # Validate private key
-                        original_pk = private_key
-                        if private_key.startswith(('0x', '0X')):
-                            private_key = private_key[2:]
-                        if len(private_key) != 64 or not all(c in '0123456789abcdefABCDEF' for c in private_key):
-                            self.console.log(f"[bold red]Invalid private key format skipped: {original_pk}[/bold red]")
-                            continue
-                        self.wallet_private_keys.append(private_key)
-                        try:
-                            account = Account.from_key(private_key)
-                            address = account.address
-                            self.wallet_addresses.append(address)
-                            self.console.log(f"[bold green]Loaded wallet address: {address}[/bold green]")
-                        except Exception as e:
-                            self.console.log(f"[bold red]Failed to derive address from private key {original_pk}: {e}[/bold red]")
+                self.load_wallets_from_keys(f)
             self.console.log("[bold green]All wallet addresses loaded successfully from file![/bold green]")
         except FileNotFoundError:
             self.console.log(f"[bold red]Error:[/bold red] The file '{self.wallet_file}' was not found.")
-            sys.exit(1)
+            raise
+        except OSError as e:
+            self.console.log(f"[bold red]Error loading wallets from file: {e}[/bold red]")
+            raise
         except Exception as e:
             self.console.log(f"[bold red]Error loading wallets from file: {e}[/bold red]")
-            sys.exit(1)
+            raise ValueError(f"Could not load wallets from {self.wallet_file}: {e}") from e
+
+    def load_wallets_from_keys(self, keys):
+        """
+        Validate private keys in bulk, derive their addresses and append both to the wallet lists.
+        Invalid keys are skipped and reported by line number; the keys themselves are never logged.
+        """
+        valid_keys = []
+        invalid_lines = []
+        for line_number, line in enumerate(keys, start=1):
+            private_key = line.strip()
+            if not private_key or private_key.startswith('#'):
+                continue
+            match = PRIVATE_KEY_PATTERN.fullmatch(private_key)
+            if match is None:
+                invalid_lines.append(line_number)
+                continue
+            valid_keys.append(match.group(1))
+
+        if invalid_lines:
+            shown = ", ".join(str(n) for n in invalid_lines[:10]) + (" ..." if len(invalid_lines) > 10 else "")
+            self.console.log(f"[bold red]Skipped {len(invalid_lines)} invalid private keys (lines {shown})[/bold red]")
+
+        failed = 0
+        for private_key, address in zip(valid_keys, self.derive_addresses(valid_keys)):
+            if address is None:
+                failed += 1
+                continue
+            self.wallet_private_keys.append(private_key)
+            self.wallet_addresses.append(address)
+        if failed:
+            self.console.log(f"[bold red]Failed to derive addresses for {failed} private keys[/bold red]")
+        self.console.log(f"[bold green]Loaded {len(self.wallet_addresses)} wallet addresses[/bold green]")
+
+    def derive_addresses(self, private_keys, use_cache=True):
+        """
+        Return the address of every private key (None where derivation fails), in order.
+        Addresses are looked up in a key-hash -> address cache next to the wallet file first; the rest
+        are derived in a process pool for large inputs and added to the cache. Streaming runs pass
+        use_cache=False so memory does not grow with the size of the cache file.
+        """
+        if not use_cache:
+            return self._derive_uncached(private_keys)
+
+        cache_path = os.path.join(os.path.dirname(os.path.abspath(self.wallet_file)), WALLET_ADDRESS_CACHE_FILE)
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+        key_hashes = [hashlib.sha256(private_key.lower().encode()).hexdigest() for private_key in private_keys]
+        missing = [index for index, key_hash in enumerate(key_hashes) if key_hash not in cache]
+        if missing:
+            todo = [private_keys[index] for index in missing]
+            for index, address in zip(missing, self._derive_uncached(todo)):
+                if address is not None:
+                    cache[key_hashes[index]] = address
+            try:
+                self._write_address_cache(cache_path, {key_hashes[index]: cache[key_hashes[index]]
+                                                       for index in missing if key_hashes[index] in cache})
+            except OSError as e:
+                self.console.log(f"[yellow]Could not write wallet address cache {cache_path}: {e}[/yellow]")
+            self.console.log(f"[bold blue]Derived {len(todo)} addresses, {len(private_keys) - len(todo)} from cache[/bold blue]")
+
+        return [cache.get(key_hash) for key_hash in key_hashes]
+
+    @staticmethod
+    def _write_address_cache(cache_path, new_entries):
+        """
+        Merge new key-hash -> address entries into the cache file. Managers of a multi-chain plan share
+        the file from parallel threads: writes are serialized and merged with what is on disk, and each
+        goes through its own temporary file before the atomic replace.
+        """
+        with _address_cache_lock:
+            try:
+                with open(cache_path, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+            except (OSError, ValueError):
+                cache = {}
+            cache.update(new_entries)
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(cache_path),
+                                             prefix=os.path.basename(cache_path), suffix='.tmp',
+                                             delete=False) as f:
+                json.dump(cache, f)
+            try:
+                os.replace(f.name, cache_path)
+            except OSError:
+                os.unlink(f.name)
+                raise
+
+    def _derive_uncached(self, private_keys):
+        """Derive addresses in-process, or in a process pool once there are wallet_process_threshold keys."""
+        if len(private_keys) < self.wallet_process_threshold or (os.cpu_count() or 1) < 2:
+            return _derive_addresses(private_keys)
+        addresses = _map_in_processes(_derive_addresses, private_keys, self.process_context)
+        return _derive_addresses(private_keys) if addresses is None else addresses
 
     def load_private_keys_from_file(self):
-        """Load private keys from the default wallet file."""
+        """Load private keys from the default wallet file (raises OSError / ValueError like load_wallets_from_file)."""
         try:
             with open(self.wallet_file, 'r', encoding='utf-8') as f:
                 self.wallet_private_keys = []
-                for line in f:
-                    private_key = line.strip()
-                    if private_key:
-                        self.console.log(f"[yellow]Original key: {private_key}[/yellow]")
-                        # Remove 0x
-                        if private_key.startswith(('0x', '0X')):
-                            private_key = private_key[2:]
-                        # Validate
-                        if len(private_key) != 64:
-                            self.console.log(f"[bold red]Invalid private key length: {len(private_key)} chars[/bold red]")
-                            continue
-                        if not all(c in '0123456789abcdefABCDEF' for c in private_key):
-                            self.console.log(f"[bold red]Invalid hex characters in key[/bold red]")
-                            continue
-
-                        self.console.log(f"[green]Valid key added: {private_key[:8]}...[/green]")
-                        self.wallet_private_keys.append(private_key)
+                self.wallet_addresses = []
+                self.load_wallets_from_keys(f)
             self.console.log(f"[bold blue]Total valid keys loaded: {len(self.wallet_private_keys)}[/bold blue]")
+        except OSError as e:
+            self.console.log(f"[bold red]Error loading private keys from file: {e}[/bold red]")
+            raise
         except Exception as e:
             self.console.log(f"[bold red]Error loading private keys from file: {e}[/bold red]")
-            sys.exit(1)
+            raise ValueError(f"Could not load private keys from {self.wallet_file}: {e}") from e
 
     def load_private_keys_from_gui(self):
         """Load private keys manually via a GUI."""
+        # Tk is only imported when the GUI is actually opened
+        from customtkinter import CTk, CTkTextbox, CTkButton, CTkLabel, CTkFrame
         keys = []
 
         def add_keys():
@@ -179,16 +1899,10 @@ class SwapManager:
 
         root.mainloop()
 
-        self.wallet_private_keys = [key.strip() for key in keys if key.strip()]
-        # Derive addresses
-        for private_key in self.wallet_private_keys:
-            try:
-                account = Account.from_key(private_key)
-                address = account.address
-                self.wallet_addresses.append(address)
-                self.console.log(f"[bold green]Loaded wallet address: {address}[/bold green]")
-            except Exception as e:
-                self.console.log(f"[bold red]Failed to derive address from private key: {e}[/bold red]")
+        # Validate keys and derive addresses
+        self.wallet_private_keys = []
+        self.wallet_addresses = []
+        self.load_wallets_from_keys(keys)
 
         self.console.log(f"[bold green]Loaded {len(self.wallet_private_keys)} private keys manually from GUI[/bold green]")
 
@@ -204,16 +1918,10 @@ class SwapManager:
             if key:
                 keys.append(key)
         
-        self.wallet_private_keys = keys
-        # Derive addresses from private keys
-        for private_key in self.wallet_private_keys:
-            try:
-                account = Account.from_key(private_key)
-                address = account.address
-                self.wallet_addresses.append(address)
-                self.console.log(f"[bold green]Loaded wallet address: {address}[/bold green]")
-            except Exception as e:
-                self.console.log(f"[bold red]Failed to derive address from private key: {e}[/bold red]")
+        # Validate keys and derive addresses
+        self.wallet_private_keys = []
+        self.wallet_addresses = []
+        self.load_wallets_from_keys(keys)
 
         self.console.log(f"[bold green]Loaded {len(self.wallet_private_keys)} private keys from CLI[/bold green]")
 
@@ -239,130 +1947,171 @@ class SwapManager:
                 self.load_private_keys_from_gui()
 
     def check_token_balance(self, token_address, account_address):
-        """Check the balance of a specific token for a given account."""
+        """
+        Check the balance of a specific token for a given account.
+        The balance, the decimals (unless cached) and the account's pending nonce are read in one
+        JSON-RPC batch; the nonce seeds the NonceManager so the approval and swap need no extra round trip.
+        """
         try:
-            if token_address == '0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE':
-                if self.chain_name == "ethereum":
-                    balance = self.w3.eth.get_balance(account_address)
-                    decimals = 18 
-                    human_readable_balance = balance / (10 ** decimals)
-                    return balance , human_readable_balance , decimals
-                # For native token, check balance using self.native_token
-                abi = json.loads(self.chain_config.TOKEN_ABI)
-                token_contract = self.w3.eth.contract(address=self.native_token, abi=abi)
-                balance = token_contract.functions.balanceOf(account_address).call()
-                decimals = token_contract.functions.decimals().call()
-                human_readable_balance = balance / (10 ** decimals)
-                return balance, human_readable_balance, decimals
+            calls = [('eth_getTransactionCount', [account_address, 'pending'])]
+            decimals = None
+            if token_address == '0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE' and self.chain_name == "ethereum":
+                decimals = 18
+                calls.append(('eth_getBalance', [account_address, 'latest']))
             else:
-                # For other tokens, use contract calls
-                abi = json.loads(self.chain_config.TOKEN_ABI)
-                token_contract = self.w3.eth.contract(address=token_address, abi=abi)
-                balance = token_contract.functions.balanceOf(account_address).call()
-                decimals = token_contract.functions.decimals().call()
-                human_readable_balance = balance / (10 ** decimals)
-                return balance, human_readable_balance, decimals
-        except json.JSONDecodeError as e:
-            self.console.log(f"[bold red]Error parsing TOKEN_ABI: {str(e)}[/bold red]")
-            self.console.log(f"[yellow]ABI content: {self.chain_config.TOKEN_ABI}[/yellow]")
-            raise
+                if token_address == '0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE':
+                    # For native token, check balance using self.native_token
+                    token_address = self.native_token
+                # For other tokens, call balanceOf/decimals with pre-encoded calldata
+                calls.append(('eth_call', [{'to': token_address, 'data': encode_call('balanceOf', account_address)}, 'latest']))
+                decimals = self.token_cache.get(token_address, 'decimals')
+                if decimals is None:
+                    calls.append(('eth_call', [{'to': token_address, 'data': encode_call('decimals')}, 'latest']))
+
+            responses = self.rpc_pool.make_batch_request(calls)
+            try:
+                self.nonce_manager.seed(account_address, hex_to_uint(rpc_result(responses[0])))
+            except ValueError:
+                pass  # the nonce is fetched again when the first transaction is sent
+            balance = hex_to_uint(rpc_result(responses[1]))
+            if decimals is None:
+                decimals = hex_to_uint(rpc_result(responses[2]))
+                self.token_cache.update(token_address, decimals=decimals)
+            human_readable_balance = balance / (10 ** decimals)
+            return balance, human_readable_balance, decimals
         except Exception as e:
             self.console.log(f"[bold red]Error in check_token_balance: {str(e)}[/bold red]")
             raise
 
-    def fetch_suggested_fees(self):
-        """Fetch suggested gas fees from the Infura or another Gas API."""
-        api_url = self.INFURA_GAS_API_URL
+    def prompt_gas_tier(self):
+        """Ask which gas tier to use."""
+        return questionary.select(
+            "Select gas tier to use:",
+            choices=["low", "medium", "high"]
+        ).ask()
 
+    def fetch_suggested_fees(self, tier=None):
+        """
+        Get suggested gas fees for a tier from the shared gas oracle (Infura gas API, or the node's
+        fee history as fallback). If no tier is given the user is prompted for one.
+        """
         try:
-            response = requests.get(api_url)
-            response.raise_for_status()
-            gas_data = response.json()
-
             # Prompt user for gas tier
-            tier = questionary.select(
-                "Select gas tier to use:",
-                choices=["low", "medium", "high"]
-            ).ask().lower()
-
-            max_fee_per_gas = float(gas_data[tier]['suggestedMaxFeePerGas'])
-            max_priority_fee_per_gas = float(gas_data[tier]['suggestedMaxPriorityFeePerGas'])
+            if tier is None:
+                tier = self.prompt_gas_tier()
 
-            max_fee_per_gas_wei = Web3.to_wei(max_fee_per_gas, 'gwei')
-            max_priority_fee_per_gas_wei = Web3.to_wei(max_priority_fee_per_gas, 'gwei')
+            max_fee_per_gas_wei, max_priority_fee_per_gas_wei = self.gas_oracle.get_fees(tier)
 
             self.console.log(
-                f"[bold yellow]Fetched gas fees - Max Fee Per Gas:[/bold yellow] {max_fee_per_gas} Gwei, "
-                f"[bold yellow]Max Priority Fee Per Gas:[/bold yellow] {max_priority_fee_per_gas} Gwei"
+                f"[bold yellow]Gas fees ({tier}, {self.gas_oracle.source}) - Max Fee Per Gas:[/bold yellow] "
+                f"{Web3.from_wei(max_fee_per_gas_wei, 'gwei')} Gwei, "
+                f"[bold yellow]Max Priority Fee Per Gas:[/bold yellow] {Web3.from_wei(max_priority_fee_per_gas_wei, 'gwei')} Gwei"
             )
 
             return max_fee_per_gas_wei, max_priority_fee_per_gas_wei
 
-        except requests.exceptions.HTTPError as http_err:
-            self.logger.error(f"HTTP error occurred while fetching gas fees: {http_err}")
         except Exception as err:
             self.logger.error(f"An error occurred while fetching gas fees: {err}")
 
         return None, None
 
-    def send_approval_transaction(self, private_key, token_address, spender, amount, max_fee_per_gas, max_priority_fee_per_gas):
-        """Approve the KyberSwap router (spender) to spend the specified token."""
+    def send_approval_transaction(self, private_key, token_address, spender, amount, max_fee_per_gas, max_priority_fee_per_gas,
+                                  approval_choice=None, wait=True):
+        """
+        Approve the KyberSwap router (spender) to spend the specified token.
+        approval_choice is "Exact amount" or "Unlimited amount"; the user is prompted if it is None.
+        With wait=True the receipt is awaited and True/False returned for success; with wait=False
+        the transaction hash is returned right after broadcasting.
+        """
         try:
             account = Account.from_key(private_key)
-            abi = json.loads(self.chain_config.TOKEN_ABI)
-            token_contract = self.w3.eth.contract(address=token_address, abi=abi)
 
-            approval_choice = questionary.select(
-                "Do you want to approve the exact amount or unlimited amount?",
-                choices=["Exact amount", "Unlimited amount"]
-            ).ask()
+            if approval_choice is None:
+                approval_choice = questionary.select(
+                    "Do you want to approve the exact amount or unlimited amount?",
+                    choices=APPROVAL_CHOICES
+                ).ask()
 
-            if approval_choice == "Exact amount":
-                approval_amount = int(amount + 1)
-            else:
-                approval_amount = 2**256 - 1
+            approval_amount = self.approval_amount(amount, approval_choice)
 
-            tx = token_contract.functions.approve(
-                spender,
-                approval_amount
-            ).build_transaction({
-                'chainId': self.chain_id,
-                'from': account.address,
-                'nonce': self.w3.eth.get_transaction_count(account.address),
-                'maxFeePerGas': max_fee_per_gas,
-                'maxPriorityFeePerGas': max_priority_fee_per_gas,
-                'gas': 100000,  # Adjust as needed
-                'type': 2
-            })
-
-            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            self.console.log(f"[green]Approval transaction sent: {tx_hash.hex()}[/green]")
-
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
-            if receipt['status'] == 1:
+            nonce = self.nonce_manager.allocate(account.address)
+            try:
+                tx = self.build_approval_transaction(account.address, token_address, spender, approval_amount, nonce,
+                                                     max_fee_per_gas, max_priority_fee_per_gas)
+
+                with self.timer.span('approval_sign', account.address):
+                    signed_tx = self.w3.eth.account.sign_transaction(tx, private_key)
+                with self.timer.span('approval_broadcast', account.address):
+                    tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+            except Exception as e:
+                self.nonce_manager.release(account.address, nonce, e)
+                raise
+            self.console.log(f"[green]Approval transaction sent: {tx_hash.hex()} (nonce {nonce})[/green]")
+            self.record_progress(account.address, 'approved', tx_hash=tx_hash.hex(), nonce=nonce)
+            self.accelerator.watch(tx_hash, tx, self._signer(private_key), kind='approval')
+
+            if not wait:
+                return tx_hash
+
+            outcome = self.receipt_tracker.track(tx_hash).result()
+            if outcome['status'] == 'success':
                 self.console.log("[bold green]Approval transaction confirmed successfully![/bold green]")
-            else:
-                self.console.log("[bold red]Approval transaction failed![/bold red]")
+                return True
+            self.console.log(f"[bold red]Approval transaction {outcome['status']}![/bold red]")
+            return False
 
         except Exception as e:
             self.console.log(f"[bold red]Error in send_approval_transaction: {e}[/bold red]")
             raise
 
+    @staticmethod
+    def approval_amount(amount, approval_choice):
+        """Allowance granted for an approval choice: the swap amount (plus one) or unlimited."""
+        return int(amount + 1) if approval_choice == "Exact amount" else 2**256 - 1
+
+    def build_approval_transaction(self, owner, token_address, spender, approval_amount, nonce,
+                                   max_fee_per_gas, max_priority_fee_per_gas):
+        """Unsigned EIP-1559 approve(spender, approval_amount) transaction of owner at the given nonce."""
+        token_contract = self.get_contract(token_address, 'TOKEN_ABI')
+        return token_contract.functions.approve(
+            spender,
+            approval_amount
+        ).build_transaction({
+            'chainId': self.chain_id,
+            'from': owner,
+            'nonce': nonce,
+            'maxFeePerGas': max_fee_per_gas,
+            'maxPriorityFeePerGas': max_priority_fee_per_gas,
+            'gas': 100000,  # Adjust as needed
+            'type': 2
+        })
+
     def check_eip2612_support(self, token_address, owner_address):
         """Check if the token supports EIP-2612 permit (permit(), nonces, DOMAIN_SEPARATOR)."""
         self.console.log("[yellow]Checking EIP-2612 support...[/yellow]")
+        cached = self.token_cache.get(token_address, 'permit')
+        if cached is not None:
+            self.console.log(f"[green]EIP-2612 support (cached): {cached}[/green]")
+            return cached
+        supported = self._probe_eip2612_support(token_address, owner_address)
+        if supported is not None:
+            self.token_cache.update(token_address, permit=supported)
+        return bool(supported)
+
+    def _probe_eip2612_support(self, token_address, owner_address):
+        """
+        Probe a token over RPC for permit(), nonces and DOMAIN_SEPARATOR.
+        Returns True/False, or None when the check itself failed and should not be cached: only a missing
+        function or a revert is a definite answer, while other errors (web3 reports JSON-RPC errors such
+        as rate limits as plain ValueError) may be transient.
+        """
         try:
             # Some chains might not define MINIMAL_ABI_PERMIT
             if not hasattr(self.chain_config, 'MINIMAL_ABI_PERMIT'):
                 self.console.log("[red]✗ This chain config does not have MINIMAL_ABI_PERMIT defined[/red]")
-                return False
+                return None
 
-            minimal_abi = json.loads(self.chain_config.MINIMAL_ABI_PERMIT)
-            token_contract = self.w3.eth.contract(
-                address=self.w3.to_checksum_address(token_address),
-                abi=minimal_abi
-            )
+            token_contract = self.get_contract(self.w3.to_checksum_address(token_address), 'MINIMAL_ABI_PERMIT')
 
             # Check permit()
             try:
@@ -372,19 +2121,22 @@ class SwapManager:
                 self.console.log("[red]✗ No permit function found[/red]")
                 return False
 
-            # Check nonces
-            try:
-                nonce_function = token_contract.get_function_by_signature('nonces(address)')
-                _ = nonce_function(owner_address).call()
-                self.console.log("[green]✓ Found nonces(address) function[/green]")
-            except (ValueError, ABIFunctionNotFound, ContractLogicError):
+            # Check nonces; lookups fail with ValueError when the ABI lacks the signature, calls only count
+            # as unsupported when they revert
+            for signature, args in (('nonces(address)', (owner_address,)), ('nonces()', ())):
+                try:
+                    nonce_function = token_contract.get_function_by_signature(signature)
+                except (ValueError, ABIFunctionNotFound):
+                    continue
                 try:
-                    nonce_function = token_contract.get_function_by_signature('nonces()')
-                    _ = nonce_function().call()
-                    self.console.log("[green]✓ Found nonces() function[/green]")
-                except (ValueError, ABIFunctionNotFound, ContractLogicError):
-                    self.console.log("[red]✗ No working nonces function found[/red]")
-                    return False
+                    nonce_function(*args).call()
+                except (ABIFunctionNotFound, ContractLogicError):
+                    continue
+                self.console.log(f"[green]✓ Found {signature} function[/green]")
+                break
+            else:
+                self.console.log("[red]✗ No working nonces function found[/red]")
+                return False
 
             # Check DOMAIN_SEPARATOR
             try:
@@ -399,7 +2151,7 @@ class SwapManager:
 
         except Exception as e:
             self.console.log(f"[bold red]Error checking EIP-2612 support: {str(e)}[/bold red]")
-            return False
+            return None
 
     def get_permit_data(self, token_address, owner, spender, value, deadline, private_key):
         """Generate permit data for EIP-2612 approval."""
@@ -409,16 +2161,19 @@ class SwapManager:
                 self.console.log("[red]✗ This chain config does not have ERC20_PERMIT_ABI defined[/red]")
                 return None
 
-            erc20_abi = json.loads(self.chain_config.ERC20_PERMIT_ABI)
-            token_contract = self.w3.eth.contract(address=self.w3.to_checksum_address(token_address), abi=erc20_abi)
+            token_contract = self.get_contract(self.w3.to_checksum_address(token_address), 'ERC20_PERMIT_ABI')
+
+            cached = self.token_cache.get(token_address) or {}
 
             # name
-            try:
-                name = token_contract.functions.name().call()
-                self.console.log(f"[green]Token name: {name}[/green]")
-            except Exception as e:
-                self.console.log(f"[bold red]Error getting token name: {e}[/bold red]")
-                return None
+            name = cached.get('name')
+            if name is None:
+                try:
+                    name = token_contract.functions.name().call()
+                    self.console.log(f"[green]Token name: {name}[/green]")
+                except Exception as e:
+                    self.console.log(f"[bold red]Error getting token name: {e}[/bold red]")
+                    return None
 
             # nonce
             try:
@@ -432,21 +2187,33 @@ class SwapManager:
                     self.console.log(f"[bold red]Error getting nonce: {e1}, {e2}[/bold red]")
                     return None
 
-            # version
-            try:
-                version = token_contract.functions.version().call()
-                self.console.log(f"[green]Token version: {version}[/green]")
-            except Exception:
-                version = '1'
-                self.console.log("[yellow]Version not found, defaulting to '1'[/yellow]")
+            # version; the '1' fallback is only cached when the token really has no version() (a revert),
+            # never after an RPC error
+            version = cached.get('version')
+            version_cacheable = version is None
+            if version is None:
+                try:
+                    version = token_contract.functions.version().call()
+                    self.console.log(f"[green]Token version: {version}[/green]")
+                except (ABIFunctionNotFound, ContractLogicError):
+                    version = '1'
+                    self.console.log("[yellow]Version not found, defaulting to '1'[/yellow]")
+                except Exception as e:
+                    version, version_cacheable = '1', False
+                    self.console.log(f"[yellow]Could not read version ({e}), using '1' for this permit[/yellow]")
 
-            # domain separator (optional check)
-            try:
-                token_contract.functions.DOMAIN_SEPARATOR().call()
-                self.console.log("[green]Successfully got DOMAIN_SEPARATOR[/green]")
-            except Exception as e:
-                self.console.log(f"[bold red]Error getting DOMAIN_SEPARATOR: {e}[/bold red]")
-                return None
+            # domain separator (optional check, skipped once the token is known to support permits)
+            if not cached.get('permit'):
+                try:
+                    token_contract.functions.DOMAIN_SEPARATOR().call()
+                    self.console.log("[green]Successfully got DOMAIN_SEPARATOR[/green]")
+                except Exception as e:
+                    self.console.log(f"[bold red]Error getting DOMAIN_SEPARATOR: {e}[/bold red]")
+                    return None
+            if version_cacheable:
+                self.token_cache.update(token_address, name=name, version=version)
+            else:
+                self.token_cache.update(token_address, name=name)
 
             # Build typed data
             domain = {
@@ -506,15 +2273,250 @@ class SwapManager:
         try:
             if token_address == '0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE':
                 return float('inf')  # Native token doesn't need allowance
-            abi = json.loads(self.chain_config.TOKEN_ABI)
-            token_contract = self.w3.eth.contract(address=token_address, abi=abi)
-            allowance = token_contract.functions.allowance(owner_address, spender_address).call()
-            return allowance
+            return self.call_uint(token_address, encode_call('allowance', owner_address, spender_address))
         except Exception as e:
             self.console.log(f"[bold red]Error checking allowance: {e}[/bold red]")
             raise
 
+    def multicall(self, calls):
+        """
+        Execute read-only calls through Multicall3.aggregate3, MULTICALL_BATCH_SIZE calls per eth_call.
+        calls is a list of (target, calldata); returns (success, return_data) for each call in the same order.
+        A failing call does not revert the batch, it just comes back with success False.
+        """
+        multicall = self.get_contract(self.multicall_address, 'MULTICALL3_ABI')
+        results = []
+        for start in range(0, len(calls), self.multicall_batch_size):
+            chunk = [(target, True, calldata) for target, calldata in calls[start:start + self.multicall_batch_size]]
+            results.extend(multicall.functions.aggregate3(chunk).call())
+        return [(bool(success), bytes(return_data)) for success, return_data in results]
+
+    def _decode_call_result(self, output_type, success, return_data):
+        """Decode a single multicall return value, or return None if the call failed."""
+        if not success or not return_data:
+            return None
+        try:
+            return self.w3.codec.decode([output_type], return_data)[0]
+        except Exception:
+            # Some old tokens return name/symbol as bytes32 instead of string
+            if output_type == 'string' and len(return_data) == 32:
+                return return_data.rstrip(b'\0').decode('utf-8', 'ignore')
+            return None
+
+    def _balance_source(self, token_address):
+        """
+        Contract to read balanceOf/decimals from for a token, mirroring check_token_balance.
+        Returns None when the balance is the chain's native coin (read with eth_getBalance).
+        """
+        if token_address == KYBER_NATIVE_TOKEN:
+            return None if self.chain_name == "ethereum" else self.native_token
+        return token_address
+
+    def snapshot_wallets(self, token_addresses, owners=None, spender=None, include_permit=False):
+        """
+        Read balances, decimals, allowances (when a spender is given) and optionally EIP-2612 metadata
+        for every (owner, token) pair with a handful of Multicall3 eth_calls.
+
+        Returns {'tokens': {token: meta}, 'wallets': {owner: {token: entry}}}:
+          meta:  'decimals' and, with include_permit, 'name', 'version' and 'permit' (DOMAIN_SEPARATOR readable)
+          entry: 'balance', 'human_balance', 'allowance' and, with include_permit, 'permit_nonce'
+        Values that could not be read are None. Owners default to the loaded wallet addresses.
+        """
+        owners = list(self.wallet_addresses if owners is None else owners)
+
+        # Each pending call remembers where its decoded value goes: (target, calldata, type, container, key)
+        pending = []
+        tokens = {}
+        for token in token_addresses:
+            source = self._balance_source(token)
+            meta = tokens[token] = {'decimals': None}
+            if source is None:
+                meta['decimals'] = 18
+            elif self.token_cache.get(source, 'decimals') is not None:
+                meta['decimals'] = self.token_cache.get(source, 'decimals')
+            else:
+                pending.append((source, encode_call('decimals'), 'uint8', meta, 'decimals'))
+            if include_permit and token != KYBER_NATIVE_TOKEN:
+                meta.update({'name': None, 'version': None, 'permit': None})
+                pending.append((token, encode_call('name'), 'string', meta, 'name'))
+                pending.append((token, encode_call('version'), 'string', meta, 'version'))
+                pending.append((token, encode_call('DOMAIN_SEPARATOR'), 'bytes32', meta, 'permit'))
+
+        wallets = {}
+        for owner in owners:
+            wallets[owner] = {}
+            for token in token_addresses:
+                entry = wallets[owner][token] = {'balance': None, 'human_balance': None, 'allowance': None}
+                source = self._balance_source(token)
+                if source is None:
+                    pending.append((self.multicall_address, encode_call('getEthBalance', owner), 'uint256', entry, 'balance'))
+                else:
+                    pending.append((source, encode_call('balanceOf', owner), 'uint256', entry, 'balance'))
+
+                if token == KYBER_NATIVE_TOKEN:
+                    entry['allowance'] = float('inf')  # Native token doesn't need allowance
+                elif spender:
+                    pending.append((token, encode_call('allowance', owner, spender), 'uint256', entry, 'allowance'))
+                if include_permit and token != KYBER_NATIVE_TOKEN:
+                    entry['permit_nonce'] = None
+                    pending.append((token, encode_call('nonces', owner), 'uint256', entry, 'permit_nonce'))
+
+        results = self.multicall([(target, calldata) for target, calldata, _, _, _ in pending])
+        for (_, _, output_type, container, key), (success, return_data) in zip(pending, results):
+            container[key] = self._decode_call_result(output_type, success, return_data)
+
+        for meta in tokens.values():
+            if 'permit' in meta:
+                meta['permit'] = meta['permit'] is not None
+                meta['version'] = meta['version'] or '1'
+        for owner_entries in wallets.values():
+            for token, entry in owner_entries.items():
+                decimals = tokens[token]['decimals']
+                if entry['balance'] is not None and decimals is not None:
+                    entry['human_balance'] = entry['balance'] / (10 ** decimals)
+
+        self.console.log(f"[bold green]Snapshot of {len(owners)} wallets x {len(tokens)} tokens "
+                         f"read with {len(pending)} calls in "
+                         f"{-(-len(pending) // self.multicall_batch_size)} multicall request(s)[/bold green]")
+        return {'tokens': tokens, 'wallets': wallets}
+
+    def prefetch_token_metadata(self, token_addresses=None):
+        """
+        Fill the token metadata cache for the given tokens (default: every token in the tokens file)
+        with one multicall snapshot, so later swaps skip those RPC reads entirely.
+        """
+        token_addresses = list(self.tokens.values() if token_addresses is None else token_addresses)
+        symbols = {address.lower(): label.split(' (')[0] for label, address in self.tokens.items()}
+        erc20_tokens = [token for token in token_addresses if token != KYBER_NATIVE_TOKEN]
+        # nonces(ZERO_ADDRESS) is readable on every permit token, which mirrors check_eip2612_support
+        snapshot = self.snapshot_wallets(erc20_tokens, owners=[ZERO_ADDRESS], include_permit=True)
+        for token in erc20_tokens:
+            meta = snapshot['tokens'][token]
+            fields = {'permit': bool(meta['permit']) and snapshot['wallets'][ZERO_ADDRESS][token].get('permit_nonce') is not None}
+            if meta['decimals'] is not None:
+                fields['decimals'] = meta['decimals']
+            if meta['name'] is not None:
+                fields['name'] = meta['name']
+                fields['version'] = meta['version']
+            if token.lower() in symbols:
+                fields['symbol'] = symbols[token.lower()]
+            self.token_cache.update(token, **fields)
+            self.console.log(f"[bold blue]Cached token metadata:[/bold blue] {token} {fields}")
+        self.console.log(f"[bold green]Token metadata cache holds {len(self.token_cache)} tokens ({self.token_cache.path})[/bold green]")
+
+    def seed_nonces(self, owners):
+        """Read the pending nonce of every owner with JSON-RPC batches and seed the NonceManager with them."""
+        try:
+            responses = self.rpc_pool.make_batch_request(
+                [('eth_getTransactionCount', [owner, 'pending']) for owner in owners])
+        except Exception as e:
+            self.console.log(f"[yellow]Could not prefetch nonces: {e}[/yellow]")
+            return
+        for owner, response in zip(owners, responses):
+            try:
+                self.nonce_manager.seed(owner, hex_to_uint(rpc_result(response)))
+            except ValueError:
+                continue  # fetched again when the wallet sends its first transaction
+
+    def plan_swaps(self, settings, owners=None):
+        """
+        Pre-flight pass: read every wallet's from-token balance, allowance for the KyberSwap router,
+        native gas balance and pending nonce up front with bulk reads, then decide per wallet whether it
+        swaps, needs an approval (or permit) first, or is skipped.
+
+        Returns one row per owner, in order:
+          {'wallet', 'action': 'swap' | 'approve' | 'permit' | 'skip', 'reason', 'balance', 'human_balance',
+           'decimals', 'amount_in_wei', 'allowance', 'spender', 'native_balance'}
+        swap_tokens_kyberswap consumes a row through settings['preflight'] instead of reading again.
+        """
+        owners = list(self.wallet_addresses if owners is None else owners)
+        from_token = settings['from_token']
+        native = from_token == KYBER_NATIVE_TOKEN
+        tokens = [from_token] if native else [from_token, KYBER_NATIVE_TOKEN]
+        include_permit = not native and self.token_cache.get(from_token, 'permit') is None
+
+        snapshot = self.snapshot_wallets(tokens, owners=owners, spender=self.router_address, include_permit=include_permit)
+        self.seed_nonces(owners)
+
+        meta = snapshot['tokens'][from_token]
+        decimals = meta['decimals']
+        source = self._balance_source(from_token)
+        if decimals is not None and source is not None:
+            self.token_cache.update(source, decimals=decimals)
+        permit = None if native else self.token_cache.get(from_token, 'permit')
+        if include_permit and owners:
+            # Same rule as prefetch_token_metadata: DOMAIN_SEPARATOR and nonces(owner) must both be readable
+            permit = bool(meta['permit']) and snapshot['wallets'][owners[0]][from_token].get('permit_nonce') is not None
+            fields = {'permit': permit}
+            if meta['name'] is not None:
+                fields.update(name=meta['name'], version=meta['version'])
+            self.token_cache.update(from_token, **fields)
+
+        plan = []
+        for owner in owners:
+            entry = snapshot['wallets'][owner][from_token]
+            native_balance = snapshot['wallets'][owner][KYBER_NATIVE_TOKEN]['balance']
+            row = {'wallet': owner, 'action': 'skip', 'reason': '', 'balance': entry['balance'],
+                   'human_balance': entry['human_balance'], 'decimals': decimals, 'amount_in_wei': 0,
+                   'allowance': entry['allowance'], 'spender': self.router_address, 'native_balance': native_balance}
+            plan.append(row)
+            if entry['balance'] is None or decimals is None:
+                row['reason'] = 'Could not read token balance'
+                continue
+            if entry['balance'] <= 0:
+                row['reason'] = 'Zero balance for the input token'
+                continue
+            if native_balance is not None and native_balance <= 0:
+                row['reason'] = 'No native balance for gas'
+                continue
+            if settings.get('amount_mode', 'fixed') == 'fixed':
+                if settings['amount'] > entry['human_balance']:
+                    row['reason'] = 'Insufficient balance'
+                    continue
+                row['amount_in_wei'] = int(settings['amount'] * (10 ** decimals))
+            else:
+                row['amount_in_wei'] = int((settings['amount'] / 100) * entry['human_balance'] * (10 ** decimals))
+            if row['amount_in_wei'] <= 0:
+                row['reason'] = 'Amount rounds to zero'
+            elif entry['allowance'] is not None and entry['allowance'] >= row['amount_in_wei']:
+                row['action'] = 'swap'
+            else:
+                row['action'] = 'permit' if permit else 'approve'
+        return plan
+
+    def print_swap_plan(self, plan, symbol=''):
+        """Log the pre-flight plan table: one line per wallet and a summary of the planned actions."""
+        self.console.log("[bold blue]Pre-flight plan:[/bold blue]")
+        labels = {'swap': "[green]swap[/green]", 'approve': "[yellow]approve + swap[/yellow]",
+                  'permit': "[yellow]permit + swap[/yellow]", 'skip': "[red]skip[/red]"}
+        counts = {}
+        for row in plan:
+            counts[row['action']] = counts.get(row['action'], 0) + 1
+            line = f"  - {row['wallet']}: {labels[row['action']]}"
+            if row['action'] == 'skip':
+                line += f" ({row['reason']})"
+            else:
+                line += f" {row['amount_in_wei'] / (10 ** row['decimals'])} {symbol}".rstrip()
+            self.console.log(line)
+        self.console.log(
+            f"[bold blue]Plan: {counts.get('swap', 0)} ready to swap, "
+            f"{counts.get('approve', 0) + counts.get('permit', 0)} need approval, "
+            f"{counts.get('skip', 0)} skipped[/bold blue]"
+        )
+
     def get_swap_route(self, chain, token_in, token_out, amount_in):
+        """
+        Fetch the best swap route for the selected chain, served from the route cache when an identical
+        request (chain, tokenIn, tokenOut, amountIn) was answered within ROUTE_CACHE_TTL seconds.
+        """
+        if self.route_cache.ttl <= 0:
+            return self.fetch_swap_route(chain, token_in, token_out, amount_in)
+        key = (chain, token_in.lower(), token_out.lower(), int(amount_in))
+        return self.route_cache.get_or_fetch(
+            key, lambda: self.fetch_swap_route(chain, token_in, token_out, amount_in)
+        )
+
+    def fetch_swap_route(self, chain, token_in, token_out, amount_in):
         """
         Fetch the best swap route from KyberSwap Aggregator API for the selected chain.
         We'll also uncomment the fee logic so you can optionally define fee_amount > 0 if you want to charge fees.
@@ -541,7 +2543,7 @@ class SwapManager:
         params = {k: v for k, v in params.items() if v not in [None, "", []]}
 
         try:
-            response = requests.get(url, params=params, headers=headers)
+            response = self.http_request('GET', url, limiter=self.aggregator_limiter, params=params, headers=headers)
             response.raise_for_status()
             route = response.json()
             if route.get("code") == 0:
@@ -573,7 +2575,7 @@ class SwapManager:
         }
 
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.http_request('POST', url, limiter=self.aggregator_limiter, json=payload, headers=headers)
             response.raise_for_status()
             encoded_data = response.json()
             if encoded_data.get("code") == 0:
@@ -600,7 +2602,7 @@ class SwapManager:
             self.console.log(f"[yellow]Request URL: {url}[/yellow]")
             self.console.log(f"[yellow]Request Payload: {json.dumps(payload, indent=2)}[/yellow]")
 
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.http_request('POST', url, limiter=self.aggregator_limiter, json=payload, headers=headers)
             self.console.log(f"[yellow]Response Status Code: {response.status_code}[/yellow]")
             self.console.log(f"[yellow]Response Text: {response.text}[/yellow]")
             response.raise_for_status()
@@ -621,159 +2623,221 @@ class SwapManager:
                 self.console.log(f"[yellow]Response text: {e.response.text}[/yellow]")
             return None
 
-    def execute_swap(self, private_key, encoded_data, router_address , from_token , amount_in_wei):
-        """Send the swap transaction to the KyberSwap router contract."""
-        max_fee_per_gas, max_priority_fee_per_gas = self.fetch_suggested_fees()
+    def execute_swap(self, private_key, encoded_data, router_address , from_token , amount_in_wei, gas_tier=None,
+                     pending_approval=None, wait=True, max_fee_per_gas=None, max_priority_fee_per_gas=None):
+        """
+        Send the swap transaction to the KyberSwap router contract.
+        Fees already fetched by the caller can be passed in; otherwise they come from the gas oracle.
+        pending_approval is the hash of an approval broadcast just before (same wallet, previous nonce);
+        both transactions are then confirmed together.
+        Returns a dict with 'status' ("success", "failed", "timeout" or "error"), 'tx_hash' and 'detail'.
+        With wait=False it returns right after broadcasting with status "pending" and a 'handle'
+        (Future from the receipt tracker) that resolve_swap_result turns into the final status.
+        """
+        if not max_fee_per_gas or not max_priority_fee_per_gas:
+            max_fee_per_gas, max_priority_fee_per_gas = self.fetch_suggested_fees(gas_tier)
         if not max_fee_per_gas or not max_priority_fee_per_gas:
             self.console.log("[bold red]Could not fetch valid gas fees. Aborting swap.[/bold red]")
-            return
+            return {'status': 'error', 'tx_hash': None, 'detail': 'Could not fetch valid gas fees'}
+
+        signed = self.sign_swap_transaction(private_key, encoded_data, router_address, from_token, amount_in_wei,
+                                            max_fee_per_gas, max_priority_fee_per_gas)
+        if signed['status'] != 'signed':
+            return signed
+        return self.broadcast_swap(signed, pending_approval=pending_approval, wait=wait)
 
+    def sign_swap_transaction(self, private_key, encoded_data, router_address, from_token, amount_in_wei,
+                              max_fee_per_gas, max_priority_fee_per_gas):
+        """
+        Build and sign the router transaction for a swap, with a locally allocated nonce.
+        Returns {'status': 'signed', 'wallet', 'nonce', 'tx', 'raw_transaction', 'tx_hash', 'sign'} for
+        broadcast_swap, where sign(tx) re-signs a fee-bumped replacement, or an error dict like
+        execute_swap's (the nonce is released again on failure).
+        """
         try:
             account = Account.from_key(private_key)
-            nonce = self.w3.eth.get_transaction_count(account.address)
+            built = self.build_swap_transaction(account.address, encoded_data, router_address, from_token,
+                                                amount_in_wei, max_fee_per_gas, max_priority_fee_per_gas)
+            if built['status'] != 'built':
+                return built
+            try:
+                with self.timer.span('sign', account.address):
+                    signed_tx = self.w3.eth.account.sign_transaction(built['tx'], private_key)
+            except Exception:
+                self.nonce_manager.release(account.address, built['nonce'])
+                raise
+            return {**built, 'status': 'signed', 'raw_transaction': signed_tx.rawTransaction, 'tx_hash': signed_tx.hash,
+                    'sign': self._signer(private_key)}
 
-            self.console.log(f"[debug]Executing swap for router_address: {router_address}[/debug]")
-            calldata = encoded_data.get("data", {}).get("data")
-            gas_detail = encoded_data.get("data", {}).get("gas")
+        except Exception as e:
+            self.console.log(f"[bold red]Error executing swap: {e}[/bold red]")
+            return {'status': 'error', 'tx_hash': None, 'detail': str(e)}
 
-            if not calldata:
-                self.console.log("[bold red]Calldata is missing in encoded swap data. Aborting swap.[/bold red]")
-                return
+    def build_swap_transaction(self, sender, encoded_data, router_address, from_token, amount_in_wei,
+                               max_fee_per_gas, max_priority_fee_per_gas):
+        """
+        Unsigned router transaction for a swap built by the aggregator, at sender's next local nonce.
+        Returns {'status': 'built', 'wallet', 'nonce', 'tx'} or an error dict like execute_swap's.
+        """
+        self.console.log(f"[debug]Executing swap for router_address: {router_address}[/debug]")
+        calldata = encoded_data.get("data", {}).get("data")
+        gas_detail = encoded_data.get("data", {}).get("gas")
 
-            # Clean up
-            calldata = calldata.replace('\n', '').replace(' ', '')
-            if not calldata.startswith('0x'):
-                self.console.log("[bold red]Invalid calldata format. Aborting swap.[/bold red]")
-                return
-            
-            # If from_token is 0xEeeeeEeee... => native coin => tx["value"] = amount_in_wei
-            if from_token.lower() == "0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee":
-                tx_value = amount_in_wei
-            else:
-                tx_value = 0  # Standard ERC-20 swap => no value in the transaction
+        if not calldata:
+            self.console.log("[bold red]Calldata is missing in encoded swap data. Aborting swap.[/bold red]")
+            return {'status': 'error', 'tx_hash': None, 'detail': 'Calldata missing in encoded swap data'}
 
-            tx = {
-                'chainId': self.chain_id,
-                'from': account.address,
-                'to': router_address,
-                'nonce': nonce,
-                'gas': int(gas_detail) if gas_detail else 21000,
-                'maxFeePerGas': max_fee_per_gas,
-                'maxPriorityFeePerGas': max_priority_fee_per_gas,
-                'data': calldata,
-                'value': tx_value
-            }
+        # Clean up
+        calldata = calldata.replace('\n', '').replace(' ', '')
+        if not calldata.startswith('0x'):
+            self.console.log("[bold red]Invalid calldata format. Aborting swap.[/bold red]")
+            return {'status': 'error', 'tx_hash': None, 'detail': 'Invalid calldata format'}
 
-            self.console.log(f"[debug]Transaction Params: {json.dumps(tx, indent=2)}[/debug]")
+        # If from_token is 0xEeeeeEeee... => native coin => tx["value"] = amount_in_wei
+        if from_token.lower() == "0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee":
+            tx_value = amount_in_wei
+        else:
+            tx_value = 0  # Standard ERC-20 swap => no value in the transaction
 
-            signed_tx = self.w3.eth.account.sign_transaction(tx, private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-            self.console.log(f"[green]Swap transaction sent: {tx_hash.hex()}[/green]")
+        nonce = self.nonce_manager.allocate(sender)
+        tx = {
+            'chainId': self.chain_id,
+            'from': sender,
+            'to': router_address,
+            'nonce': nonce,
+            'gas': int(gas_detail) if gas_detail else 21000,
+            'maxFeePerGas': max_fee_per_gas,
+            'maxPriorityFeePerGas': max_priority_fee_per_gas,
+            'data': calldata,
+            'value': tx_value
+        }
 
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
-            if receipt['status'] == 1:
-                self.console.log("[bold green]Swap successful![/bold green]")
-            else:
-                self.console.log("[bold red]Swap failed![/bold red]")
+        self.console.log(f"[debug]Transaction Params: {json.dumps(tx, indent=2)}[/debug]")
+        return {'status': 'built', 'wallet': sender, 'nonce': nonce, 'tx': tx}
+
+    def broadcast_swap(self, signed, pending_approval=None, wait=True):
+        """
+        Send a swap signed by sign_swap_transaction and track its receipt; returns the same
+        dicts as execute_swap. A failed send releases the nonce.
+        """
+        address, nonce = signed['wallet'], signed['nonce']
+        try:
+            try:
+                with self.timer.span('broadcast', address):
+                    tx_hash = self.w3.eth.send_raw_transaction(signed['raw_transaction'])
+            except Exception as e:
+                self.nonce_manager.release(address, nonce, e)
+                raise
+            self.console.log(f"[green]Swap transaction sent: {tx_hash.hex()} (nonce {nonce})[/green]")
+            self.record_progress(address, 'sent', tx_hash=tx_hash.hex(), nonce=nonce)
+
+            result = {
+                'status': 'pending',
+                'tx_hash': tx_hash.hex(),
+                'detail': '',
+                'handle': self.receipt_tracker.track(tx_hash),
+                'approval_handle': self.receipt_tracker.track(pending_approval) if pending_approval is not None else None
+            }
+            self.accelerator.watch(tx_hash, signed['tx'], signed['sign'])
+            sent_at = time.monotonic()
+            result['handle'].add_done_callback(
+                lambda _: self.timer.record('confirm', time.monotonic() - sent_at, address))
+            return self.resolve_swap_result(result) if wait else result
 
         except Exception as e:
             self.console.log(f"[bold red]Error executing swap: {e}[/bold red]")
+            return {'status': 'error', 'tx_hash': None, 'detail': str(e)}
+
+    def resolve_swap_result(self, result):
+        """
+        Block until the receipts behind a pending swap result are known and fill in its final
+        status and detail. Results that are not pending are returned unchanged.
+        """
+        handle = result.pop('handle', None)
+        approval_handle = result.pop('approval_handle', None)
+        if handle is None:
+            return result
 
-    def swap_tokens_kyberswap(self, private_key):
-        """Main function to handle token swapping via KyberSwap."""
-        account = Account.from_key(private_key)
-        sender = account.address
-        recipient = account.address  # can be changed if needed
+        if approval_handle is not None:
+            approval = approval_handle.result()
+            if approval['status'] == 'success':
+                self.console.log("[bold green]Approval transaction confirmed successfully![/bold green]")
+            else:
+                self.console.log(f"[bold red]Approval transaction {approval['status']}: {approval['tx_hash']}[/bold red]")
 
-        # 1. Select tokens (with manual contract address option)
-        from_token_choices = list(self.tokens.keys()) + ["[Enter contract address manually]"]
-        from_token_full = questionary.select(
-            "Select the token you want to swap from:",
-            choices=from_token_choices
-        ).ask()
-        if from_token_full == "[Enter contract address manually]":
-            manual_from_token = questionary.text(
-                "Enter the contract address of the token you want to swap from:"
-            ).ask()
-            # Validate address format
-            try:
-                manual_from_token = self.w3.to_checksum_address(manual_from_token.strip())
-            except Exception:
-                self.console.log("[bold red]Invalid contract address entered. Aborting.[/bold red]")
-                return
-            from_token_full = f"Custom ({manual_from_token})"
-            self.tokens[from_token_full] = manual_from_token
+        outcome = handle.result()
+        result['status'] = outcome['status']
+        if outcome.get('tx_hash'):
+            result['tx_hash'] = outcome['tx_hash']  # the fee-bumped replacement if that one was mined
+        if outcome['status'] == 'success':
+            self.console.log(f"[bold green]Swap successful! {outcome['tx_hash']}[/bold green]")
+        elif outcome['status'] == 'failed':
+            self.console.log(f"[bold red]Swap failed! {outcome['tx_hash']}[/bold red]")
+            result['detail'] = 'Transaction reverted'
+        elif outcome['status'] == 'error':
+            self.console.log(f"[bold red]Swap rejected by the RPC: {outcome['detail']}[/bold red]")
+            result['detail'] = outcome['detail']
+        else:
+            self.console.log(f"[bold red]Swap not confirmed within {self.receipt_tracker.timeout}s: {outcome['tx_hash']}[/bold red]")
+            result['detail'] = 'Receipt not found before timeout'
+        return result
 
-        to_token_choices = [symbol for symbol in self.tokens.keys() if symbol != from_token_full] + ["[Enter contract address manually]"]
-        to_token_full = questionary.select(
-            "Select the token you want to swap to:",
-            choices=to_token_choices
+    def select_token(self, direction, exclude=None):
+        """
+        Ask the user for a token to swap from/to (direction is "from" or "to").
+        Returns the token label used as key in self.tokens, or None on invalid input.
+        """
+        choices = [symbol for symbol in self.tokens.keys() if symbol != exclude] + ["[Enter contract address manually]"]
+        token_full = questionary.select(
+            f"Select the token you want to swap {direction}:",
+            choices=choices
         ).ask()
-        if to_token_full == "[Enter contract address manually]":
-            manual_to_token = questionary.text(
-                "Enter the contract address of the token you want to swap to:"
+        if token_full == "[Enter contract address manually]":
+            manual_token = questionary.text(
+                f"Enter the contract address of the token you want to swap {direction}:"
             ).ask()
             # Validate address format
             try:
-                manual_to_token = self.w3.to_checksum_address(manual_to_token.strip())
+                manual_token = self.w3.to_checksum_address(manual_token.strip())
             except Exception:
                 self.console.log("[bold red]Invalid contract address entered. Aborting.[/bold red]")
-                return
-            to_token_full = f"Custom ({manual_to_token})"
-            self.tokens[to_token_full] = manual_to_token
-
-        from_token = self.tokens[from_token_full]
-        to_token = self.tokens[to_token_full]
-        from_token_symbol = from_token_full.split(' (')[0]
-        to_token_symbol = to_token_full.split(' (')[0]
-
-        # 2. Check balance
-        try:
-            balance_raw, human_readable_balance, decimals = self.check_token_balance(from_token, sender)
-            self.console.log(f"[bold blue]Your balance of {from_token_symbol}: {human_readable_balance}[/bold blue]")
-            if balance_raw <= 0:
-                self.console.log("[bold red]Error: Zero balance for the input token[/bold red]")
-                return
-        except Exception as e:
-            self.console.log(f"[bold red]Error fetching token balance: {e}[/bold red]")
-            return
+                return None
+            token_full = f"Custom ({manual_token})"
+            self.tokens[token_full] = manual_token
+        return token_full
 
-        # 3. Get Amount to Swap
+    def prompt_amount(self, settings, from_token_symbol, max_amount=None):
+        """Ask for the amount input method and value, storing 'amount_mode' and 'amount' in settings."""
         amount_choice = questionary.select(
             "Choose amount input method:",
             choices=["Enter fixed amount", "Enter based %"]
         ).ask()
 
         if amount_choice == "Enter fixed amount":
+            limit = f" (max {max_amount})" if max_amount is not None else ""
             amount = questionary.text(
-                f"Enter the amount of {from_token_symbol} to swap (max {human_readable_balance}):"
+                f"Enter the amount of {from_token_symbol} to swap{limit}:"
             ).ask()
             try:
-                amount_float = float(amount)
-                if amount_float > human_readable_balance:
-                    self.console.log(f"[bold red]Error: Insufficient balance[/bold red]")
-                    return
-                amount_in_wei = int(amount_float * (10 ** decimals))
-            except ValueError:
+                settings['amount'] = float(amount)
+            except (TypeError, ValueError):
                 self.console.log(f"[bold red]Error: Invalid amount entered[/bold red]")
-                return
+                return False
+            settings['amount_mode'] = 'fixed'
         else:
             percentage = questionary.text(
                 f"Enter how much (%) of {from_token_symbol} balance you want to swap (1-100):"
             ).ask()
             try:
-                percentage_float = float(percentage)
-                if not 0 < percentage_float <= 100:
-                    self.console.log(f"[bold red]Error: Percentage must be between 1 and 100[/bold red]")
-                    return
-                amount_float = (percentage_float / 100) * human_readable_balance
-                self.console.log(f"[bold blue]Amount to swap: {amount_float} {from_token_symbol}[/bold blue]")
-                amount_in_wei = int(amount_float * (10 ** decimals))
-            except ValueError:
+                settings['amount'] = float(percentage)
+            except (TypeError, ValueError):
                 self.console.log(f"[bold red]Error: Invalid percentage entered[/bold red]")
-                return
+                return False
+            settings['amount_mode'] = 'percent'
+        return True
 
-        # 4. Slippage
+    def prompt_slippage(self, settings):
+        """Ask for the slippage tolerance and store it as a fraction in settings['slippage']."""
         slippage_choice = questionary.select(
             "Choose slippage setting:",
             choices=["Default (0.5%)", "Custom"]
@@ -781,54 +2845,242 @@ class SwapManager:
         if slippage_choice == "Custom":
             slippage = questionary.text("Enter slippage tolerance % (e.g., 0.5 for 0.5%):").ask()
             try:
-                slippage_float = float(slippage) / 100
-            except ValueError:
+                settings['slippage'] = float(slippage) / 100
+            except (TypeError, ValueError):
                 self.console.log("[bold red]Invalid slippage value. Using default 0.5%[/bold red]")
-                slippage_float = 0.005
+                settings['slippage'] = 0.005
+        else:
+            settings['slippage'] = 0.005
+
+    def prompt_swap_settings(self, wallet_count):
+        """
+        Ask every swap question once so the same swap can be applied to all wallets without prompting.
+        Returns a settings dict for swap_tokens_kyberswap, or None if the user aborts.
+        """
+        settings = {}
+
+        from_token_full = self.select_token("from")
+        if not from_token_full:
+            return None
+        to_token_full = self.select_token("to", exclude=from_token_full)
+        if not to_token_full:
+            return None
+        settings['from_token'] = self.tokens[from_token_full]
+        settings['to_token'] = self.tokens[to_token_full]
+        settings['from_symbol'] = from_token_full.split(' (')[0]
+        settings['to_symbol'] = to_token_full.split(' (')[0]
+
+        if not self.prompt_amount(settings, settings['from_symbol']):
+            return None
+        self.prompt_slippage(settings)
+
+        settings['gas_tier'] = self.prompt_gas_tier()
+        settings['approval'] = questionary.select(
+            "If approval is needed, approve the exact amount or unlimited amount?",
+            choices=APPROVAL_CHOICES
+        ).ask()
+
+        amount_label = (f"{settings['amount']}% of balance" if settings['amount_mode'] == 'percent'
+                        else f"{settings['amount']}")
+        if not questionary.confirm(
+            f"Swap {amount_label} {settings['from_symbol']} -> {settings['to_symbol']} "
+            f"for {wallet_count} wallets without further confirmation?"
+        ).ask():
+            self.console.log("[yellow]Swaps cancelled by user[/yellow]")
+            return None
+
+        # Everything is confirmed up front, so the per-wallet pipeline must not prompt
+        settings['confirm'] = False
+        return settings
+
+    def _swap_result(self, wallet, status, detail='', tx_hash=None):
+        """Build the per-wallet result entry used in the swap report."""
+        return {'wallet': wallet, 'status': status, 'detail': detail, 'tx_hash': tx_hash}
+
+    def swap_tokens_kyberswap(self, private_key, settings=None):
+        """
+        Main function to handle token swapping via KyberSwap.
+
+        settings holds pre-answered swap parameters (see prompt_swap_settings); anything missing
+        from it is asked interactively. Returns a per-wallet result dict.
+
+        The swap runs the plan -> route -> build stages and then execute_swap, one after another; the
+        concurrent batch pipeline (see run_swap_pipeline) runs the same stages on separate workers.
+        """
+        job = {'private_key': private_key, 'settings': settings}
+        for stage in (self.plan_swap_stage, self.route_swap_stage, self.build_swap_stage):
+            result = stage(job)
+            if result is not None:
+                return result
+
+        # 12. Execute
+        settings, sender = job['settings'], job['sender']
+        with self.timer.span('execute', sender):
+            outcome = self.execute_swap(
+                private_key=private_key,
+                encoded_data=job['encoded_data'],
+                router_address=job['router_address'],
+                from_token=job['from_token'],
+                amount_in_wei=job['amount_in_wei'],  # pass in the from_token address here
+                gas_tier=settings.get('gas_tier'),
+                pending_approval=job['approval_tx_hash'],
+                wait=settings.get('wait_for_receipt', True),
+                max_fee_per_gas=job['max_fee_per_gas'],
+                max_priority_fee_per_gas=job['max_priority_fee_per_gas']
+            )
+        return self._swap_outcome_result(sender, outcome)
+
+    def _swap_outcome_result(self, sender, outcome):
+        """Turn an execute_swap / broadcast_swap outcome into the per-wallet result, keeping pending handles."""
+        result = self._swap_result(sender, outcome['status'], outcome['detail'], outcome['tx_hash'])
+        if 'handle' in outcome:
+            result['handle'] = outcome['handle']
+            result['approval_handle'] = outcome['approval_handle']
+        return result
+
+    def plan_swap_stage(self, job):
+        """
+        Swap stage "plan": tokens, balance, amount, slippage and gas fees of one wallet.
+
+        Every stage takes the wallet's job dict (initially just private_key and settings), adds what
+        later stages need and returns None, or returns the wallet's final result to stop early.
+        """
+        settings = job['settings'] = dict(job['settings'] or {})
+        job['confirm'] = settings.get('confirm', True)
+
+        account = Account.from_key(job['private_key'])
+        sender = job['sender'] = account.address
+        job['recipient'] = account.address  # can be changed if needed
+        self.record_progress(sender, 'planned')
+
+        # 1. Select tokens (with manual contract address option)
+        if 'from_token' in settings and 'to_token' in settings:
+            from_token = settings['from_token']
+            to_token = settings['to_token']
+            from_token_symbol = settings.get('from_symbol', from_token)
+            to_token_symbol = settings.get('to_symbol', to_token)
+        else:
+            from_token_full = self.select_token("from")
+            if not from_token_full:
+                return self._swap_result(sender, 'skipped', 'Invalid from token address')
+            to_token_full = self.select_token("to", exclude=from_token_full)
+            if not to_token_full:
+                return self._swap_result(sender, 'skipped', 'Invalid to token address')
+
+            from_token = self.tokens[from_token_full]
+            to_token = self.tokens[to_token_full]
+            from_token_symbol = from_token_full.split(' (')[0]
+            to_token_symbol = to_token_full.split(' (')[0]
+        job.update(from_token=from_token, to_token=to_token,
+                   from_symbol=from_token_symbol, to_symbol=to_token_symbol)
+
+        # 2. Check balance (already read by the pre-flight pass when settings carry its row)
+        preflight = job['preflight'] = settings.get('preflight')
+        try:
+            if preflight is not None:
+                balance_raw, human_readable_balance, decimals = (
+                    preflight['balance'], preflight['human_balance'], preflight['decimals'])
+            else:
+                with self.timer.span('balance', sender):
+                    balance_raw, human_readable_balance, decimals = self.check_token_balance(from_token, sender)
+            self.console.log(f"[bold blue]Your balance of {from_token_symbol}: {human_readable_balance}[/bold blue]")
+            if balance_raw <= 0:
+                self.console.log("[bold red]Error: Zero balance for the input token[/bold red]")
+                return self._swap_result(sender, 'skipped', 'Zero balance for the input token')
+        except Exception as e:
+            self.console.log(f"[bold red]Error fetching token balance: {e}[/bold red]")
+            return self._swap_result(sender, 'error', f'Error fetching token balance: {e}')
+        job['decimals'] = decimals
+
+        # 3. Get Amount to Swap
+        if 'amount' not in settings and not self.prompt_amount(settings, from_token_symbol, human_readable_balance):
+            return self._swap_result(sender, 'skipped', 'Invalid amount entered')
+
+        if settings.get('amount_mode', 'fixed') == 'fixed':
+            amount_float = settings['amount']
+            if amount_float > human_readable_balance:
+                self.console.log(f"[bold red]Error: Insufficient balance[/bold red]")
+                return self._swap_result(sender, 'skipped', 'Insufficient balance')
+            amount_in_wei = int(amount_float * (10 ** decimals))
         else:
-            slippage_float = 0.005
+            percentage_float = settings['amount']
+            if not 0 < percentage_float <= 100:
+                self.console.log(f"[bold red]Error: Percentage must be between 1 and 100[/bold red]")
+                return self._swap_result(sender, 'skipped', 'Percentage must be between 1 and 100')
+            amount_float = (percentage_float / 100) * human_readable_balance
+            self.console.log(f"[bold blue]Amount to swap: {amount_float} {from_token_symbol}[/bold blue]")
+            amount_in_wei = int(amount_float * (10 ** decimals))
+        job['amount_in_wei'] = amount_in_wei
+
+        # 4. Slippage
+        if 'slippage' not in settings:
+            self.prompt_slippage(settings)
 
-        # 5. Fetch gas fees
-        max_fee_per_gas, max_priority_fee_per_gas = self.fetch_suggested_fees()
+        # 5. Fetch gas fees (once per wallet, reused for the approval and the swap)
+        if not settings.get('gas_tier'):
+            settings['gas_tier'] = self.prompt_gas_tier()
+        with self.timer.span('gas', sender):
+            max_fee_per_gas, max_priority_fee_per_gas = self.fetch_suggested_fees(settings['gas_tier'])
         if not max_fee_per_gas or not max_priority_fee_per_gas:
             self.console.log("[bold red]Could not fetch valid gas fees. Aborting swap.[/bold red]")
-            return
+            return self._swap_result(sender, 'error', 'Could not fetch valid gas fees')
+        job.update(max_fee_per_gas=max_fee_per_gas, max_priority_fee_per_gas=max_priority_fee_per_gas)
+        return None
 
-        # 6. Fetch swap route
-        route = self.get_swap_route(
-            chain=self.chain_config.CHAIN_NAME,
-            token_in=from_token,
-            token_out=to_token,
-            amount_in=amount_in_wei
-        )
+    def route_swap_stage(self, job):
+        """Swap stage "route": fetch the route, then check the router's allowance and approve or permit."""
+        settings, sender = job['settings'], job['sender']
+        from_token, from_token_symbol, decimals = job['from_token'], job['from_symbol'], job['decimals']
+        amount_in_wei = job['amount_in_wei']
+
+        # 6. Fetch swap route (bucketed amounts let wallets with near-identical amounts share a route)
+        bucketed_amount = bucket_amount(amount_in_wei, self.route_amount_precision)
+        if 0 < bucketed_amount < amount_in_wei:
+            self.console.log(f"[yellow]Amount rounded down to {bucketed_amount / (10 ** decimals)} {from_token_symbol} "
+                             f"({self.route_amount_precision} significant digits)[/yellow]")
+            amount_in_wei = job['amount_in_wei'] = bucketed_amount
+        with self.timer.span('route', sender):
+            route = self.get_swap_route(
+                chain=self.chain_config.CHAIN_NAME,
+                token_in=from_token,
+                token_out=job['to_token'],
+                amount_in=amount_in_wei
+            )
         if not route:
             self.console.log("[bold red]Failed to fetch swap route. Aborting swap.[/bold red]")
-            return
+            return self._swap_result(sender, 'error', 'Failed to fetch swap route')
 
         data = route.get("data")
         if not data:
             self.console.log("[bold red]No data found in route response. Aborting swap.[/bold red]")
-            return
+            return self._swap_result(sender, 'error', 'No data found in route response')
 
-        route_summary = data.get("routeSummary")
-        router_address = data.get("routerAddress")
+        route_summary = job['route_summary'] = data.get("routeSummary")
+        router_address = job['router_address'] = data.get("routerAddress")
 
         if not router_address:
             self.console.log("[bold red]Router address not found. Aborting swap.[/bold red]")
-            return
+            return self._swap_result(sender, 'error', 'Router address not found')
         if not route_summary:
             self.console.log("[bold red]Incomplete route data received. Aborting swap.[/bold red]")
-            return
+            return self._swap_result(sender, 'error', 'Incomplete route data received')
 
         self.console.log(f"[bold green]KyberSwap Router Address: {router_address}[/bold green]")
+        self.record_progress(sender, 'route', router=router_address, amount_in_wei=amount_in_wei)
 
         # 7. Check allowance
+        job['approval_tx_hash'] = None
+        preflight = job['preflight']
         try:
             # Skip allowance check for native token
             if from_token == "0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE":
                 self.console.log("[green]Native token - no allowance needed[/green]")
             else:
-                allowance = self.check_allowance(from_token, sender, router_address)
+                if preflight is not None and str(preflight['spender']).lower() == str(router_address).lower():
+                    allowance = preflight['allowance']
+                else:
+                    with self.timer.span('allowance', sender):
+                        allowance = self.check_allowance(from_token, sender, router_address)
                 allowance_human = allowance / (10 ** decimals)
                 required_allowance_human = amount_in_wei / (10 ** decimals)
 
@@ -838,54 +3090,82 @@ class SwapManager:
                 if allowance < amount_in_wei:
                     self.console.log("[yellow]Insufficient allowance. Approving tokens...[/yellow]")
                     # EIP-2612?
-                    supports_permit = self.check_eip2612_support(from_token, sender)
+                    with self.timer.span('permit_check', sender):
+                        supports_permit = self.check_eip2612_support(from_token, sender)
                     if supports_permit:
                         self.console.log("[green]Token supports EIP-2612. Using permit for approval.[/green]")
                         deadline = int(time.time()) + 1200
-                        permit_data = self.get_permit_data(
-                            token_address=from_token,
-                            owner=sender,
-                            spender=router_address,
-                            value=amount_in_wei,
-                            deadline=deadline,
-                            private_key=private_key
-                        )
+                        with self.timer.span('permit_sign', sender):
+                            permit_data = self.get_permit_data(
+                                token_address=from_token,
+                                owner=sender,
+                                spender=router_address,
+                                value=amount_in_wei,
+                                deadline=deadline,
+                                private_key=job['private_key']
+                            )
                         if permit_data:
                             self.console.log("[bold green]Permit data generated successfully.[/bold green]")
                             route_summary['permit'] = permit_data
+                            self.record_progress(sender, 'approved', permit=True)
                         else:
                             self.console.log("[bold red]Failed to generate permit data. Aborting swap.[/bold red]")
-                            return
+                            return self._swap_result(sender, 'error', 'Failed to generate permit data')
                     else:
                         self.console.log("[bold yellow]Token does not support EIP-2612. "
                                         "Proceeding with traditional approval.[/bold yellow]")
-                        if not questionary.confirm("Do you want to proceed with the approval transaction?").ask():
+                        if job['confirm'] and not questionary.confirm("Do you want to proceed with the approval transaction?").ask():
                             self.console.log("[yellow]Approval cancelled by user[/yellow]")
-                            return
-
-                        self.send_approval_transaction(
-                            private_key=private_key,
-                            token_address=from_token,
-                            spender=router_address,
-                            amount=amount_in_wei,
-                            max_fee_per_gas=max_fee_per_gas,
-                            max_priority_fee_per_gas=max_priority_fee_per_gas
-                        )
-                        allowance = self.check_allowance(from_token, sender, router_address)
-                        allowance_human = allowance / (10 ** decimals)
-                        self.console.log(f"[bold green]New Allowance: {allowance_human} {from_token_symbol}[/bold green]")
+                            return self._swap_result(sender, 'cancelled', 'Approval cancelled by user')
+
+                        if job.get('offline'):
+                            # Signed later together with the swap (see sign_swaps_offline), nothing is sent
+                            nonce = self.nonce_manager.allocate(sender)
+                            try:
+                                job['approval_tx'] = self.build_approval_transaction(
+                                    sender, from_token, router_address,
+                                    self.approval_amount(amount_in_wei, settings.get('approval')), nonce,
+                                    job['max_fee_per_gas'], job['max_priority_fee_per_gas'])
+                            except Exception:
+                                self.nonce_manager.release(sender, nonce)
+                                raise
+                            return None
+
+                        with self.timer.span('approval', sender):
+                            approval_tx_hash = self.send_approval_transaction(
+                                private_key=job['private_key'],
+                                token_address=from_token,
+                                spender=router_address,
+                                amount=amount_in_wei,
+                                max_fee_per_gas=job['max_fee_per_gas'],
+                                max_priority_fee_per_gas=job['max_priority_fee_per_gas'],
+                                approval_choice=settings.get('approval'),
+                                wait=not self.pipeline_approvals
+                            )
+                        if self.pipeline_approvals:
+                            job['approval_tx_hash'] = approval_tx_hash
+                            self.console.log("[yellow]Approval pending - the swap follows with the next nonce[/yellow]")
+                        else:
+                            allowance = self.check_allowance(from_token, sender, router_address)
+                            allowance_human = allowance / (10 ** decimals)
+                            self.console.log(f"[bold green]New Allowance: {allowance_human} {from_token_symbol}[/bold green]")
                 else:
                     self.console.log(f"[green]Sufficient allowance exists: {allowance_human} {from_token_symbol}[/green]")
         except Exception as e:
             self.console.log(f"[bold red]Error during allowance check/approval: {e}[/bold red]")
-            return
+            return self._swap_result(sender, 'error', f'Error during allowance check/approval: {e}')
+        return None
+
+    def build_swap_stage(self, job):
+        """Swap stage "build": get the swap calldata from the aggregator and confirm it with the user if asked to."""
+        sender, route_summary = job['sender'], job['route_summary']
 
         # 8. Prepare TX params
         tx_params = {
             "sender": sender,
-            "recipient": recipient,
+            "recipient": job['recipient'],
             "deadline": int(time.time()) + 1200,
-            "slippageTolerance": int(slippage_float * 10000),  # bps
+            "slippageTolerance": int(job['settings']['slippage'] * 10000),  # bps
             "chargeFeeBy": "",
             "feeAmount": 0,
             "isInBps": True,
@@ -901,20 +3181,24 @@ class SwapManager:
         if 'permit' in route_summary:
             tx_params['permit'] = route_summary['permit']
 
+        # The aggregator cannot simulate a swap whose approval is still pending (or not even sent yet)
+        if job['approval_tx_hash'] is not None or job.get('approval_tx') is not None:
+            tx_params['enableGasEstimation'] = False
+
         # Clean out empty
         tx_params = {k: v for k, v in tx_params.items() if v not in [None, "", []]}
 
         # 9. Get encoded swap data
-        encoded_data = self.get_encoded_swap_data(
-            chain=self.chain_config.CHAIN_NAME,
-            route_summary=route_summary,
-            tx_params=tx_params
-        )
-            
-        
+        with self.timer.span('build', sender):
+            encoded_data = job['encoded_data'] = self.get_encoded_swap_data(
+                chain=self.chain_config.CHAIN_NAME,
+                route_summary=route_summary,
+                tx_params=tx_params
+            )
+
         if not encoded_data:
             self.console.log("[bold red]Failed to get encoded swap data. Aborting swap.[/bold red]")
-            return
+            return self._swap_result(sender, 'error', 'Failed to get encoded swap data')
 
         # 10. Extract some swap details
         swap_details = encoded_data.get("data", {})
@@ -929,72 +3213,894 @@ class SwapManager:
         amount_out_eth = Web3.from_wei(int(amount_out), 'ether') if amount_out else 0
 
         self.console.log(f"[bold blue]Swap Details:[/bold blue]")
-        self.console.log(f"  - Amount In: {amount_in_eth} {from_token_symbol} (${amount_in_usd})")
-        self.console.log(f"  - Expected Amount Out: {amount_out_eth} {to_token_symbol} (${amount_out_usd})")
+        self.console.log(f"  - Amount In: {amount_in_eth} {job['from_symbol']} (${amount_in_usd})")
+        self.console.log(f"  - Expected Amount Out: {amount_out_eth} {job['to_symbol']} (${amount_out_usd})")
         self.console.log(f"  - Gas: {gas} units (${gas_usd})")
 
         # 11. Confirm
-        if not questionary.confirm("Do you want to proceed with the swap based on the above details?").ask():
+        if job['confirm'] and not questionary.confirm("Do you want to proceed with the swap based on the above details?").ask():
             self.console.log("[yellow]Swap cancelled by user[/yellow]")
-            return
+            return self._swap_result(sender, 'cancelled', 'Swap cancelled by user')
+        return None
 
-        # 12. Execute
-        self.execute_swap(
-            private_key=private_key,
-            encoded_data=encoded_data,
-            router_address=router_address,
-            from_token=from_token,
-            amount_in_wei=amount_in_wei  # pass in the from_token address here
+    def sign_swap_stage(self, job):
+        """Swap stage "sign": allocate the nonce and sign the swap transaction."""
+        signed = job['signed'] = self.sign_swap_transaction(
+            private_key=job['private_key'],
+            encoded_data=job['encoded_data'],
+            router_address=job['router_address'],
+            from_token=job['from_token'],
+            amount_in_wei=job['amount_in_wei'],
+            max_fee_per_gas=job['max_fee_per_gas'],
+            max_priority_fee_per_gas=job['max_priority_fee_per_gas']
         )
+        if signed['status'] != 'signed':
+            return self._swap_result(job['sender'], signed['status'], signed['detail'])
+        return None
+
+    def broadcast_swap_stage(self, job):
+        """
+        Swap stage "broadcast": hand the signed swap to the burst broadcaster, which sends it in a batch
+        with other wallets' swaps and keeps it in flight until its receipt (see BurstBroadcaster).
+        """
+        signed, sender = job['signed'], job['sender']
+        tx_hash = Web3.to_hex(signed['tx_hash'])
+        # 'broadcast' spans the wait in the broadcaster queue up to the batch send, 'confirm' starts there
+        times = {'queued': time.monotonic()}
+
+        def sent(ok):
+            times['sent'] = time.monotonic()
+            self.timer.record('broadcast', times['sent'] - times['queued'], sender, ok)
+
+        handle = self.broadcaster.submit(Web3.to_hex(signed['raw_transaction']), tx_hash, on_sent=sent)
+        self.accelerator.watch(HexBytes(tx_hash), signed['tx'], signed['sign'])
 
-    def start_swaps(self):
-        """Initiate the swapping process for all loaded private keys."""
-        for private_key in self.wallet_private_keys:
+        def settled(done):
+            outcome = done.result()
+            if outcome['status'] == 'error':
+                self.nonce_manager.release(sender, signed['nonce'], outcome['detail'])
+            else:
+                self.timer.record('confirm', time.monotonic() - times.get('sent', times['queued']), sender)
+
+        handle.add_done_callback(settled)
+        self.console.log(f"[green]Swap transaction queued: {tx_hash} (nonce {signed['nonce']})[/green]")
+        self.record_progress(sender, 'sent', tx_hash=tx_hash, nonce=signed['nonce'])
+        result = job['result'] = self._swap_result(sender, 'pending', tx_hash=tx_hash)
+        result['handle'] = handle
+        result['approval_handle'] = (self.receipt_tracker.track(job['approval_tx_hash'])
+                                     if job['approval_tx_hash'] is not None else None)
+        return None
+
+    def confirm_swap_stage(self, job):
+        """
+        Swap stage "confirm": the wallet's final result, as a Future resolved from the receipt tracker's
+        callbacks once every receipt is known, so no pipeline worker is parked on a pending swap.
+        """
+        result = job['result']
+        handles = [handle for handle in (result.get('handle'), result.get('approval_handle')) if handle is not None]
+        if not handles:
+            return self.resolve_swap_result(result)
+        future = Future()
+        remaining = [len(handles)]
+        lock = threading.Lock()
+
+        def settled(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
             try:
-                self.swap_tokens_kyberswap(private_key)
+                future.set_result(self.resolve_swap_result(result))
             except Exception as e:
-                self.console.log(f"[bold red]Error in swap for wallet: {e}[/bold red]")
+                future.set_exception(e)
+
+        for handle in handles:
+            handle.add_done_callback(settled)
+        return future
+
+    def _swap_wallet_safely(self, private_key, settings):
+        """Run one wallet's swap and turn unexpected exceptions into an error result."""
+        started = time.monotonic()
+        try:
+            result = self.swap_tokens_kyberswap(private_key, settings)
+            self.timer.record('wallet', time.monotonic() - started, result['wallet'], result['status'] != 'error')
+            return result
+        except Exception as e:
+            self.console.log(f"[bold red]Error in swap for wallet: {e}[/bold red]")
+            try:
+                wallet = Account.from_key(private_key).address
+            except Exception:
+                wallet = f"{private_key[:8]}..."
+            return self._swap_result(wallet, 'error', str(e))
+
+    def start_swaps(self, concurrency=1, settings=None):
+        """
+        Initiate the swapping process for all loaded private keys.
+
+        With concurrency == 1 wallets are swapped one after another (prompting per wallet unless
+        settings are given). With concurrency > 1 the swap settings are collected once and up to
+        `concurrency` wallets run the route -> build -> sign -> send pipeline at the same time.
+        Without prompts, workers move on right after broadcasting and the receipt tracker confirms
+        all transactions in the background before the report is printed.
+        Returns the list of per-wallet results.
+        """
+        concurrency = max(1, min(int(concurrency), self.max_concurrent_swaps))
+
+        if concurrency > 1 and settings is None:
+            settings = self.prompt_swap_settings(len(self.wallet_private_keys))
+            if settings is None:
+                return []
+        if settings is not None:
+            settings = {'wait_for_receipt': False, **settings}
+
+        jobs, results = self._swap_jobs(settings)
+        if concurrency == 1:
+            results.extend(self._swap_wallet_safely(private_key, job_settings) for private_key, job_settings in jobs)
+        elif self.staged_pipeline:
+            results.extend(self.run_swap_pipeline(jobs, concurrency))
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [executor.submit(self._swap_wallet_safely, private_key, job_settings)
+                           for private_key, job_settings in jobs]
+                for future in as_completed(futures):
+                    results.append(future.result())
+
+        if any('handle' in result for result in results):
+            self.console.log(f"[bold blue]Waiting for {self.receipt_tracker.pending_count()} pending transactions...[/bold blue]")
+        results = [self.resolve_swap_result(result) for result in results]
+        for result in results:
+            self.record_progress(result['wallet'], JOURNAL_RESULT_STATES.get(result['status'], result['status']),
+                                 tx_hash=result.get('tx_hash'), detail=result.get('detail') or None)
+        self.print_swap_report(results)
+        return results
+
+    def run_swap_pipeline(self, jobs, concurrency):
+        """
+        Swap (private_key, settings) jobs through the staged pipeline plan -> route -> build -> sign ->
+        broadcast -> confirm, so the network-bound stages of different wallets overlap: the next wallets'
+        routes are fetched while earlier ones are signed and sent. Each stage has `concurrency` workers
+        unless SWAP_PIPELINE_WORKERS sets its own, and bounded queues keep the stages in step.
+        Returns the final per-wallet results in job order.
+        """
+        workers = {stage: concurrency for stage in SWAP_PIPELINE_STAGES}
+        workers.update(self.pipeline_workers)
+        functions = {
+            'plan': self.plan_swap_stage,
+            'route': self.route_swap_stage,
+            'build': self.build_swap_stage,
+            'sign': self.sign_swap_stage,
+            'broadcast': self.broadcast_swap_stage,
+            'confirm': self.confirm_swap_stage,
+        }
+        pipeline = StagedPipeline(
+            [(stage, self._pipeline_stage(functions[stage]), workers[stage]) for stage in SWAP_PIPELINE_STAGES],
+            queue_size=self.pipeline_queue_size, on_error=self._pipeline_error
+        )
+        self.console.log(f"[bold blue]Swapping {len(jobs)} wallets through the staged pipeline "
+                         f"({', '.join(f'{stage}={workers[stage]}' for stage in SWAP_PIPELINE_STAGES)})[/bold blue]")
+        return pipeline.run({'private_key': private_key, 'settings': settings, 'started': None}
+                            for private_key, settings in jobs)
+
+    def _pipeline_stage(self, stage):
+        """Wrap a swap stage for the pipeline, recording the 'wallet' span once the wallet is sent or stops early."""
+        def run(job):
+            # Offline signing jobs carry no 'started' and are not timed
+            if 'started' in job and job['started'] is None:
+                job['started'] = time.monotonic()
+            result = stage(job)
+            ended = result or job.get('result')
+            if ended is not None and 'started' in job:
+                self.timer.record('wallet', time.monotonic() - job.pop('started'), ended['wallet'],
+                                  ended['status'] != 'error')
+            return result
+        return run
+
+    def _pipeline_error(self, job, error):
+        """Turn an exception raised inside a pipeline stage into the wallet's error result."""
+        self.console.log(f"[bold red]Error in swap for wallet: {error}[/bold red]")
+        wallet = job.get('sender') or f"{job['private_key'][:8]}..."
+        return self._swap_result(wallet, 'error', str(error))
+
+    def _swap_jobs(self, settings):
+        """
+        Pair every loaded wallet with its settings. With a pre-flight plan, skipped wallets never reach the
+        executor: returns (jobs, results) where results already holds their 'skipped' entries.
+        """
+        jobs = [(private_key, settings) for private_key in self.wallet_private_keys]
+        results = []
+        plan = self.run_preflight(settings) if settings is not None and self.preflight else None
+        if plan is not None:
+            jobs = []
+            for private_key, row in zip(self.wallet_private_keys, plan):
+                if row['action'] == 'skip':
+                    results.append(self._swap_result(row['wallet'], 'skipped', row['reason']))
+                else:
+                    jobs.append((private_key, {**settings, 'preflight': row}))
+        return jobs, results
+
+    def sign_swaps_offline(self, settings, output, concurrency=1):
+        """
+        Plan, route and build every loaded wallet's swap like start_swaps, then sign all transactions in
+        one bulk step (see sign_transactions) and put them to output instead of sending them. output is
+        anything with put(record), e.g. a SignedTransactionFile or a queue.Queue (see SignedTransactionFile
+        for the record format). A wallet that needs an approval gets a signed approval at its next nonce
+        and the swap right after it. broadcast_signed_transactions sends the records later, from this host
+        or another one.
+        Returns the per-wallet results, with status 'signed' and the swap's hash for signed wallets.
+        """
+        concurrency = max(1, min(int(concurrency), self.max_concurrent_swaps))
+        jobs, results = self._swap_jobs({**settings, 'confirm': False})
+        stages = [('plan', self.plan_swap_stage, concurrency), ('route', self.route_swap_stage, concurrency),
+                  ('build', self.build_swap_stage, concurrency), ('prepare', self.prepare_offline_stage, 1)]
+        pipeline = StagedPipeline(stages, queue_size=self.pipeline_queue_size, on_error=self._pipeline_error)
+        results.extend(pipeline.run({'private_key': private_key, 'settings': job_settings, 'offline': True}
+                                    for private_key, job_settings in jobs))
+
+        # Every unsigned transaction of the batch, in wallet and nonce order; a wallet is only written
+        # out when all of its transactions could be signed
+        wallets = [(result, result.pop('transactions')) for result in results if 'transactions' in result]
+        with self.timer.span('sign_bulk'):
+            signed = iter(self.sign_transactions([(tx, private_key) for _, transactions in wallets
+                                                  for _, tx, private_key in transactions]))
+        for result, transactions in wallets:
+            records = []
+            for (kind, tx, _), (raw, tx_hash) in zip(transactions, signed):
+                if raw is None:
+                    result.update(status='error', detail=f'Could not sign the {kind} transaction: {tx_hash}')
+                records.append({'chain_id': self.chain_id, 'wallet': result['wallet'], 'kind': kind,
+                                'nonce': tx['nonce'], 'tx_hash': tx_hash, 'raw': raw})
+            if result['status'] == 'error':
+                continue
+            for record in records:
+                output.put(record)
+            result.update(status='signed', tx_hash=records[-1]['tx_hash'])
+        self.console.log(f"[bold green]Signed {sum(1 for r in results if r['status'] == 'signed')} swaps "
+                         f"for later broadcasting[/bold green]")
+        self.print_swap_report(results)
+        return results
+
+    def prepare_offline_stage(self, job):
+        """Final stage of sign_swaps_offline: the unsigned swap (and approval) transactions of a wallet."""
+        built = self.build_swap_transaction(job['sender'], job['encoded_data'], job['router_address'],
+                                            job['from_token'], job['amount_in_wei'], job['max_fee_per_gas'],
+                                            job['max_priority_fee_per_gas'])
+        if built['status'] != 'built':
+            return self._swap_result(job['sender'], built['status'], built['detail'])
+        transactions = [('approval', job['approval_tx'])] if job.get('approval_tx') is not None else []
+        transactions.append(('swap', built['tx']))
+        result = self._swap_result(job['sender'], 'built')
+        result['transactions'] = [(kind, tx, job['private_key']) for kind, tx in transactions]
+        return result
+
+    def sign_transactions(self, items):
+        """
+        Sign (tx, private_key) pairs, in a process pool once there are signing_process_threshold of them:
+        ECDSA signing is CPU-bound and holds the GIL. Returns (raw hex, tx hash) or (None, error) per pair.
+        """
+        if len(items) < self.signing_process_threshold or (os.cpu_count() or 1) < 2:
+            return _sign_transactions(items)
+        signed = _map_in_processes(_sign_transactions, items, self.process_context)
+        return _sign_transactions(items) if signed is None else signed
+
+    def broadcast_signed_transactions(self, records):
+        """
+        Send signed transactions of this chain written by sign_swaps_offline through the burst broadcaster
+        and wait for their receipts. Records are submitted in file order, so a wallet's approval goes out
+        before its swap. Returns one result per swap, like start_swaps, and prints the report.
+        """
+        results = []
+        approvals = {}
+        for record in records:
+            if int(record['chain_id']) != self.chain_id:
+                continue
+            wallet = record['wallet']
+            handle = self.broadcaster.submit(record['raw'], record['tx_hash'])
+            self.record_progress(wallet, 'approved' if record['kind'] == 'approval' else 'sent',
+                                 tx_hash=record['tx_hash'], nonce=record['nonce'])
+            if record['kind'] == 'approval':
+                approvals[wallet] = handle
+                continue
+            result = self._swap_result(wallet, 'pending', tx_hash=record['tx_hash'])
+            result.update(handle=handle, approval_handle=approvals.pop(wallet, None))
+            results.append(result)
+        self.console.log(f"[bold blue]Waiting for {self.broadcaster.in_flight()} pending transactions...[/bold blue]")
+        results = [self.resolve_swap_result(result) for result in results]
+        self.print_swap_report(results)
+        return results
+
+    def stream_swaps(self, source, settings, concurrency=1, chunk_size=None):
+        """
+        Swap every wallet of a streaming source (see WalletFileSource) chunk by chunk, so only
+        chunk_size keys and addresses are held in memory at a time. Each chunk goes through
+        start_swaps (pre-flight plan, executor, receipts, report) before the next one is read.
+        Settings are required since nothing may prompt mid-stream.
+
+        Returns {'counts': {status: n}, 'line': ..., 'offset': ...} where line/offset are the
+        position after the last finished chunk, to resume from after a crash.
+        """
+        if settings is None:
+            raise ValueError("Streaming swaps need pre-answered settings")
+        chunk_size = int(chunk_size or config.WALLET_STREAM_CHUNK)
+        counts = {}
+        position = {'line': source.line, 'offset': source.offset}
+        for chunk in source.chunks(chunk_size):
+            keys = [entry['private_key'] for entry in chunk]
+            pairs = [(key, address) for key, address in zip(keys, self.derive_addresses(keys, use_cache=False))
+                     if address is not None]
+            self.wallet_private_keys = [key for key, _ in pairs]
+            self.wallet_addresses = [address for _, address in pairs]
+            self.drop_finished_wallets()
+            for result in self.start_swaps(concurrency=concurrency, settings=settings):
+                counts[result['status']] = counts.get(result['status'], 0) + 1
+            position = {'line': chunk[-1]['line'], 'offset': chunk[-1]['offset']}
+            self.console.log(f"[bold blue]Finished wallets through line {position['line']} "
+                             f"(resume offset {position['offset']})[/bold blue]")
+        self.wallet_private_keys, self.wallet_addresses = [], []
+        if source.invalid_lines:
+            self.console.log(f"[bold red]Skipped invalid private keys, latest on lines "
+                             f"{', '.join(map(str, source.invalid_lines[-10:]))}[/bold red]")
+        summary = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items())) or "no wallets"
+        self.console.log(f"[bold blue]Streamed {sum(counts.values())} wallets - {summary}[/bold blue]")
+        return {'counts': counts, **position}
+
+    def _signer(self, private_key):
+        """Sign function handed to the fee accelerator for replacements of this wallet's transactions."""
+        return lambda tx: self.w3.eth.account.sign_transaction(tx, private_key)
+
+    def _transaction_replaced(self, kind, wallet, tx_hash, replacement_hash, nonce, raw_replacement):
+        """
+        Point the burst broadcaster at a fee-bumped replacement and journal swap replacements, so a resumed
+        run reconciles the latest version. Approval replacements are not journaled: the swap may already
+        be 'sent', and resume re-reads allowances anyway.
+        """
+        self.broadcaster.replace(tx_hash, replacement_hash, Web3.to_hex(raw_replacement))
+        if kind == 'swap':
+            self.record_progress(wallet, 'sent', tx_hash=replacement_hash, nonce=nonce, replaces=tx_hash)
+
+    def record_progress(self, wallet, state, **fields):
+        """Append a wallet state transition to the run's journal, if there is one."""
+        if self.journal is not None:
+            self.journal.record(wallet, state, **fields)
+
+    def reconcile_transaction(self, address, entry, tx_hashes=None):
+        """
+        Find out on chain what became of a journaled transaction whose outcome was never recorded.
+        tx_hashes are all versions of it that were sent (fee-bumped replacements share its nonce), by
+        default only entry['tx_hash']. Returns (state, tx_hash): 'confirmed' or 'failed' with the version
+        that was mined, 'pending' (a version is still in the mempool), 'replaced' (its nonce was used by a
+        transaction that is none of these versions) or 'dropped' (gone; the wallet can be swapped again).
+        """
+        tx_hashes = tx_hashes or [entry['tx_hash']]
+        for tx_hash in tx_hashes:
+            try:
+                receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            except TransactionNotFound:
+                receipt = None
+            if receipt is not None:
+                return ('confirmed' if receipt['status'] == 1 else 'failed'), tx_hash
+        nonce = entry.get('nonce')
+        if nonce is not None and self.w3.eth.get_transaction_count(address, 'latest') > nonce:
+            return 'replaced', tx_hashes[-1]
+        for tx_hash in tx_hashes:
+            try:
+                if self.w3.eth.get_transaction(tx_hash) is not None:
+                    return 'pending', tx_hash
+            except TransactionNotFound:
+                continue
+        return 'dropped', tx_hashes[-1]
+
+    def drop_finished_wallets(self):
+        """
+        When resuming (resume_state set), remove the wallets the journal shows as finished from the loaded
+        wallets. Wallets with a swap in flight are reconciled against the chain first, over every version
+        journaled for it: confirmed or still pending ones are not swapped again; failed, dropped ones and
+        those whose nonce went to a foreign transaction are retried. A wallet stopped after its approval
+        is left alone while that approval is still pending, so resuming never sends a second one.
+        """
+        if self.resume_state is None:
+            return
+        keep_keys, keep_addresses = [], []
+        counts = {'finished': 0, 'pending': 0, 'retry': 0}
+        for private_key, address in zip(self.wallet_private_keys, self.wallet_addresses):
+            entry = self.resume_state.get(address)
+            state = entry['state'] if entry else None
+            if state in SwapJournal.IN_FLIGHT_STATES and entry.get('tx_hash'):
+                try:
+                    state, tx_hash = self.reconcile_transaction(address, entry, entry.get('swap_hashes'))
+                except Exception as e:
+                    self.console.log(f"[bold red]Could not check {entry['tx_hash']} of {address}: {e}. "
+                                     f"Not swapping it again.[/bold red]")
+                    state = 'pending'
+                if state != 'pending':
+                    self.record_progress(address, state, tx_hash=tx_hash, detail='reconciled on resume')
+            elif state == 'approved' and entry.get('tx_hash'):
+                # Only a still-pending approval matters: otherwise the swap reads the allowance again
+                try:
+                    approval, _ = self.reconcile_transaction(address, entry, entry.get('approval_hashes'))
+                except Exception as e:
+                    self.console.log(f"[bold red]Could not check approval {entry['tx_hash']} of {address}: {e}. "
+                                     f"Not swapping it again.[/bold red]")
+                    approval = 'pending'
+                if approval == 'pending':
+                    state = 'pending'
+            if state in SwapJournal.FINISHED_STATES:
+                counts['finished'] += 1
+            elif state == 'pending':
+                counts['pending'] += 1
+            else:
+                if state is not None:
+                    counts['retry'] += 1
+                keep_keys.append(private_key)
+                keep_addresses.append(address)
+        self.wallet_private_keys, self.wallet_addresses = keep_keys, keep_addresses
+        self.console.log(f"[bold blue]Resume: {counts['finished']} wallets already done, {counts['pending']} still "
+                         f"pending on chain, {counts['retry']} retried, {len(keep_keys)} to swap[/bold blue]")
+
+    def run_preflight(self, settings):
+        """
+        Build and print the pre-flight plan for the loaded wallets. Returns None when there is nothing to
+        plan or the bulk reads fail, in which case every wallet reads its own state as before.
+        """
+        if 'from_token' not in settings or not self.wallet_private_keys:
+            return None
+        try:
+            owners = self.wallet_addresses
+            if len(owners) != len(self.wallet_private_keys):
+                owners = self.derive_addresses(self.wallet_private_keys)
+            plan = self.plan_swaps(settings, owners=owners)
+        except Exception as e:
+            self.console.log(f"[yellow]Pre-flight planning failed, reading wallets one by one: {e}[/yellow]")
+            return None
+        self.print_swap_plan(plan, settings.get('from_symbol', ''))
+        return plan
+
+    def print_swap_report(self, results):
+        """Log one line per wallet and a status summary for a finished batch."""
+        self.console.log("[bold blue]Swap report:[/bold blue]")
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+            color = "green" if result['status'] == 'success' else "yellow" if result['status'] in ('skipped', 'cancelled') else "red"
+            line = f"  - {result['wallet']}: [{color}]{result['status']}[/{color}]"
+            if result.get('tx_hash'):
+                line += f" tx={result['tx_hash']}"
+            if result.get('detail'):
+                line += f" ({result['detail']})"
+            self.console.log(line)
+        summary = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items()))
+        self.console.log(f"[bold blue]Processed {len(results)} wallets - {summary}[/bold blue]")
+        metrics = self.aggregator_limiter.summary()
+        self.console.log(
+            f"[bold blue]Aggregator calls: {metrics['calls']}, throttled: {metrics['throttled']}, "
+            f"retried: {metrics['retried']}, failed: {metrics['failed']}, "
+            f"waited: {metrics['wait_seconds']:.1f}s, current rate: {metrics['rate']}/s[/bold blue]"
+        )
+        stages = self.timer.summary()
+        if stages:
+            self.console.log("[bold blue]Stage timings (p50 / p95 / max, seconds):[/bold blue]")
+            for stage, stats in stages.items():
+                self.console.log(f"  - {stage}: {stats['p50']:.3f} / {stats['p95']:.3f} / {stats['max']:.3f} "
+                                 f"over {stats['count']} spans")
+        if self.timings_file and not str(self.timings_file).endswith('.jsonl'):
+            try:
+                self.timer.write_prometheus(self.timings_file)
+            except OSError as e:
+                self.console.log(f"[yellow]Could not write timings to {self.timings_file}: {e}[/yellow]")
+        stats = self.broadcaster.stats
+        if stats['sent'] or stats['rejected']:
+            self.console.log(f"[bold blue]Broadcaster: {stats['sent']} sent, {stats['rejected']} rejected, "
+                             f"{stats['duplicates']} duplicates, {stats['rebroadcasts']} rebroadcasts[/bold blue]")
+        stats = self.accelerator.stats
+        if stats['replacements'] or stats['gave_up']:
+            self.console.log(f"[bold blue]Fee accelerator: {stats['replacements']} replacements, "
+                             f"{stats['gave_up']} left pending at the fee ceiling[/bold blue]")
+        for endpoint in self.rpc_pool.stats():
+            latency = "n/a" if endpoint['latency_ms'] is None else f"{endpoint['latency_ms']}ms"
+            self.console.log(
+                f"[bold blue]RPC {endpoint['endpoint']}: {endpoint['requests']} requests, latency {latency}, "
+                f"{'healthy' if endpoint['healthy'] else 'cooling down'}[/bold blue]"
+            )
+
+    def resolve_token(self, token):
+        """
+        Resolve a token given by symbol (as listed in the tokens file) or contract address.
+        Returns (address, symbol); raises ValueError if the token is unknown.
+        """
+        token = str(token).strip()
+        if token.lower().startswith('0x'):
+            address = self.w3.to_checksum_address(token)
+            for label, known_address in self.tokens.items():
+                if known_address.lower() == address.lower():
+                    return address, label.split(' (')[0]
+            return address, address
+        for label, address in self.tokens.items():
+            if label.split(' (')[0] == token.upper():
+                return address, label.split(' (')[0]
+        raise ValueError(f"Unknown token '{token}' for chain {self.chain_name}")
+
+    def settings_from_plan_job(self, job):
+        """Turn a normalized batch plan job (see load_batch_plan) into swap settings that never prompt."""
+        from_token, from_symbol = self.resolve_token(job['from_token'])
+        to_token, to_symbol = self.resolve_token(job['to_token'])
+        return {
+            'from_token': from_token,
+            'to_token': to_token,
+            'from_symbol': from_symbol,
+            'to_symbol': to_symbol,
+            'amount_mode': job['amount_mode'],
+            'amount': job['amount'],
+            'slippage': job['slippage'] / 100,
+            'gas_tier': job['gas_tier'],
+            'approval': PLAN_APPROVAL_POLICIES[job['approval']],
+            'confirm': False
+        }
+
+    def load_plan_wallets(self, wallets):
+        """Load the wallets of a batch plan job: "default", a key file path or a list of private keys."""
+        if isinstance(wallets, (list, tuple)):
+            self.load_wallets_from_keys(wallets)
+            self.console.log(f"[bold green]Loaded {len(self.wallet_private_keys)} wallets from plan[/bold green]")
+            return
+        if wallets != 'default':
+            self.wallet_file = wallets
+        self.load_wallets_from_file()
 
     def run(self):
         """Run the SwapManager."""
+        if len(self.rpc_urls) > 1:
+            latencies = self.rpc_pool.health_check()
+            self.console.log("[bold blue]RPC endpoints: " + ", ".join(
+                f"{name} {'down' if latency is None else f'{latency * 1000:.0f}ms'}" for name, latency in latencies.items()
+            ) + "[/bold blue]")
         # Let user pick how to load private keys
-        self.select_private_key_input_method()
+        try:
+            self.select_private_key_input_method()
+        except (ValueError, OSError):
+            sys.exit(1)
         if not self.wallet_private_keys:
             self.console.log("[bold red]No private keys loaded. Exiting.[/bold red]")
             sys.exit(1)
 
+        concurrency = 1
+        if len(self.wallet_private_keys) > 1 and self.max_concurrent_swaps > 1:
+            mode = questionary.select(
+                "Choose execution mode:",
+                choices=["Sequential (confirm each wallet)",
+                         f"Concurrent (same swap for all wallets, up to {self.max_concurrent_swaps} at once)"]
+            ).ask()
+            if mode and mode.startswith("Concurrent"):
+                concurrency = self.max_concurrent_swaps
+
         # Start the swaps
-        self.start_swaps()
+        self.start_swaps(concurrency=concurrency)
+
+
+CHAIN_CHOICES = ["POLYGON", "OP", "Base", "ARB", "Linea", "ETHER"]
+
+# Batch plan approval policy -> answer of the approval prompt
+PLAN_APPROVAL_POLICIES = {"exact": "Exact amount", "unlimited": "Unlimited amount"}
+PLAN_GAS_TIERS = ("low", "medium", "high")
+
+
+def get_chain_config(chain_name):
+    """Return the config.py chain class for a chain name from CHAIN_CHOICES (case-insensitive)."""
+    for choice in CHAIN_CHOICES:
+        if choice.lower() == str(chain_name).strip().lower():
+            return getattr(config, choice)
+    raise ValueError(f"Unknown chain '{chain_name}'. Choose one of: {', '.join(CHAIN_CHOICES)}")
+
+
+def normalize_plan_job(job, index=0):
+    """
+    Validate one batch plan job and fill in defaults.
+    Raises ValueError describing the first problem found.
+    """
+    def value(key, default=None):
+        item = job.get(key)
+        return default if item is None or item == "" else item
+
+    label = f"Plan job #{index + 1}"
+    chain = value('chain')
+    if not chain:
+        raise ValueError(f"{label}: 'chain' is required")
+    if not value('from_token') or not value('to_token'):
+        raise ValueError(f"{label}: 'from_token' and 'to_token' are required")
+
+    amount, percent = value('amount'), value('percent')
+    if (amount is None) == (percent is None):
+        raise ValueError(f"{label}: set exactly one of 'amount' or 'percent'")
+    try:
+        amount_mode, amount_value = ('fixed', float(amount)) if amount is not None else ('percent', float(percent))
+        slippage = float(value('slippage', 0.5))
+        concurrency = int(value('concurrency', 1))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"{label}: {e}")
+    if amount_mode == 'percent' and not 0 < amount_value <= 100:
+        raise ValueError(f"{label}: 'percent' must be between 1 and 100")
+    if amount_mode == 'fixed' and amount_value <= 0:
+        raise ValueError(f"{label}: 'amount' must be positive")
+
+    gas_tier = str(value('gas_tier', 'medium')).lower()
+    if gas_tier not in PLAN_GAS_TIERS:
+        raise ValueError(f"{label}: 'gas_tier' must be one of {', '.join(PLAN_GAS_TIERS)}")
+    approval = str(value('approval', 'exact')).lower()
+    if approval not in PLAN_APPROVAL_POLICIES:
+        raise ValueError(f"{label}: 'approval' must be one of {', '.join(PLAN_APPROVAL_POLICIES)}")
+
+    wallets = value('wallets', 'default')
+    if isinstance(wallets, str):
+        wallets = wallets.strip()
+
+    stream = str(value('stream', False)).strip().lower() in ('true', '1', 'yes')
+    follow = str(value('follow', False)).strip().lower() in ('true', '1', 'yes')
+    if (stream or follow) and isinstance(wallets, (list, tuple)):
+        raise ValueError(f"{label}: 'stream' needs 'wallets' to be a key file or 'default'")
+    try:
+        resume_offset = int(value('resume_offset', 0))
+        resume_line = int(value('resume_line', 0))
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"{label}: {e}")
+
+    return {
+        'chain': str(chain).strip(),
+        'wallets': wallets,
+        'from_token': str(value('from_token')).strip(),
+        'to_token': str(value('to_token')).strip(),
+        'amount_mode': amount_mode,
+        'amount': amount_value,
+        'slippage': slippage,
+        'gas_tier': gas_tier,
+        'approval': approval,
+        'concurrency': max(1, concurrency),
+        'stream': stream or follow,
+        'follow': follow,
+        'resume_offset': resume_offset,
+        'resume_line': resume_line
+    }
+
+
+def load_batch_plan(plan_file):
+    """
+    Load a batch plan from a .json, .yaml/.yml or .csv file and return the normalized job list.
+
+    JSON/YAML plans are a single job, a list of jobs, or {"defaults": {...}, "jobs": [...]}.
+    CSV plans have one job per row with the job keys as header.
+    """
+    extension = os.path.splitext(str(plan_file))[1].lower()
+    with open(plan_file, 'r', encoding='utf-8') as f:
+        if extension == '.csv':
+            data = [dict(row) for row in csv.DictReader(f)]
+        elif extension in ('.yaml', '.yml'):
+            try:
+                import yaml
+            except ImportError:
+                raise RuntimeError("PyYAML is required for YAML plans. Install it with 'pip install pyyaml'.")
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+
+    defaults = {}
+    if isinstance(data, dict) and 'jobs' in data:
+        defaults = data.get('defaults') or {}
+        data = data['jobs']
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list) or not data:
+        raise ValueError("Batch plan must contain at least one job")
+
+    return [normalize_plan_job({**defaults, **job}, index) for index, job in enumerate(data)]
+
+
+def run_chain_jobs(chain, jobs, journal=None, resume=False, signed_output=None):
+    """
+    Run the batch plan jobs of one chain in plan order, each with its own SwapManager.
+    With a journal every wallet's progress is recorded under its chain and job; with resume=True the
+    wallets the journal shows as finished are left out. With signed_output the swaps are signed into
+    it instead of being sent (see SwapManager.sign_swaps_offline).
+    Returns the per-wallet results tagged with the chain and job number.
+    """
+    results = []
+    for index, job in jobs:
+        console.log(f"[bold blue]Job {index}: {job['from_token']} -> {job['to_token']} on {chain}[/bold blue]")
+        try:
+            swap_manager = SwapManager(chain_config=get_chain_config(chain))
+            if journal is not None:
+                swap_manager.journal = journal.scoped(chain=chain, job=index)
+                if resume:
+                    swap_manager.resume_state = swap_manager.journal.wallet_states()
+            if job['stream'] and signed_output is not None:
+                console.log(f"[bold red]Job {index}: streamed jobs cannot be signed offline. Skipping.[/bold red]")
+                continue
+            if job['stream']:
+                # Streamed jobs read the key file chunk by chunk and report per chunk, not per wallet
+                settings = swap_manager.settings_from_plan_job(job)
+                wallet_file = swap_manager.wallet_file if job['wallets'] == 'default' else job['wallets']
+                source = WalletFileSource(wallet_file, start_offset=job['resume_offset'],
+                                          start_line=job['resume_line'], follow=job['follow'],
+                                          idle_timeout=config.WALLET_STREAM_IDLE_TIMEOUT)
+                swap_manager.stream_swaps(source, settings, concurrency=job['concurrency'])
+                continue
+            swap_manager.load_plan_wallets(job['wallets'])
+            if not swap_manager.wallet_private_keys:
+                console.log(f"[bold red]Job {index}: no private keys loaded. Skipping.[/bold red]")
+                continue
+            if resume:
+                swap_manager.drop_finished_wallets()
+                if not swap_manager.wallet_private_keys:
+                    console.log(f"[bold green]Job {index}: every wallet already finished.[/bold green]")
+                    continue
+            settings = swap_manager.settings_from_plan_job(job)
+        except (ValueError, OSError) as e:
+            console.log(f"[bold red]Job {index}: {e}. Skipping.[/bold red]")
+            continue
+        if signed_output is not None:
+            chain_results = swap_manager.sign_swaps_offline(settings, signed_output, concurrency=job['concurrency'])
+        else:
+            chain_results = swap_manager.start_swaps(concurrency=job['concurrency'], settings=settings)
+        for result in chain_results:
+            results.append({**result, 'chain': chain, 'job': index})
+    return results
+
+
+def print_multichain_report(chain_results, durations):
+    """Log one summary line per chain and the combined totals of a multi-chain batch."""
+    console.log("[bold blue]Multi-chain report:[/bold blue]")
+    totals = {}
+    for chain, results in chain_results.items():
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+            totals[result['status']] = totals.get(result['status'], 0) + 1
+        summary = ", ".join(f"{status}: {count}" for status, count in sorted(counts.items())) or "no swaps"
+        console.log(f"  - {chain}: {len(results)} wallets in {durations.get(chain, 0):.1f}s - {summary}")
+    summary = ", ".join(f"{status}: {count}" for status, count in sorted(totals.items())) or "no swaps"
+    wall_time = max(durations.values(), default=0)
+    console.log(f"[bold blue]Processed {sum(totals.values())} wallets on {len(chain_results)} chain(s) "
+                f"in {wall_time:.1f}s - {summary}[/bold blue]")
+
+
+def run_batch_plan(plan_file, max_parallel_chains=None, journal_file=None, resume=False, signed_file=None):
+    """
+    Headless entry point: run every job of a batch plan without any prompt.
+
+    Jobs are grouped by chain; chains run concurrently (up to max_parallel_chains, default
+    config.MAX_PARALLEL_CHAINS) while the jobs of one chain keep their plan order.
+    Progress is journaled to journal_file (default config.SWAP_JOURNAL_FILE); resume=True continues
+    the journal's last run, reconciling in-flight transactions and skipping finished wallets.
+    With signed_file nothing is sent: every swap is signed into that file for broadcast_signed_file
+    (not journaled, since there is nothing in flight to resume).
+    Returns the per-wallet results of all jobs in plan order, each tagged with 'chain' and 'job'.
+    """
+    jobs = load_batch_plan(plan_file)
+    console.log(f"[bold blue]Loaded batch plan with {len(jobs)} job(s) from {plan_file}[/bold blue]")
+
+    journal = None
+    journal_file = journal_file or config.SWAP_JOURNAL_FILE
+    signed_output = SignedTransactionFile(signed_file) if signed_file else None
+    if signed_output is not None:
+        if resume:
+            raise ValueError("Offline signing runs cannot be resumed")
+        console.log(f"[bold blue]Signing swaps into {signed_file} without sending them[/bold blue]")
+    elif journal_file:
+        run_id = SwapJournal.last_run_id(journal_file) if resume else None
+        if resume and run_id is None:
+            console.log(f"[yellow]No run to resume in {journal_file}, starting a new one[/yellow]")
+            resume = False
+        journal = SwapJournal(journal_file, run_id=run_id)
+        console.log(f"[bold blue]{'Resuming' if resume else 'Journaling'} run {journal.run_id} in {journal_file}[/bold blue]")
+    elif resume:
+        raise ValueError("Resuming needs a journal file")
+
+    jobs_by_chain = {}
+    for index, job in enumerate(jobs, start=1):
+        try:
+            chain = next(choice for choice in CHAIN_CHOICES if choice.lower() == job['chain'].lower())
+        except StopIteration:
+            console.log(f"[bold red]Job {index}: unknown chain '{job['chain']}'. Skipping.[/bold red]")
+            continue
+        jobs_by_chain.setdefault(chain, []).append((index, job))
+
+    chain_results = {}
+    durations = {}
+
+    def run_chain(chain):
+        started = time.monotonic()
+        try:
+            return run_chain_jobs(chain, jobs_by_chain[chain], journal=journal, resume=resume,
+                                  signed_output=signed_output)
+        except Exception as e:
+            console.log(f"[bold red]{chain}: batch aborted: {e}[/bold red]")
+            return []
+        finally:
+            durations[chain] = time.monotonic() - started
+
+    workers = max(1, min(len(jobs_by_chain), max_parallel_chains or config.MAX_PARALLEL_CHAINS))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chain") as executor:
+        futures = {chain: executor.submit(run_chain, chain) for chain in jobs_by_chain}
+        for chain, future in futures.items():
+            chain_results[chain] = future.result()
+
+    if journal is not None:
+        journal.close()
+    if signed_output is not None:
+        signed_output.close()
+    if len(chain_results) > 1:
+        print_multichain_report(chain_results, durations)
+    all_results = [result for results in chain_results.values() for result in results]
+    return sorted(all_results, key=lambda result: result['job'])
+
+
+def broadcast_signed_file(signed_file):
+    """
+    Headless entry point: send the signed transactions of a file written by an offline signing run
+    (run_batch_plan with signed_file), chain by chain, and wait for their receipts.
+    Returns the per-swap results tagged with their chain.
+    """
+    records = list(SignedTransactionFile.read(signed_file))
+    console.log(f"[bold blue]Loaded {len(records)} signed transactions from {signed_file}[/bold blue]")
+    results = []
+    for chain_id in sorted({int(record['chain_id']) for record in records}):
+        chain = next((choice for choice in CHAIN_CHOICES
+                      if int(get_chain_config(choice).CHAIN_ID) == chain_id), None)
+        if chain is None:
+            console.log(f"[bold red]No chain configured with id {chain_id}. Skipping its transactions.[/bold red]")
+            continue
+        swap_manager = SwapManager(chain_config=get_chain_config(chain))
+        for result in swap_manager.broadcast_signed_transactions(records):
+            results.append({**result, 'chain': chain})
+    return results
+
+
+def prefetch_token_metadata(chain_name):
+    """Fill the token metadata cache of a chain for every token in its tokens file."""
+    SwapManager(chain_config=get_chain_config(chain_name)).prefetch_token_metadata()
+
+
+def clear_token_metadata(chain_name, token_address=None):
+    """Explicitly invalidate the token metadata cache of a chain (one token or all of them)."""
+    swap_manager = SwapManager(chain_config=get_chain_config(chain_name))
+    swap_manager.token_cache.invalidate(token_address)
+    console.log(f"[bold green]Cleared token metadata cache {swap_manager.token_cache.path}[/bold green]")
 
 
 def main():
     """
     Main entry point. Prompt the user for which chain to use, then run the SwapManager with that chain config.
     """
-    chain_choices = ["POLYGON", "OP", "Base", "ARB", "Linea", "ETHER"]
-    chain_selection = questionary.select("Select chain:", choices=chain_choices).ask()
+    chain_selection = questionary.select("Select chain:", choices=CHAIN_CHOICES).ask()
 
     # Dynamically pick the chain config
-    if chain_selection == "POLYGON":
-        chain_config = config.POLYGON
-    elif chain_selection == "OP":
-        chain_config = config.OP
-    elif chain_selection == "Base":
-        chain_config = config.Base
-    elif chain_selection == "ARB":
-        chain_config = config.ARB
-    elif chain_selection == "Linea":
-        chain_config = config.Linea
-    elif chain_selection == "ETHER":
-        chain_config = config.ETHER
-    else:
+    try:
+        chain_config = get_chain_config(chain_selection)
+    except ValueError:
         # fallback
         chain_config = config.POLYGON
 
     # Initialize and run
-    swap_manager = SwapManager(chain_config=chain_config)
+    try:
+        swap_manager = SwapManager(chain_config=chain_config)
+    except (ValueError, OSError):
+        sys.exit(1)
     swap_manager.run()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Multi-wallet KyberSwap swaps")
+    parser.add_argument("--plan", help="Run a batch plan file (.json, .yaml or .csv) without prompts")
+    parser.add_argument("--prefetch-tokens", metavar="CHAIN", help="Fill the token metadata cache of a chain")
+    parser.add_argument("--clear-token-cache", metavar="CHAIN", help="Invalidate the token metadata cache of a chain")
+    parser.add_argument("--journal", help="Journal file of a batch plan run (default: SWAP_JOURNAL_FILE)")
+    parser.add_argument("--resume", action="store_true", help="Continue the last journaled run of the batch plan")
+    parser.add_argument("--sign-only", metavar="FILE", help="With --plan: sign every swap into FILE instead of sending it")
+    parser.add_argument("--broadcast", metavar="FILE", help="Send the signed transactions of a --sign-only FILE")
+    args = parser.parse_args()
+    if args.plan:
+        run_batch_plan(args.plan, journal_file=args.journal, resume=args.resume, signed_file=args.sign_only)
+    elif args.broadcast:
+        broadcast_signed_file(args.broadcast)
+    elif args.prefetch_tokens:
+        prefetch_token_metadata(args.prefetch_tokens)
+    elif args.clear_token_cache:
+        clear_token_metadata(args.clear_token_cache)
+    else:
+        main()
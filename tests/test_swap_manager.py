@@ -1,8 +1,13 @@
 import sys
 import types
 import os
+import json
 from types import SimpleNamespace
 from unittest.mock import MagicMock
+from concurrent.futures import Future, ThreadPoolExecutor
+import threading
+import time
+import queue
 
 # Provide minimal stubs for external packages if they are missing
 if 'web3' not in sys.modules:
@@ -14,15 +19,35 @@ if 'web3' not in sys.modules:
         def to_checksum_address(addr):
             return addr
     DummyWeb3.HTTPProvider = lambda url: None
+    DummyWeb3.to_wei = staticmethod(lambda value, unit: int(float(value) * 10**9))
+    DummyWeb3.from_wei = staticmethod(lambda value, unit: value / 10**9)
+    DummyWeb3.to_hex = staticmethod(lambda value: '0x' + bytes(value).hex())
     web3.Web3 = DummyWeb3
     exceptions = types.ModuleType('web3.exceptions')
     class ABIError(Exception):
         pass
     exceptions.ABIFunctionNotFound = ABIError
     exceptions.ContractLogicError = ABIError
+    exceptions.TransactionNotFound = type('TransactionNotFound', (Exception,), {})
     web3.exceptions = exceptions
+    providers = types.ModuleType('web3.providers')
+    class BaseProvider:
+        pass
+    providers.BaseProvider = BaseProvider
+    web3.providers = providers
     sys.modules['web3'] = web3
     sys.modules['web3.exceptions'] = exceptions
+    sys.modules['web3.providers'] = providers
+
+if 'hexbytes' not in sys.modules:
+    hexbytes = types.ModuleType('hexbytes')
+    class HexBytes(bytes):
+        def __new__(cls, value):
+            return super().__new__(cls, bytes.fromhex(value[2:]) if isinstance(value, str) else value)
+        def hex(self):
+            return '0x' + super().hex()
+    hexbytes.HexBytes = HexBytes
+    sys.modules['hexbytes'] = hexbytes
 
 if 'eth_account' not in sys.modules:
     eth_account = types.ModuleType('eth_account')
@@ -30,6 +55,10 @@ if 'eth_account' not in sys.modules:
         @staticmethod
         def from_key(key):
             return SimpleNamespace(address='0x'+key[-40:])
+        @staticmethod
+        def sign_transaction(tx, key):
+            raw = f"{key}:{tx['nonce']}".encode()
+            return SimpleNamespace(rawTransaction=raw, hash=raw[::-1])
     eth_account.Account = DummyAccount
     messages = types.ModuleType('eth_account.messages')
     messages.encode_structured_data = lambda *a, **k: None
@@ -66,6 +95,45 @@ if 'rich.logging' not in sys.modules:
 if 'config' not in sys.modules:
     cfg_stub = types.ModuleType('config')
     cfg_stub.KYBERSWAP_API_HEADERS = {}
+    cfg_stub.MAX_CONCURRENT_SWAPS = 4
+    cfg_stub.HTTP_POOL_SIZE = 4
+    cfg_stub.HTTP_TIMEOUT = (1, 1)
+    cfg_stub.HTTP_MAX_RETRIES = 2
+    cfg_stub.HTTP_BACKOFF = 0
+    cfg_stub.PIPELINE_APPROVALS = True
+    cfg_stub.STAGED_PIPELINE = False
+    cfg_stub.SWAP_PIPELINE_WORKERS = ''
+    cfg_stub.SWAP_PIPELINE_QUEUE = 32
+    cfg_stub.SIGNING_PROCESS_POOL_THRESHOLD = 200
+    cfg_stub.BROADCAST_WINDOW = 200
+    cfg_stub.REBROADCAST_AFTER = 12
+    cfg_stub.RBF_STUCK_AFTER = 0
+    cfg_stub.RBF_BUMP_PERCENT = 12.5
+    cfg_stub.RBF_MAX_FEE_MULTIPLIER = 2
+    cfg_stub.RBF_MAX_FEE_GWEI = 0
+    cfg_stub.RBF_MAX_REPLACEMENTS = 5
+    cfg_stub.RECEIPT_TIMEOUT = 5
+    cfg_stub.RECEIPT_POLL_INTERVAL = 0.01
+    cfg_stub.GAS_CACHE_TTL = 60
+    cfg_stub.GAS_CACHE_PER_BLOCK = False
+    cfg_stub.ROUTE_CACHE_TTL = 30
+    cfg_stub.ROUTE_AMOUNT_PRECISION = 0
+    cfg_stub.KYBERSWAP_RATE_LIMIT = 1000
+    cfg_stub.WALLET_PROCESS_POOL_THRESHOLD = 2000
+    cfg_stub.MAX_PARALLEL_CHAINS = 6
+    cfg_stub.RPC_TIMEOUT = 1
+    cfg_stub.RPC_COOLDOWN = 30
+    cfg_stub.RPC_BATCH_SIZE = 50
+    cfg_stub.PREFLIGHT_SWAPS = False
+    cfg_stub.WALLET_STREAM_CHUNK = 2
+    cfg_stub.SWAP_JOURNAL_FILE = None
+    cfg_stub.TIMINGS_FILE = ''
+    cfg_stub.WALLET_STREAM_IDLE_TIMEOUT = 0
+    cfg_stub.KYBERSWAP_ROUTER_ADDRESS = '0xrouter'
+    cfg_stub.KYBERSWAP_BURST = 1000
+    cfg_stub.MULTICALL3_ADDRESS = '0xca11'
+    cfg_stub.MULTICALL_BATCH_SIZE = 3
+    cfg_stub.MULTICALL3_ABI = cfg_stub.TOKEN_ABI = cfg_stub.ERC20_PERMIT_ABI = '[]'
     sys.modules['config'] = cfg_stub
 
 for mod in ['rich', 'requests']:
@@ -74,7 +142,9 @@ for mod in ['rich', 'requests']:
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from modules.kyberSwap import SwapManager
+import pytest
+
+from modules.kyberSwap import SwapManager, BurstBroadcaster, FeeAccelerator, SignedTransactionFile, StagedPipeline, StageTimer, SwapJournal, WalletFileSource, RPCProviderPool, NonceManager, ReceiptTracker, GasOracle, RouteCache, AdaptiveRateLimiter, bucket_amount, encode_call, load_batch_plan
 
 class DummyChainConfig:
     def __init__(self, wallet_file, tokens_file):
@@ -150,3 +220,933 @@ def test_check_eip2612_support_failure(tmp_path):
     manager.w3.eth.contract = MagicMock(return_value=contract)
     manager.w3.to_checksum_address = lambda x: x
     assert not manager.check_eip2612_support('token', 'owner')
+
+def test_start_swaps_concurrent_reports_each_wallet(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.wallet_private_keys = ['1' * 64, '2' * 64, '3' * 64]
+    settings = {'from_token': 'a', 'to_token': 'b', 'amount_mode': 'percent', 'amount': 50,
+                'slippage': 0.005, 'gas_tier': 'low', 'approval': 'Exact amount', 'confirm': False}
+    seen_settings = []
+
+    def fake_swap(private_key, swap_settings):
+        seen_settings.append(swap_settings)
+        if private_key.startswith('3'):
+            raise RuntimeError('boom')
+        return manager._swap_result('0x' + private_key[-40:], 'success', tx_hash='0xabc')
+
+    manager.swap_tokens_kyberswap = fake_swap
+    results = manager.start_swaps(concurrency=3, settings=settings)
+
+    assert len(results) == 3
+    assert all(s == {**settings, 'wait_for_receipt': False} for s in seen_settings)
+    statuses = sorted(r['status'] for r in results)
+    assert statuses == ['error', 'success', 'success']
+
+def test_load_batch_plan_json_applies_defaults(tmp_path):
+    plan = tmp_path / 'plan.json'
+    plan.write_text(json.dumps({
+        'defaults': {'chain': 'POLYGON', 'slippage': 1},
+        'jobs': [
+            {'from_token': 'wPOL', 'to_token': 'SAND', 'percent': 50, 'approval': 'unlimited', 'concurrency': 4},
+            {'from_token': 'SAND', 'to_token': 'wPOL', 'amount': '2.5', 'gas_tier': 'HIGH'},
+        ]
+    }))
+    jobs = load_batch_plan(str(plan))
+    assert jobs[0]['amount_mode'] == 'percent' and jobs[0]['amount'] == 50
+    assert jobs[0]['approval'] == 'unlimited' and jobs[0]['concurrency'] == 4
+    assert jobs[1]['amount_mode'] == 'fixed' and jobs[1]['amount'] == 2.5
+    assert jobs[1]['gas_tier'] == 'high' and jobs[1]['slippage'] == 1
+    assert jobs[1]['wallets'] == 'default'
+
+def test_load_batch_plan_csv_rejects_amount_and_percent(tmp_path):
+    plan = tmp_path / 'plan.csv'
+    plan.write_text('chain,from_token,to_token,amount,percent\nPOLYGON,wPOL,SAND,1,50\n')
+    with pytest.raises(ValueError):
+        load_batch_plan(str(plan))
+
+def test_settings_from_plan_job_resolves_symbols(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.tokens = {'WPOL (0xaaa)': '0xaaa', 'SAND (0xbbb)': '0xbbb'}
+    plan = tmp_path / 'plan.csv'
+    plan.write_text('chain,from_token,to_token,percent,slippage\nPOLYGON,wpol,SAND,25,0.3\n')
+    settings = manager.settings_from_plan_job(load_batch_plan(str(plan))[0])
+    assert settings['from_token'] == '0xaaa' and settings['to_token'] == '0xbbb'
+    assert settings['approval'] == 'Exact amount'
+    assert settings['slippage'] == pytest.approx(0.003)
+    assert settings['confirm'] is False
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self._payload = payload or {}
+        self.text = json.dumps(self._payload)
+    def raise_for_status(self):
+        pass
+    def json(self):
+        return self._payload
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.responses.pop(0)
+
+def test_http_request_retries_rate_limited_responses(tmp_path):
+    manager = create_manager(str(tmp_path))
+    session = FakeSession([FakeResponse(429), FakeResponse(503), FakeResponse(200, {'code': 0, 'data': {}})])
+    manager._http_session = session
+    route = manager.get_swap_route('test', '0xa', '0xb', 100)
+    assert route == {'code': 0, 'data': {}}
+    assert len(session.calls) == 3
+    assert all(call[2]['timeout'] == (1, 1) for call in session.calls)
+
+def test_http_request_returns_last_response_when_retries_exhausted(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager._http_session = FakeSession([FakeResponse(500)] * 3)
+    assert manager.http_request('GET', 'http://api').status_code == 500
+
+def test_snapshot_wallets_batches_reads_through_multicall(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.w3.eth.contract = MagicMock()
+    manager.w3.codec = SimpleNamespace(decode=lambda types, data: (int.from_bytes(data, 'big'),))
+    values = {'0x313ce567': 6, '0x70a08231': 2500000, '0xdd62ed3e': 7}  # decimals, balanceOf, allowance
+    batches = []
+
+    def fake_aggregate3(chunk):
+        batches.append(chunk)
+        return MagicMock(call=lambda: [(True, values[data[:10]].to_bytes(32, 'big')) for _, _, data in chunk])
+    manager.get_contract(manager.multicall_address, 'MULTICALL3_ABI').functions.aggregate3.side_effect = fake_aggregate3
+
+    snapshot = manager.snapshot_wallets(['0xtoken'], owners=['0xa', '0xb'], spender='0xrouter')
+
+    # 1 decimals + 2 x (balanceOf + allowance) = 5 calls in batches of 3
+    assert [len(batch) for batch in batches] == [3, 2]
+    assert snapshot['tokens']['0xtoken']['decimals'] == 6
+    entry = snapshot['wallets']['0xb']['0xtoken']
+    assert entry['balance'] == 2500000 and entry['human_balance'] == 2.5 and entry['allowance'] == 7
+
+def test_token_cache_skips_rpc_after_first_lookup(tmp_path):
+    manager = create_manager(str(tmp_path))
+    contract = _mock_contract()
+    manager.w3.eth.contract = MagicMock(return_value=contract)
+    manager.w3.to_checksum_address = lambda x: x
+    assert manager.check_eip2612_support('0xToken', 'owner')
+
+    # A new manager on the same chain directory reads the persisted entry without any RPC
+    other = create_manager(str(tmp_path))
+    other.w3.eth.contract = MagicMock(side_effect=AssertionError('RPC should not be used'))
+    assert other.check_eip2612_support('0xtoken', 'owner')
+
+    # Writing values the cache already holds leaves the file alone
+    other.token_cache._save = MagicMock()
+    other.token_cache.update('0xToken', permit=True)
+    other.token_cache._save.assert_not_called()
+    other.token_cache.update('0xToken', version='2')
+    other.token_cache._save.assert_called_once()
+    del other.token_cache._save
+
+    other.token_cache.invalidate('0xToken')
+    assert other.token_cache.get('0xToken') is None
+
+def test_permit_metadata_is_not_cached_after_rpc_errors(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.chain_config.ERC20_PERMIT_ABI = '[]'
+    manager.w3.to_checksum_address = lambda x: x
+    contract = MagicMock()
+    contract.functions.name.return_value.call.return_value = 'Token'
+    contract.functions.nonces.return_value.call.return_value = 0
+    contract.functions.version.return_value.call.side_effect = ConnectionError('connection reset')
+    manager.get_contract = MagicMock(return_value=contract)
+    manager.get_permit_data('0xToken', 'owner', 'spender', 1, 2, '1' * 64)
+    assert manager.token_cache.get('0xToken') == {'name': 'Token'}
+
+    # A rate-limited nonces() call is no proof the token lacks permits
+    contract = _mock_contract()
+    contract.get_function_by_signature.side_effect = lambda sig: MagicMock(
+        return_value=MagicMock(call=MagicMock(side_effect=ValueError({'code': 429, 'message': 'rate limited'}))))
+    manager.get_contract = MagicMock(return_value=contract)
+    assert not manager.check_eip2612_support('0xToken', 'owner')
+    assert manager.token_cache.get('0xToken', 'permit') is None
+
+def test_nonce_manager_allocates_locally_and_resyncs():
+    pending = {'0xa': 5}
+    w3 = SimpleNamespace(eth=SimpleNamespace(get_transaction_count=lambda addr, block: pending[addr]))
+    nonces = NonceManager(w3)
+    assert [nonces.allocate('0xa') for _ in range(3)] == [5, 6, 7]
+
+    # Releasing the latest nonce reuses it, releasing an older one resyncs from the node
+    nonces.release('0xa', 7)
+    assert nonces.allocate('0xa') == 7
+    pending['0xa'] = 6
+    nonces.release('0xa', 5)
+    assert nonces.allocate('0xa') == 6
+
+def test_nonce_manager_resyncs_on_nonce_errors_and_locks_per_address():
+    pending = {'0xa': 5, '0xb': 0}
+    slow = threading.Event()
+
+    def get_transaction_count(address, block):
+        if address == '0xb':
+            slow.wait(1)  # the node is slow for 0xb only
+        return pending[address]
+
+    nonces = NonceManager(SimpleNamespace(eth=SimpleNamespace(get_transaction_count=get_transaction_count)))
+    assert nonces.allocate('0xa') == 5
+    # An external transaction used nonce 5: reusing the latest nonce would fail again, so it resyncs
+    pending['0xa'] = 6
+    nonces.release('0xa', 5, ValueError({'code': -32000, 'message': 'nonce too low'}))
+    assert nonces.allocate('0xa') == 6
+
+    worker = threading.Thread(target=nonces.allocate, args=('0xb',))
+    worker.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    assert nonces.allocate('0xa') == 7
+    assert time.monotonic() - started < 0.5
+    slow.set()
+    worker.join()
+
+class TxHash(bytes):
+    def hex(self):
+        return '0x' + super().hex()
+
+def test_receipt_tracker_resolves_success_revert_and_timeout():
+    mined = {}
+    w3 = SimpleNamespace(eth=SimpleNamespace(get_transaction_receipt=lambda h: mined.get(h)))
+    tracker = ReceiptTracker(w3, timeout=60)
+    ok, reverted, lost = TxHash(b'\x01'), TxHash(b'\x02'), TxHash(b'\x03')
+    callbacks = []
+    futures = [tracker.track(ok, callback=callbacks.append), tracker.track(reverted), tracker.track(lost)]
+
+    assert tracker.poll_once() == 3
+    mined[ok] = {'status': 1}
+    mined[reverted] = {'status': 0}
+    assert tracker.poll_once() == 1
+    tracker.timeout = 0
+    tracker._pending[lost.hex()] = (lost, futures[2], 0)
+    assert tracker.poll_once() == 0
+
+    assert [f.result()['status'] for f in futures] == ['success', 'failed', 'timeout']
+    assert callbacks == [futures[0]]
+
+def test_start_swaps_resolves_pending_handles(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.wallet_private_keys = ['1' * 64]
+    seen = []
+
+    def fake_swap(private_key, settings):
+        seen.append(settings['wait_for_receipt'])
+        result = manager._swap_result('0x1', 'pending', tx_hash='0xabc')
+        result['handle'] = handle = Future()
+        result['approval_handle'] = None
+        handle.set_result({'status': 'failed', 'tx_hash': '0xabc', 'receipt': {'status': 0}})
+        return result
+
+    manager.swap_tokens_kyberswap = fake_swap
+    results = manager.start_swaps(concurrency=1, settings={'confirm': False})
+    assert seen == [False]
+    assert results[0]['status'] == 'failed' and 'handle' not in results[0]
+
+def test_gas_oracle_caches_api_fees():
+    tiers = {t: {'suggestedMaxFeePerGas': '30', 'suggestedMaxPriorityFeePerGas': '2'} for t in ('low', 'medium', 'high')}
+    session = FakeSession([FakeResponse(200, tiers)])
+    oracle = GasOracle(SimpleNamespace(eth=SimpleNamespace()), 'http://gas/v3/key/networks/1/suggestedGasFees',
+                       session.request, ttl=60)
+    assert oracle.get_fees('medium') == (30 * 10**9, 2 * 10**9)
+    assert oracle.get_fees('HIGH') == (30 * 10**9, 2 * 10**9)
+    assert len(session.calls) == 1
+
+def test_gas_oracle_falls_back_to_fee_history_without_api_key():
+    history = {'baseFeePerGas': [10, 12, 14], 'reward': [[1, 5, 9], [3, 7, 11]]}
+    eth = SimpleNamespace(fee_history=MagicMock(return_value=history))
+    oracle = GasOracle(SimpleNamespace(eth=eth), 'https://gas.api.infura.io/v3/None/networks/1/suggestedGasFees',
+                       MagicMock(side_effect=AssertionError('gas API should not be called')))
+    assert oracle.get_fees('low') == (2 * 14 + 3, 3)
+    assert oracle.get_fees('high') == (2 * 14 + 11, 11)
+    assert oracle.source == 'eth_feeHistory'
+    eth.fee_history.assert_called_once()
+
+def test_route_cache_reuses_and_copies_routes(tmp_path):
+    manager = create_manager(str(tmp_path))
+    route = {'code': 0, 'data': {'routeSummary': {'amountIn': '100'}, 'routerAddress': '0xr'}}
+    session = FakeSession([FakeResponse(200, route)])
+    manager._http_session = session
+
+    first = manager.get_swap_route('test', '0xA', '0xB', 100)
+    first['data']['routeSummary']['permit'] = 'wallet-specific'
+    second = manager.get_swap_route('test', '0xa', '0xb', 100)
+
+    assert len(session.calls) == 1
+    assert 'permit' not in second['data']['routeSummary']
+    assert manager.route_cache.stats['hits'] == 1
+
+def test_route_cache_coalesces_concurrent_lookups():
+    cache = RouteCache(ttl=30)
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'code': 0}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(cache.get_or_fetch, 'key', slow_fetch) for _ in range(4)]
+        while cache.stats['misses'] + cache.stats['coalesced'] < 4:
+            time.sleep(0.01)
+        release.set()
+        assert all(f.result() == {'code': 0} for f in futures)
+    assert len(calls) == 1 and cache.stats['coalesced'] == 3
+
+def test_bucket_amount_rounds_down_to_significant_digits():
+    assert bucket_amount(123456789, 3) == 123000000
+    assert bucket_amount(999, 3) == 999
+    assert bucket_amount(123456789, 0) == 123456789
+
+def test_rate_limiter_adapts_to_throttling(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.aggregator_limiter = limiter = AdaptiveRateLimiter(rate=1000, burst=1000)
+    manager._http_session = FakeSession([FakeResponse(429, headers={'Retry-After': '0'}),
+                                         FakeResponse(200, {'code': 0, 'data': {}})])
+    assert manager.get_swap_route('test', '0xa', '0xb', 1) == {'code': 0, 'data': {}}
+    metrics = limiter.summary()
+    assert metrics['calls'] == 2 and metrics['throttled'] == 1 and metrics['retried'] == 1
+    assert metrics['failed'] == 0 and limiter.rate == 600.0  # halved to 500, then +10% of max
+
+def test_rate_limiter_spaces_requests_beyond_burst():
+    limiter = AdaptiveRateLimiter(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.035
+
+def test_encode_call_uses_precomputed_selectors():
+    owner = '0x' + 'Ab' * 20
+    spender = '0x' + '12' * 20
+    assert encode_call('decimals') == '0x313ce567'
+    assert encode_call('allowance', owner, spender) == '0xdd62ed3e' + '0' * 24 + 'ab' * 20 + '0' * 24 + '12' * 20
+
+def test_token_reads_use_cached_contracts_and_direct_calls(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.w3.eth.contract = MagicMock(return_value=MagicMock())
+    manager.w3.eth.call = MagicMock(side_effect=lambda tx: (18 if tx['data'] == '0x313ce567' else 5 * 10**18).to_bytes(32, 'big'))
+
+    def batch(payload):
+        results = {'eth_getTransactionCount': hex(7), 'eth_call': None}
+        return FakeResponse(200, [
+            {'id': call['id'], 'result': results[call['method']] or
+             '0x' + (18 if call['params'][0]['data'] == '0x313ce567' else 5 * 10**18).to_bytes(32, 'big').hex()}
+            for call in payload
+        ])
+    session = FakeRPCSession({'http://localhost': batch})
+    manager.rpc_pool._session = session
+
+    # Balance, decimals and pending nonce come back from a single batch POST
+    assert manager.check_token_balance('0x' + '1' * 40, '0x' + '2' * 40) == (5 * 10**18, 5.0, 18)
+    assert len(session.calls) == 1
+    assert manager.nonce_manager.allocate('0x' + '2' * 40) == 7
+    assert manager.check_allowance('0x' + '1' * 40, '0x' + '2' * 40, '0x' + '3' * 40) == 5 * 10**18
+    manager.get_contract('0xToken', 'TOKEN_ABI')
+    manager.get_contract('0xtoken', 'TOKEN_ABI')
+    manager.w3.eth.contract.assert_called_once()
+
+def test_bulk_wallet_loader_uses_process_pool_and_address_cache(tmp_path):
+    keys = ['%064x' % n for n in range(1, 6)] + ['not-a-key']
+    manager = create_manager(str(tmp_path))
+    manager.wallet_process_threshold = 2
+    manager.load_wallets_from_keys(keys)
+    assert manager.wallet_private_keys == keys[:5]
+    assert manager.wallet_addresses == ['0x' + key[-40:] for key in keys[:5]]
+
+    # Second load is served from the key-hash cache without deriving again
+    cached = create_manager(str(tmp_path))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(sys.modules['modules.kyberSwap'], '_derive_addresses', MagicMock(side_effect=AssertionError))
+        cached.load_wallets_from_keys(keys[:5])
+    assert cached.wallet_addresses == manager.wallet_addresses
+
+def test_bulk_wallet_loader_survives_spawned_workers_that_cannot_import_the_module(tmp_path, monkeypatch):
+    import multiprocessing
+    keys = ['%064x' % n for n in range(1, 5)]
+    manager = create_manager(str(tmp_path))
+    manager.wallet_process_threshold = 2
+    manager.process_context = multiprocessing.get_context('spawn')
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    # Spawned workers re-import the module without the test's dependency stubs, so the pool breaks
+    # and addresses are derived in-process instead
+    assert manager.derive_addresses(keys, use_cache=False) == ['0x' + key[-40:] for key in keys]
+
+def test_wallet_address_cache_keeps_entries_of_parallel_writers(tmp_path):
+    cache_path = str(tmp_path / 'wallet_address_cache.json')
+    writers = [threading.Thread(target=SwapManager._write_address_cache, args=(cache_path, {f'h{n}': f'0x{n}'}))
+               for n in range(8)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    with open(cache_path) as f:
+        assert json.load(f) == {f'h{n}': f'0x{n}' for n in range(8)}
+    assert os.listdir(tmp_path) == ['wallet_address_cache.json']
+
+def test_lazy_module_imports_on_first_use():
+    from modules.kyberSwap import _LazyModule
+    lazy = _LazyModule('lazy_probe_module')
+    assert 'lazy_probe_module' not in sys.modules
+    probe = types.ModuleType('lazy_probe_module')
+    probe.value = 42
+    sys.modules['lazy_probe_module'] = probe
+    try:
+        assert lazy.value == 42
+    finally:
+        del sys.modules['lazy_probe_module']
+
+
+def test_batch_plan_runs_chains_in_parallel(tmp_path, monkeypatch):
+    import modules.kyberSwap as ks
+    plan = tmp_path / "plan.json"
+    plan.write_text(json.dumps({
+        "defaults": {"from_token": "A", "to_token": "B", "amount": 1},
+        "jobs": [{"chain": "POLYGON"}, {"chain": "arb"}, {"chain": "POLYGON"}, {"chain": "nowhere"}],
+    }))
+
+    class FakeManager:
+        def __init__(self, chain_config):
+            self.chain = chain_config
+            self.wallet_private_keys = ['k']
+        def load_plan_wallets(self, wallets):
+            pass
+        def settings_from_plan_job(self, job):
+            return {}
+        def start_swaps(self, concurrency=1, settings=None):
+            time.sleep(0.2)
+            return [{'wallet': '0x1', 'status': 'success', 'detail': '', 'tx_hash': None}]
+
+    monkeypatch.setattr(ks, 'SwapManager', FakeManager)
+    monkeypatch.setattr(ks, 'get_chain_config', lambda name: name)
+    started = time.monotonic()
+    results = ks.run_batch_plan(str(plan))
+    # POLYGON runs its two jobs back to back while ARB runs alongside
+    assert time.monotonic() - started < 0.55
+    assert [(r['chain'], r['job']) for r in results] == [('POLYGON', 1), ('ARB', 2), ('POLYGON', 3)]
+
+
+def test_batch_plan_skips_job_with_missing_wallet_file(tmp_path, monkeypatch):
+    import modules.kyberSwap as ks
+    wallets = tmp_path / "wallets.txt"
+    wallets.write_text('1' * 64 + '\n')
+    plan = tmp_path / "plan.json"
+    plan.write_text(json.dumps({
+        "defaults": {"chain": "POLYGON", "from_token": "A", "to_token": "B", "amount": 1},
+        "jobs": [{"wallets": str(tmp_path / "missing.txt")}, {"wallets": str(wallets)}],
+    }))
+    tokens_file = tmp_path / 'tokens.txt'
+    tokens_file.write_text('')
+    monkeypatch.setattr(ks, 'get_chain_config', lambda name: DummyChainConfig(str(wallets), str(tokens_file)))
+    monkeypatch.setattr(ks.SwapManager, 'settings_from_plan_job', lambda self, job: {})
+    monkeypatch.setattr(ks.SwapManager, 'start_swaps', lambda self, concurrency=1, settings=None: [
+        self._swap_result(address, 'success') for address in self.wallet_addresses])
+
+    results = ks.run_batch_plan(str(plan))
+    assert [(r['job'], r['status']) for r in results] == [(2, 'success')]
+
+
+class FakeRPCSession:
+    """Stand-in for several JSON-RPC servers: url -> handler(payload) returning a FakeResponse."""
+    def __init__(self, handlers):
+        self.handlers = handlers
+        self.calls = []
+    def request(self, method, url, json=None, **kwargs):
+        self.calls.append((url, [call['method'] for call in json] if isinstance(json, list) else json['method']))
+        return self.handlers[url](json)
+
+def _rpc_ok(result, delay=0):
+    def handler(payload):
+        time.sleep(delay)
+        return FakeResponse(200, {'jsonrpc': '2.0', 'id': payload['id'], 'result': result})
+    return handler
+
+def test_rpc_pool_fails_over_and_prefers_fastest_endpoint():
+    session = FakeRPCSession({
+        'http://down': lambda payload: FakeResponse(503),
+        'http://slow': _rpc_ok('0x1', delay=0.05),
+        'http://fast': _rpc_ok('0x1'),
+    })
+    pool = RPCProviderPool(['http://down', 'http://slow', 'http://fast'], session=session)
+    assert pool.make_request('eth_blockNumber', [])['result'] == '0x1'
+    pool.health_check()
+    session.calls.clear()
+    for _ in range(3):
+        pool.make_request('eth_chainId', [])
+    # The failed endpoint cools down and reads go to the lowest-latency one
+    assert [url for url, _ in session.calls] == ['http://fast'] * 3
+    assert [e['healthy'] for e in pool.stats()] == [False, True, True]
+
+def test_rpc_pool_broadcasts_raw_transactions_to_every_endpoint():
+    session = FakeRPCSession({
+        'http://a': lambda payload: FakeResponse(200, {'id': payload['id'], 'error': {'code': -32000, 'message': 'already known'}}),
+        'http://b': _rpc_ok('0xhash', delay=0.02),
+    })
+    pool = RPCProviderPool(['http://a', 'http://b'], session=session)
+    assert pool.make_request('eth_sendRawTransaction', ['0xraw'])['result'] == '0xhash'
+    assert sorted(url for url, _ in session.calls) == ['http://a', 'http://b']
+
+def test_receipt_tracker_fetches_all_receipts_in_one_batch():
+    hashes = [TxHash(bytes([n]) * 32) for n in (1, 2, 3)]
+    def batch(payload):
+        receipts = {hashes[0].hex(): {'status': '0x1', 'blockNumber': '0x10'}, hashes[1].hex(): {'status': '0x0'}}
+        return FakeResponse(200, [{'id': call['id'], 'result': receipts.get(call['params'][0])} for call in payload])
+    session = FakeRPCSession({'http://rpc': batch})
+    tracker = ReceiptTracker(SimpleNamespace(eth=SimpleNamespace()), timeout=60,
+                             rpc_pool=RPCProviderPool(['http://rpc'], session=session))
+    futures = [tracker.track(tx_hash) for tx_hash in hashes]
+    assert tracker.poll_once() == 1
+    assert len(session.calls) == 1
+    assert futures[0].result()['status'] == 'success' and futures[0].result()['receipt']['blockNumber'] == 16
+    assert futures[1].result()['status'] == 'failed'
+    assert not futures[2].done()
+
+def test_preflight_plan_skips_and_flags_wallets_before_swapping(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.preflight = True
+    token, native = '0x' + 'a' * 40, '0xEeeeeEeeeEeEeeEeEeEeeEEEeeeeEeeeeeeeEEeE'
+    manager.wallet_private_keys = ['1' * 64, '2' * 64, '3' * 64]
+    manager.wallet_addresses = ['0x1', '0x2', '0x3']
+    balances = {'0x1': (10**18, 10**18), '0x2': (0, 10**18), '0x3': (5 * 10**18, 0)}
+    allowances = {'0x1': 0, '0x2': 0, '0x3': 0}
+    snapshot = {
+        'tokens': {token: {'decimals': 18}, native: {'decimals': 18}},
+        'wallets': {owner: {
+            token: {'balance': bal, 'human_balance': bal / 10**18, 'allowance': allowances[owner]},
+            native: {'balance': gas, 'human_balance': gas / 10**18, 'allowance': float('inf')},
+        } for owner, (bal, gas) in balances.items()},
+    }
+    manager.token_cache.update(token, permit=False)
+    manager.snapshot_wallets = MagicMock(return_value=snapshot)
+    manager.rpc_pool._session = FakeRPCSession({'http://localhost': lambda payload: FakeResponse(
+        200, [{'id': call['id'], 'result': '0x4'} for call in payload])})
+
+    executed = []
+    def fake_swap(private_key, settings):
+        executed.append(settings['preflight'])
+        return manager._swap_result(settings['preflight']['wallet'], 'success')
+    manager.swap_tokens_kyberswap = fake_swap
+
+    settings = {'from_token': token, 'to_token': '0xb', 'amount_mode': 'percent', 'amount': 50,
+                'slippage': 0.005, 'gas_tier': 'low', 'approval': 'Exact amount', 'confirm': False}
+    results = manager.start_swaps(concurrency=2, settings=settings)
+
+    manager.snapshot_wallets.assert_called_once()
+    assert [(row['wallet'], row['action'], row['amount_in_wei']) for row in executed] == [('0x1', 'approve', 5 * 10**17)]
+    assert sorted((r['wallet'], r['status'], r['detail']) for r in results) == [
+        ('0x1', 'success', ''), ('0x2', 'skipped', 'Zero balance for the input token'),
+        ('0x3', 'skipped', 'No native balance for gas')]
+    assert manager.nonce_manager.allocate('0x3') == 4
+
+def test_wallet_file_source_streams_and_resumes(tmp_path):
+    keys = ['%064x' % n for n in range(1, 6)]
+    wallet_file = tmp_path / 'wallets.txt'
+    wallet_file.write_text('\n'.join(['# header', keys[0], 'bad', keys[1], '', keys[2], keys[3], keys[4]]))
+
+    source = WalletFileSource(str(wallet_file))
+    first = [entry['private_key'] for entry in next(source.chunks(2))]
+    assert first == keys[:2] and source.invalid_lines == [3]
+
+    # Resuming from the byte offset (or the line number) continues right after the last key
+    resumed = WalletFileSource(str(wallet_file), start_offset=source.offset, start_line=source.line)
+    assert [(e['line'], e['private_key']) for e in resumed] == [(6, keys[2]), (7, keys[3]), (8, keys[4])]
+    by_line = WalletFileSource(str(wallet_file), start_line=6)
+    assert [e['private_key'] for e in by_line] == keys[3:]
+
+def test_stream_swaps_runs_chunks_with_bounded_wallet_lists(tmp_path):
+    keys = ['%064x' % n for n in range(1, 6)]
+    wallet_file = tmp_path / 'wallets.txt'
+    wallet_file.write_text('\n'.join(keys) + '\n')
+    manager = create_manager(str(tmp_path))
+    chunk_sizes = []
+
+    def fake_start_swaps(concurrency=1, settings=None):
+        chunk_sizes.append(len(manager.wallet_addresses))
+        return [manager._swap_result(address, 'success') for address in manager.wallet_addresses]
+    manager.start_swaps = fake_start_swaps
+
+    summary = manager.stream_swaps(WalletFileSource(str(wallet_file)), {'from_token': '0xa'}, chunk_size=2)
+    assert chunk_sizes == [2, 2, 1]
+    assert summary == {'counts': {'success': 5}, 'line': 5, 'offset': wallet_file.stat().st_size}
+    assert manager.wallet_private_keys == []
+
+def test_swap_journal_survives_torn_lines_and_scopes_runs(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = SwapJournal(path, run_id='run-1')
+    polygon = journal.scoped(chain='POLYGON', job=1)
+    polygon.record('0x1', 'planned')
+    polygon.record('0x1', 'sent', tx_hash='0xaa', nonce=3)
+    journal.scoped(chain='ARB', job=2).record('0x1', 'confirmed')
+    journal.close()
+    with open(path, 'a') as f:
+        f.write('{"run": "run-1", "wallet": "0x2", "sta')  # crash mid-write
+
+    assert SwapJournal.last_run_id(path) == 'run-1'
+    assert SwapJournal(path).run_id != SwapJournal(path).run_id
+    states = SwapJournal(path, run_id='run-1', scope={'chain': 'POLYGON', 'job': 1}).wallet_states()
+    assert list(states) == ['0x1']
+    assert (states['0x1']['state'], states['0x1']['tx_hash'], states['0x1']['nonce']) == ('sent', '0xaa', 3)
+
+def test_resume_skips_finished_and_reconciles_in_flight_wallets(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.journal = SwapJournal(str(tmp_path / 'journal.jsonl'), run_id='r')
+    manager.wallet_private_keys = ['k1', 'k2', 'k3', 'k4', 'k5']
+    manager.wallet_addresses = ['0x1', '0x2', '0x3', '0x4', '0x5']
+    manager.resume_state = {
+        '0x1': {'state': 'confirmed'},
+        '0x2': {'state': 'sent', 'tx_hash': '0xmined', 'nonce': 1},
+        '0x3': {'state': 'sent', 'tx_hash': '0xgone', 'nonce': 4},
+        '0x4': {'state': 'sent', 'tx_hash': '0xmempool', 'nonce': 7},
+    }
+    not_found = sys.modules['web3'].exceptions.TransactionNotFound
+    def receipt(tx_hash):
+        if tx_hash == '0xmined':
+            return {'status': 1}
+        raise not_found(tx_hash)
+    def transaction(tx_hash):
+        if tx_hash == '0xmempool':
+            return {'hash': tx_hash}
+        raise not_found(tx_hash)
+    manager.w3.eth.get_transaction_receipt = receipt
+    manager.w3.eth.get_transaction = transaction
+    manager.w3.eth.get_transaction_count = lambda address, block: 4
+
+    manager.drop_finished_wallets()
+    # Dropped 0x3 is retried, never-started 0x5 runs, the rest are left alone
+    assert manager.wallet_addresses == ['0x3', '0x5']
+    assert manager.wallet_private_keys == ['k3', 'k5']
+    assert {w: s['state'] for w, s in manager.journal.wallet_states().items()} == {'0x2': 'confirmed', '0x3': 'dropped'}
+
+def test_resume_reconciles_approvals_and_every_replacement_of_a_swap(tmp_path):
+    manager = create_manager(str(tmp_path))
+    journal = manager.journal = SwapJournal(str(tmp_path / 'journal.jsonl'), run_id='r')
+    journal.record('0x1', 'approved', tx_hash='0xappr1', nonce=0)            # approval still in the mempool
+    journal.record('0x2', 'approved', tx_hash='0xappr2', nonce=0)            # approval mined, swap never sent
+    journal.record('0x3', 'sent', tx_hash='0xswap3', nonce=1)
+    journal.record('0x3', 'sent', tx_hash='0xbump3', nonce=1, replaces='0xswap3')  # original version mined
+    journal.record('0x4', 'sent', tx_hash='0xswap4', nonce=1)                # nonce taken by a foreign transaction
+    manager.resume_state = journal.wallet_states()
+    manager.wallet_private_keys = ['k1', 'k2', 'k3', 'k4']
+    manager.wallet_addresses = ['0x1', '0x2', '0x3', '0x4']
+    not_found = sys.modules['web3'].exceptions.TransactionNotFound
+    receipts = {'0xappr2': {'status': 1}, '0xswap3': {'status': 1}}
+    def receipt(tx_hash):
+        if tx_hash in receipts:
+            return receipts[tx_hash]
+        raise not_found(tx_hash)
+    def transaction(tx_hash):
+        if tx_hash == '0xappr1':
+            return {'hash': tx_hash}
+        raise not_found(tx_hash)
+    manager.w3.eth.get_transaction_receipt = receipt
+    manager.w3.eth.get_transaction = transaction
+    manager.w3.eth.get_transaction_count = lambda address, block: 0 if address == '0x1' else 2
+
+    manager.drop_finished_wallets()
+    assert manager.wallet_addresses == ['0x2', '0x4']
+    states = journal.wallet_states()
+    assert (states['0x3']['state'], states['0x3']['tx_hash']) == ('confirmed', '0xswap3')
+    assert states['0x4']['state'] == 'replaced'
+
+def test_stage_timer_summarizes_and_exports_spans(tmp_path):
+    jsonl = tmp_path / 'spans.jsonl'
+    timer = StageTimer(labels={'chain': 'test'}, jsonl_path=str(jsonl))
+    for seconds in range(1, 21):
+        timer.record('route', seconds / 10, wallet='0x1')
+    with pytest.raises(RuntimeError):
+        with timer.span('build', '0x2'):
+            raise RuntimeError('aggregator down')
+    timer.close()
+
+    summary = timer.summary()
+    assert (summary['route']['count'], summary['route']['p50'], summary['route']['p95']) == (20, 1.0, 1.9)
+    spans = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert len(spans) == 21 and spans[-1]['stage'] == 'build' and spans[-1]['ok'] is False
+
+    prom = tmp_path / 'swap.prom'
+    timer.write_prometheus(str(prom))
+    text = prom.read_text()
+    assert 'mwswap_stage_seconds{chain="test",stage="route",quantile="0.95"} 1.900000' in text
+    assert 'mwswap_stage_seconds_count{chain="test",stage="route"} 20' in text
+
+def test_staged_pipeline_overlaps_stages_and_keeps_input_order():
+    events = []
+    lock = threading.Lock()
+    second_started = threading.Event()
+
+    def first(item):
+        with lock:
+            events.append(('first', item))
+        if item == 2:
+            return 'skipped'
+        if item == 3:
+            # Items ahead are already in the next stage while this one is still here
+            assert second_started.wait(1)
+        return None
+
+    def second(item):
+        second_started.set()
+        with lock:
+            events.append(('second', item))
+        if item == 4:
+            raise RuntimeError('boom')
+        return f'done-{item}'
+
+    pipeline = StagedPipeline([('first', first, 1), ('second', second, 2)], queue_size=1,
+                              on_error=lambda item, error: f'error-{item}: {error}')
+    results = pipeline.run(range(6))
+    assert results == ['done-0', 'done-1', 'skipped', 'done-3', 'error-4: boom', 'done-5']
+    assert ('second', 2) not in events
+    assert events.index(('second', 0)) < events.index(('first', 3))
+
+def test_staged_pipeline_resolves_returned_futures_without_holding_workers():
+    pending = []
+
+    def confirm(item):
+        future = Future()
+        pending.append((item, future))
+        return future
+
+    pipeline = StagedPipeline([('confirm', confirm, 1)], queue_size=1,
+                              on_error=lambda item, error: f'error-{item}: {error}')
+    runner = threading.Thread(target=lambda: pending.append(('results', pipeline.run(range(4)))))
+    runner.start()
+    deadline = time.monotonic() + 2
+    # One worker took every item although none of their futures has resolved yet
+    while len(pending) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [item for item, _ in pending] == [0, 1, 2, 3]
+    for item, future in reversed(pending[:4]):
+        if item == 2:
+            future.set_exception(RuntimeError('reverted'))
+        else:
+            future.set_result(f'done-{item}')
+    runner.join(1)
+    assert pending[-1] == ('results', ['done-0', 'done-1', 'error-2: reverted', 'done-3'])
+
+def test_start_swaps_runs_concurrent_batches_through_stage_workers(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.staged_pipeline = True
+    manager.pipeline_workers = {'sign': 1}
+    manager.wallet_private_keys = ['k1', 'k2', 'k3']
+    signing = []
+
+    def plan(job):
+        job['sender'] = '0x' + job['private_key']
+        if job['private_key'] == 'k2':
+            return manager._swap_result(job['sender'], 'skipped', 'Zero balance for the input token')
+
+    def sign(job):
+        signing.append(job['sender'])
+        job['approval_tx_hash'] = None
+        job['signed'] = {'tx_hash': job['sender'].encode(), 'raw_transaction': b'raw', 'nonce': 0,
+                         'tx': {}, 'sign': None}
+
+    def submit(raw, tx_hash, on_sent=None):
+        # The batch goes out a little later, and the receipt follows
+        time.sleep(0.01)
+        on_sent(True)
+        handle = Future()
+        handle.set_result({'status': 'success', 'tx_hash': tx_hash, 'receipt': {'status': 1}})
+        return handle
+
+    manager.plan_swap_stage = plan
+    manager.route_swap_stage = manager.build_swap_stage = lambda job: None
+    manager.sign_swap_stage = sign
+    manager.broadcaster = SimpleNamespace(submit=submit, stats=manager.broadcaster.stats)
+    results = manager.start_swaps(concurrency=3, settings={'confirm': False})
+
+    assert [(r['wallet'], r['status']) for r in results] == [('0xk1', 'success'), ('0xk2', 'skipped'),
+                                                            ('0xk3', 'success')]
+    assert sorted(signing) == ['0xk1', '0xk3'] and 'handle' not in results[0]
+    summary = manager.timer.summary()
+    assert summary['wallet']['count'] == 3
+    assert summary['broadcast']['count'] == summary['confirm']['count'] == 2
+    assert summary['broadcast']['p50'] >= 0.01 > summary['confirm']['p50']
+
+def test_offline_signing_writes_wallet_transactions_for_a_later_broadcast(tmp_path):
+    manager = create_manager(str(tmp_path))
+    manager.wallet_private_keys = ['k1', 'k2']
+    manager.w3.eth.get_transaction_count = lambda address, block: 7
+
+    def plan(job):
+        job.update(sender='0x' + job['private_key'], from_token='0xtoken', amount_in_wei=10,
+                   max_fee_per_gas=30, max_priority_fee_per_gas=2, approval_tx_hash=None)
+
+    def route(job):
+        job['router_address'] = '0xrouter'
+        if job['private_key'] == 'k1':
+            job['approval_tx'] = {'nonce': manager.nonce_manager.allocate(job['sender']), 'to': '0xtoken'}
+
+    manager.plan_swap_stage, manager.route_swap_stage = plan, route
+    manager.build_swap_stage = lambda job: job.update(encoded_data={'data': {'data': '0xe21f', 'gas': '250000'}})
+    output = queue.Queue()
+    results = manager.sign_swaps_offline({'confirm': False}, output, concurrency=2)
+
+    records = list(output.queue)
+    assert [(r['wallet'], r['kind'], r['nonce']) for r in records] == [
+        ('0xk1', 'approval', 7), ('0xk1', 'swap', 8), ('0xk2', 'swap', 7)]
+    assert [(r['status'], r['tx_hash']) for r in results] == [('signed', records[1]['tx_hash']),
+                                                              ('signed', records[2]['tx_hash'])]
+    assert all(set(r) == {'chain_id', 'wallet', 'kind', 'nonce', 'tx_hash', 'raw'} for r in records)
+
+    signed_file = SignedTransactionFile(str(tmp_path / 'signed.jsonl'))
+    for record in records:
+        signed_file.put(record)
+    signed_file.close()
+    sent = []
+
+    def submit(raw, tx_hash):
+        sent.append(raw)
+        handle = Future()
+        handle.set_result({'status': 'success', 'tx_hash': tx_hash, 'receipt': {'status': 1}})
+        return handle
+
+    manager.broadcaster = SimpleNamespace(submit=submit, in_flight=lambda: 0, stats=manager.broadcaster.stats)
+    results = manager.broadcast_signed_transactions(SignedTransactionFile.read(signed_file.path))
+    assert sent.index(records[0]['raw']) < sent.index(records[1]['raw'])
+    assert [(r['wallet'], r['status']) for r in results] == [('0xk1', 'success'), ('0xk2', 'success')]
+
+def test_bulk_signing_falls_back_to_this_process_when_the_pool_breaks(tmp_path, monkeypatch):
+    import multiprocessing
+    manager = create_manager(str(tmp_path))
+    manager.signing_process_threshold = 2
+    manager.process_context = multiprocessing.get_context('spawn')
+    monkeypatch.setattr(os, 'cpu_count', lambda: 2)
+    items = [({'nonce': nonce}, 'k%d' % nonce) for nonce in range(3)]
+    assert [raw for raw, _ in manager.sign_transactions(items)] == ['0x' + f"k{n}:{n}".encode().hex() for n in range(3)]
+
+def test_burst_broadcaster_batches_dedupes_and_rebroadcasts_unseen_transactions():
+    batches = []
+
+    class Pool:
+        batch_size = 50
+
+        def broadcast_batch(self, raws):
+            batches.append(list(raws))
+            return [{'error': {'message': 'nonce too low'}} if raw == '0xbad' else
+                    {'error': {'message': 'already known'}} if raw == '0xknown' else {'result': '0x'} for raw in raws]
+
+        def make_batch_request(self, calls):
+            return [{'result': None} for _ in calls]  # no node has seen them
+
+    tracked = {}
+
+    class Tracker:
+        def track(self, tx_hash, callback=None):
+            future = tracked[tx_hash.hex()] = Future()
+            future.add_done_callback(callback)
+            return future
+
+    broadcaster = BurstBroadcaster(Pool(), Tracker(), window=3, rebroadcast_after=0.1, linger=0.02)
+    futures = [broadcaster.submit('0xaa', '0x01'), broadcaster.submit('0xbad', '0x02'),
+               broadcaster.submit('0xknown', '0x03')]
+    assert broadcaster.submit('0xaa', '0x01') is futures[0]
+    # The window is full until the rejected transaction frees a slot
+    futures.append(broadcaster.submit('0xcc', '0x04'))
+    assert futures[1].result(timeout=1) == {'status': 'error', 'tx_hash': '0x02', 'detail': 'nonce too low'}
+    assert batches[0] == ['0xaa', '0xbad', '0xknown']
+
+    deadline = time.monotonic() + 2
+    while broadcaster.stats['rebroadcasts'] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(raw for batch in batches[1:] for raw in batch if raw != '0xcc') == ['0xaa', '0xknown']
+    for tx_hash in ('0x01', '0x03', '0x04'):
+        tracked[tx_hash].set_result({'status': 'success', 'tx_hash': tx_hash, 'receipt': {'status': 1}})
+    assert [f.result(timeout=1)['status'] for f in futures] == ['success', 'error', 'success', 'success']
+    assert broadcaster.in_flight() == 0
+    assert (broadcaster.stats['sent'], broadcaster.stats['duplicates'], broadcaster.stats['rejected']) == (3, 1, 1)
+    assert broadcaster._futures == {}  # finished transactions leave the dedupe map
+
+def test_burst_broadcaster_rebroadcasts_only_the_fee_bumped_replacement():
+    batches, checked = [], []
+
+    class Pool:
+        batch_size = 50
+
+        def broadcast_batch(self, raws):
+            batches.append(list(raws))
+            return [{'result': '0x'} for _ in raws]
+
+        def make_batch_request(self, calls):
+            checked.extend(params[0] for _, params in calls)
+            return [{'result': None} for _ in calls]
+
+    tracked = {}
+
+    class Tracker:
+        def track(self, tx_hash, callback=None):
+            future = tracked[tx_hash.hex()] = Future()
+            future.add_done_callback(callback)
+            return future
+
+    broadcaster = BurstBroadcaster(Pool(), Tracker(), rebroadcast_after=0.1, linger=0)
+    future = broadcaster.submit('0xaa', '0x01')
+    deadline = time.monotonic() + 2
+    while '0x01' not in tracked and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert broadcaster.replace('0x01', '0x09', '0xbb')
+    while broadcaster.stats['rebroadcasts'] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert batches[0] == ['0xaa'] and ['0xaa'] not in batches[1:] and ['0xbb'] in batches[1:]
+    assert set(checked) == {'0x09'}
+    tracked['0x01'].set_result({'status': 'success', 'tx_hash': '0x09', 'receipt': {'status': 1}})
+    assert future.result(timeout=1)['tx_hash'] == '0x09' and broadcaster.in_flight() == 0
+
+
+def test_fee_accelerator_replaces_stuck_transaction_until_the_fee_ceiling():
+    mined, sent = {}, []
+
+    def send_raw_transaction(raw):
+        sent.append(raw)
+        return TxHash(bytes([len(sent) + 1]))
+
+    w3 = SimpleNamespace(eth=SimpleNamespace(get_transaction_receipt=lambda h: mined.get(h),
+                                             send_raw_transaction=send_raw_transaction))
+    tracker = ReceiptTracker(w3, timeout=60)
+    original = TxHash(b'\x01')
+    handle = tracker.track(original)
+    replaced = []
+    accelerator = FeeAccelerator(w3, tracker, stuck_after=0.0001, bump_percent=20, max_fee_multiplier=1.35,
+                                 fee_source=lambda: (0, 0), check_interval=60,
+                                 on_replace=lambda *args: replaced.append(args))
+    tx = {'from': '0xa', 'nonce': 7, 'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10}
+    accelerator.watch(original, tx, lambda tx: SimpleNamespace(rawTransaction=(tx['maxFeePerGas'], tx['maxPriorityFeePerGas'])))
+
+    for _ in range(3):
+        time.sleep(0.001)
+        accelerator.check_once()
+    # Bumped by 20%, then cut to the 135 ceiling; a third bump would stay below the 10% nodes require
+    assert sent == [(120, 12), (135, 15)]
+    assert [args[:5] for args in replaced] == [('swap', '0xa', '0x01', '0x02', 7), ('swap', '0xa', '0x02', '0x03', 7)]
+    assert [args[5] for args in replaced] == sent
+    assert accelerator.stats == {'replacements': 2, 'gave_up': 1}
+
+    # The first version is mined after all: the shared Future resolves with it and drops the others
+    mined[original] = {'status': 1}
+    tracker.poll_once()
+    assert handle.result(timeout=1)['tx_hash'] == '0x01'
+    assert tracker.pending_count() == 0 and accelerator.watched_count() == 0
+
+def test_fee_accelerator_reports_why_it_stops_replacing(monkeypatch):
+    import modules.kyberSwap as ks
+    logged = []
+    monkeypatch.setattr(ks.console, 'log', logged.append)
+    w3 = SimpleNamespace(eth=SimpleNamespace(send_raw_transaction=lambda raw: TxHash(b'\x02')))
+    tracker = SimpleNamespace(is_pending=lambda key: True, add_replacement=lambda old, new: True)
+    accelerator = FeeAccelerator(w3, tracker, stuck_after=0.0001, max_fee_multiplier=10, max_replacements=1,
+                                 check_interval=60)
+    accelerator.watch(TxHash(b'\x01'), {'from': '0xa', 'nonce': 3, 'maxFeePerGas': 100, 'maxPriorityFeePerGas': 10},
+                      lambda tx: SimpleNamespace(rawTransaction=b'raw'), kind='approval')
+    for _ in range(2):
+        time.sleep(0.001)
+        accelerator.check_once()
+    assert accelerator.stats == {'replacements': 1, 'gave_up': 1}
+    assert 'already replaced 1 times' in logged[-1] and 'ceiling' not in logged[-1]